@@ -12,63 +12,85 @@ Omega_L = 0.7
 # =========================
 # Hubble functions
 # =========================
-def H_FRW(z, H0):
+def H_FRW(z, H0, Om=Omega_m, OL=Omega_L):
     """Standard FRW (flat LCDM)"""
-    return H0 * np.sqrt(Omega_m * (1 + z)**3 + Omega_L)
+    return H0 * np.sqrt(Om * (1 + z)**3 + OL)
 
-def H_CSGT(z, H0=H0_local, z_star=-1.5):
+def H_CSGT(z, H0=H0_local, z_star=-1.5, Om=Omega_m, OL=Omega_L):
     """
     CSGT unified Hubble function
     H(z) = H_FRW(z) * |z - z*| / |z*|
     """
     phi = np.abs(z - z_star) / np.abs(z_star)
-    return H_FRW(z, H0) * phi
+    return H_FRW(z, H0, Om, OL) * phi
 
 # =========================
-# Redshift range
+# z* scan candidates
 # =========================
-z = np.logspace(-3, 3, 1000)  # 0.001 -> 1000
+z_star_values = [-0.8, -1.2, -1.5, -2.0, -3.0]
 
 # =========================
-# z* scan candidates
+# Panel arrays (cached by csgt_figures.py)
 # =========================
-z_star_values = [-0.8, -1.2, -1.5, -2.0, -3.0]
+def compute_hubble_curves(Om=Omega_m, z_star_fit=None):
+    """
+    H(z) for every z* candidate (plus a fitted z* if given) and LCDM.
+    A fitted Om keeps the universe flat: Omega_L = 1 - Om.
+    """
+    OL = 1.0 - Om
+    z = np.logspace(-3, 3, 1000)  # 0.001 -> 1000
+    z_stars = np.array(z_star_values + ([] if z_star_fit is None else [z_star_fit]))
+    return {
+        'z': z,
+        'z_stars': z_stars,
+        'H_csgt': H_CSGT(z, H0_local, z_stars[:, None], Om, OL),
+        'H_lcdm': H_FRW(z, H0_CMB, Om, OL),
+        'H_cmb': np.array(H_FRW(1100, H0_CMB, Om, OL)),
+    }
+
+PANELS = {'hubble': compute_hubble_curves}
 
 # =========================
 # Plot
 # =========================
-plt.figure(figsize=(10, 7))
+def render(panels):
+    p = panels['hubble']
+    fig = plt.figure(figsize=(10, 7))
+
+    # CSGT curves
+    for z_star, H in zip(p['z_stars'], p['H_csgt']):
+        plt.plot(
+            p['z'],
+            H,
+            linewidth=2,
+            label=f"CSGT  z* = {z_star}"
+        )
 
-# CSGT curves
-for z_star in z_star_values:
+    # LCDM comparison
     plt.plot(
-        z,
-        H_CSGT(z, H0_local, z_star),
+        p['z'],
+        p['H_lcdm'],
+        "k--",
         linewidth=2,
-        label=f"CSGT  z* = {z_star}"
+        label="LCDM (H0 = 67)"
     )
 
-# LCDM comparison
-plt.plot(
-    z,
-    H_FRW(z, H0_CMB),
-    "k--",
-    linewidth=2,
-    label="LCDM (H0 = 67)"
-)
+    # Anchors
+    plt.scatter([0.001], [H0_local], c="red", s=80, zorder=5, label="Local H0")
+    plt.scatter([1100], [p['H_cmb']], c="blue", s=80, zorder=5, label="CMB")
 
-# Anchors
-plt.scatter([0.001], [H0_local], c="red", s=80, zorder=5, label="Local H0")
-plt.scatter([1100], [H_FRW(1100, H0_CMB)], c="blue", s=80, zorder=5, label="CMB")
+    # Axes
+    plt.xscale("log")
+    plt.yscale("log")
+    plt.xlabel("Redshift z")
+    plt.ylabel("H(z)  [km/s/Mpc]")
+    plt.title("CSGT: Unified Resolution of the H0 Tension")
 
-# Axes
-plt.xscale("log")
-plt.yscale("log")
-plt.xlabel("Redshift z")
-plt.ylabel("H(z)  [km/s/Mpc]")
-plt.title("CSGT: Unified Resolution of the H0 Tension")
+    plt.legend()
+    plt.grid(alpha=0.3)
+    plt.tight_layout()
+    return fig
 
-plt.legend()
-plt.grid(alpha=0.3)
-plt.tight_layout()
-plt.show()
+if __name__ == "__main__":
+    render({name: compute() for name, compute in PANELS.items()})
+    plt.show()
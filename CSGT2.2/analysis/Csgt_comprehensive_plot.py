@@ -7,11 +7,15 @@ z = np.linspace(0, 3, 500)
 H0_planck = 67.4
 H0_shoes = 73.04
 H0_csgt = 70.8
+eta_0 = 1.0165  # Non-local information boost η(z=0)
 Om_m = 0.315
 Om_b = 0.049
 h = H0_csgt / 100
 c_light = 299792.458  # km/s
 
+# np.trapz was renamed np.trapezoid in NumPy 2.0
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
 # Structure parameters
 S8_planck = 0.83
 S8_csgt = 0.78
@@ -21,11 +25,10 @@ gamma_csgt = 0.025
 def H_lcdm(z, H0):
     return H0 * np.sqrt(Om_m * (1 + z)**3 + (1 - Om_m))
 
-def H_csgt(z):
+def H_csgt(z, H0=H0_csgt, eta_0=eta_0):
     """CSGT with non-local information boost η(z)"""
-    eta_0 = 1.0165
     eta_z = eta_0 ** (1 / (1 + z)**0.5)
-    return H0_csgt * np.sqrt(Om_m * (1 + z)**3 + (1 - Om_m)) / eta_z
+    return H0 * np.sqrt(Om_m * (1 + z)**3 + (1 - Om_m)) / eta_z
 
 # --- Coherence Function C(z) ---
 def coherence_C(z):
@@ -72,219 +75,232 @@ def r_drag_lcdm(H0):
 
 def theta_BAO(z, H0, r_s):
     """Angular BAO scale θ_BAO = r_s / d_A(z)"""
-    # Comoving angular diameter distance
-    def d_A(z, H0):
-        z_arr = np.linspace(0, z, 1000)
-        integrand = 1 / H_lcdm(z_arr, H0)
-        d_c = c_light * np.trapz(integrand, z_arr)
-        return d_c / (1 + z)
-    
-    if np.isscalar(z):
-        return r_s / d_A(z, H0)
-    else:
-        return np.array([r_s / d_A(zi, H0) for zi in z])
+    # Comoving distance: 1000-point trapezoid on [0, z] for every z at once
+    z = np.asarray(z, dtype=float)
+    z_arr = z[..., None] * np.linspace(0, 1, 1000)
+    d_c = c_light * _trapezoid(1 / H_lcdm(z_arr, H0), z_arr, axis=-1)
+    d_A = d_c / (1 + z)
+    return (r_s / d_A)[()]
 
 # BAO observational data (representative SDSS/BOSS/eBOSS measurements)
 z_bao_obs = np.array([0.15, 0.38, 0.51, 0.61, 0.70])
 theta_bao_obs = np.array([0.0354, 0.0332, 0.0323, 0.0318, 0.0313])  # Simplified normalized
 theta_bao_err = np.array([0.0008, 0.0006, 0.0005, 0.0005, 0.0006])
 
-# --- Compute BAO for models ---
-r_s_planck, z_drag_planck = r_drag_lcdm(H0_planck)
-r_s_csgt, z_drag_csgt = r_drag_lcdm(H0_csgt)
+# --- Panel Arrays (cached by csgt_figures.py) ---
+def compute_coherence():
+    z_plot = np.logspace(-1, 3.5, 1000)  # Log scale for wide range
+    z_low = np.linspace(0, 5, 200)
+    return {'z': z_plot, 'C': coherence_C(z_plot), 'z_low': z_low, 'C_low': coherence_C(z_low)}
+
+def compute_residuals(H0_csgt=H0_csgt, eta_0=eta_0):
+    # Hubble residual
+    H_ref = H_lcdm(z, H0_planck)
+    H_residual_percent = (H_csgt(z, H0_csgt, eta_0) - H_ref) / H_ref * 100
+
+    # Structure growth residual
+    S8_lcdm = S8_growth(z, S8_planck, gamma=0.0)
+    S8_csgt_vals = S8_growth(z, S8_csgt, gamma=gamma_csgt)
+    S8_residual_percent = (S8_csgt_vals - S8_lcdm) / S8_lcdm * 100
+    return {'z': z, 'H': H_residual_percent, 'S8': S8_residual_percent}
+
+def compute_bao(H0_csgt=H0_csgt, delta_tau=0.015):
+    r_s_planck, z_drag_planck = r_drag_lcdm(H0_planck)
+    r_s_csgt, z_drag_csgt = r_drag_lcdm(H0_csgt)
+
+    # Normalize to z=0.5 for comparison
+    z_bao = np.linspace(0.1, 1.5, 100)
+    theta_bao_planck = theta_BAO(z_bao, H0_planck, r_s_planck)
+    theta_bao_csgt_raw = theta_BAO(z_bao, H0_csgt, r_s_csgt)
+
+    # CSGT: phase shift compensation Δτ (information lag compensation)
+    theta_bao_csgt = theta_bao_csgt_raw * (1 + delta_tau / (1 + z_bao))
 
-# Normalize to z=0.5 for comparison
-z_bao = np.linspace(0.1, 1.5, 100)
-theta_bao_planck = theta_BAO(z_bao, H0_planck, r_s_planck)
-theta_bao_csgt_raw = theta_BAO(z_bao, H0_csgt, r_s_csgt)
+    # Normalize to same scale
+    norm = theta_bao_planck[50]
+    return {'z': z_bao, 'planck': theta_bao_planck / norm, 'csgt': theta_bao_csgt / norm,
+            'obs': theta_bao_obs / 0.0323, 'obs_err': theta_bao_err / 0.0323}
 
-# CSGT: phase shift compensation Δτ
-delta_tau = 0.015  # Information lag compensation
-theta_bao_csgt = theta_bao_csgt_raw * (1 + delta_tau / (1 + z_bao))
+def compute_parameter_space(H0_csgt=H0_csgt):
+    return {'csgt': np.array([H0_csgt, S8_csgt])}
 
-# Normalize to same scale
-norm = theta_bao_planck[50]
-theta_bao_planck_norm = theta_bao_planck / norm
-theta_bao_csgt_norm = theta_bao_csgt / norm
-theta_bao_obs_norm = theta_bao_obs / 0.0323
+PANELS = {'coherence': compute_coherence, 'residuals': compute_residuals,
+          'bao': compute_bao, 'parameter_space': compute_parameter_space}
 
 # --- Create Comprehensive Plot ---
-fig = plt.figure(figsize=(16, 10))
-gs = GridSpec(2, 2, figure=fig, hspace=0.3, wspace=0.3)
-
-# ============ Panel 1: Coherence Evolution C(z) ============
-ax1 = fig.add_subplot(gs[0, 0])
-
-z_plot = np.logspace(-1, 3.5, 1000)  # Log scale for wide range
-C_plot = coherence_C(z_plot)
-
-ax1.semilogx(z_plot, C_plot, 'b-', linewidth=2.5, label='Coherence $C(z)$')
-ax1.axhline(1.0, color='k', linestyle='--', alpha=0.5, label='Perfect Coherence')
-
-# Mark special epochs
-ax1.axvline(1090, color='orange', linestyle=':', alpha=0.7, linewidth=1.5)
-ax1.text(1090, 0.86, 'Recombination', rotation=90, va='bottom', fontsize=9, color='orange')
-
-ax1.axvline(3400, color='purple', linestyle=':', alpha=0.7, linewidth=1.5)
-ax1.text(3400, 0.86, 'Matter-Rad\nEquality', rotation=90, va='bottom', fontsize=8, color='purple')
-
-# Shade coherence lag region
-z_lag_region = (z_plot > 900) & (z_plot < 1300)
-ax1.fill_between(z_plot[z_lag_region], 0.85, C_plot[z_lag_region], 
-                  alpha=0.3, color='red', label='Information Lag')
-
-ax1.set_xlabel('Redshift $z$', fontsize=11)
-ax1.set_ylabel('Unitary Coherence $C(z)$', fontsize=11)
-ax1.set_title('(A) Coherence Evolution: Future Boundary Pull', fontsize=12, fontweight='bold')
-ax1.set_ylim(0.85, 1.02)
-ax1.grid(alpha=0.3, which='both', linestyle=':')
-ax1.legend(loc='lower right', fontsize=9)
-
-# Add inset for low-z detail
-axins = ax1.inset_axes([0.15, 0.15, 0.35, 0.35])
-z_low = np.linspace(0, 5, 200)
-axins.plot(z_low, coherence_C(z_low), 'b-', linewidth=2)
-axins.axhline(1.0, color='k', linestyle='--', alpha=0.5)
-axins.set_xlim(0, 5)
-axins.set_ylim(0.96, 1.005)
-axins.set_xlabel('$z$', fontsize=8)
-axins.set_ylabel('$C$', fontsize=8)
-axins.grid(alpha=0.3)
-axins.set_title('Low-z Detail', fontsize=8)
-
-# ============ Panel 2: Residuals (CSGT - ΛCDM) ============
-ax2 = fig.add_subplot(gs[0, 1])
-
-# Hubble residual
-H_residual_percent = (H_csgt(z) - H_lcdm(z, H0_planck)) / H_lcdm(z, H0_planck) * 100
-
-# Structure growth residual
-S8_lcdm = S8_growth(z, S8_planck, gamma=0.0)
-S8_csgt_vals = S8_growth(z, S8_csgt, gamma=gamma_csgt)
-S8_residual_percent = (S8_csgt_vals - S8_lcdm) / S8_lcdm * 100
-
-ax2.plot(z, H_residual_percent, 'b-', linewidth=2.5, label='$H(z)$ Residual')
-ax2.plot(z, S8_residual_percent, 'r-', linewidth=2.5, label='$S_8(z)$ Residual')
-ax2.axhline(0, color='k', linestyle='--', alpha=0.5)
-
-# Shade tension regions
-ax2.fill_between(z, -8, 0, alpha=0.15, color='red', label='$S_8$ Suppression')
-ax2.fill_between(z, 0, 8, alpha=0.15, color='blue', label='$H_0$ Enhancement')
-
-ax2.set_xlabel('Redshift $z$', fontsize=11)
-ax2.set_ylabel('Residual vs $\Lambda$CDM (%)', fontsize=11)
-ax2.set_title('(B) CSGT Deviations: Energy Balance', fontsize=12, fontweight='bold')
-ax2.set_ylim(-8, 8)
-ax2.grid(alpha=0.3, linestyle=':')
-ax2.legend(loc='upper right', fontsize=9)
-
-# Add annotation for energy conservation
-ax2.annotate('Energy Transfer:\n$H_0$ ↑ 5% ≈ $S_8$ ↓ 6%', 
-            xy=(1.5, -4), fontsize=10,
-            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.7))
-
-# ============ Panel 3: BAO Scale Evolution ============
-ax3 = fig.add_subplot(gs[1, 0])
-
-ax3.plot(z_bao, theta_bao_planck_norm, 'k--', linewidth=2, 
-         label=r'$\Lambda$CDM (Planck)', alpha=0.7)
-ax3.plot(z_bao, theta_bao_csgt_norm, 'g-', linewidth=2.5, 
-         label=r'CSGT (with $\Delta\tau$ phase shift)')
-
-# Observational data
-ax3.errorbar(z_bao_obs, theta_bao_obs_norm, yerr=theta_bao_err/0.0323, 
-             fmt='mo', markersize=8, capsize=5, alpha=0.8,
-             label='BAO Observations (SDSS/BOSS)', zorder=5)
-
-# Shade agreement region
-ax3.fill_between(z_bao, 
-                  theta_bao_csgt_norm - 0.02, 
-                  theta_bao_csgt_norm + 0.02,
-                  alpha=0.2, color='green', label='CSGT ±2% band')
-
-ax3.set_xlabel('Redshift $z$', fontsize=11)
-ax3.set_ylabel(r'$\theta_{\rm BAO}(z) / \theta_{\rm BAO}(z=0.5)$', fontsize=11)
-ax3.set_title('(C) Baryon Acoustic Oscillations: Phase Shift Compensation', fontsize=12, fontweight='bold')
-ax3.set_xlim(0, 1.5)
-ax3.set_ylim(0.92, 1.08)
-ax3.grid(alpha=0.3, linestyle=':')
-ax3.legend(loc='upper right', fontsize=9)
-
-# Add annotation
-ax3.annotate(r'$\Delta\tau \approx 0.015$ compensates', 
-            xy=(0.7, 1.05), fontsize=9,
-            bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.7))
-
-# ============ Panel 4: Combined Tension Resolution ============
-ax4 = fig.add_subplot(gs[1, 1])
-
-# Create 2D parameter space visualization
-from matplotlib.patches import Ellipse
-
-# ΛCDM + Planck
-ell_planck = Ellipse((H0_planck, S8_planck), width=1.0, height=0.012, 
-                      angle=0, facecolor='blue', alpha=0.3, 
-                      edgecolor='blue', linewidth=2, label='Planck 2018')
-
-# ΛCDM + SH0ES (inconsistent)
-ell_shoes = Ellipse((H0_shoes, S8_planck), width=2.0, height=0.012,
-                     angle=0, facecolor='red', alpha=0.3,
-                     edgecolor='red', linewidth=2, label='SH0ES (local)')
-
-# Weak lensing (low S8)
-ell_wl = Ellipse((H0_planck, S8_csgt), width=1.0, height=0.04,
-                  angle=0, facecolor='orange', alpha=0.3,
-                  edgecolor='orange', linewidth=2, label='Weak Lensing')
-
-# CSGT resolution
-ell_csgt = Ellipse((H0_csgt, S8_csgt), width=1.6, height=0.04,
-                    angle=-10, facecolor='green', alpha=0.5,
-                    edgecolor='green', linewidth=3, label='CSGT Resolution')
-
-ax4.add_patch(ell_planck)
-ax4.add_patch(ell_shoes)
-ax4.add_patch(ell_wl)
-ax4.add_patch(ell_csgt)
-
-# Add points
-ax4.plot(H0_planck, S8_planck, 'bs', markersize=12, zorder=5)
-ax4.plot(H0_shoes, S8_planck, 'r^', markersize=12, zorder=5)
-ax4.plot(H0_planck, S8_csgt, 'o', color='orange', markersize=12, zorder=5)
-ax4.plot(H0_csgt, S8_csgt, 'g*', markersize=20, zorder=6)
-
-# Draw tension arrows
-ax4.annotate('', xy=(H0_shoes, S8_planck), xytext=(H0_planck, S8_planck),
-            arrowprops=dict(arrowstyle='<->', color='red', lw=2))
-ax4.text(70, 0.835, '$H_0$ Tension\n4.4σ', fontsize=9, color='red', 
-         ha='center', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-
-ax4.annotate('', xy=(H0_planck, S8_csgt), xytext=(H0_planck, S8_planck),
-            arrowprops=dict(arrowstyle='<->', color='orange', lw=2))
-ax4.text(65.5, 0.805, '$S_8$\nTension\n3σ', fontsize=9, color='orange', 
-         ha='center', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-
-ax4.set_xlabel('Hubble Constant $H_0$ [km/s/Mpc]', fontsize=11)
-ax4.set_ylabel('Structure Growth $S_8$', fontsize=11)
-ax4.set_title('(D) Joint Parameter Space: Simultaneous Resolution', fontsize=12, fontweight='bold')
-ax4.set_xlim(65, 75)
-ax4.set_ylim(0.75, 0.86)
-ax4.grid(alpha=0.3, linestyle=':')
-ax4.legend(loc='upper left', fontsize=9)
-
-# Add CSGT annotation
-ax4.annotate('CSGT:\nInfo Balance', 
-            xy=(H0_csgt, S8_csgt), xytext=(72, 0.77),
-            fontsize=10, fontweight='bold', color='darkgreen',
-            arrowprops=dict(arrowstyle='->', color='green', lw=2),
-            bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.8))
-
-# Overall title
-fig.suptitle('CSGT Comprehensive Analysis: Future Boundary Information Coherence', 
-             fontsize=15, fontweight='bold', y=0.995)
-
-plt.savefig('csgt_comprehensive_analysis.png', dpi=300, bbox_inches='tight')
-print("✓ Comprehensive 4-panel analysis created!")
-print("  Panel A: Coherence C(z) evolution with recombination lag")
-print("  Panel B: Residuals showing energy transfer")
-print("  Panel C: BAO consistency via phase shift compensation")
-print("  Panel D: Joint H0-S8 parameter space resolution")
\ No newline at end of file
+def render(panels):
+    fig = plt.figure(figsize=(16, 10))
+    gs = GridSpec(2, 2, figure=fig, hspace=0.3, wspace=0.3)
+
+    # ============ Panel 1: Coherence Evolution C(z) ============
+    ax1 = fig.add_subplot(gs[0, 0])
+
+    z_plot, C_plot = panels['coherence']['z'], panels['coherence']['C']
+
+    ax1.semilogx(z_plot, C_plot, 'b-', linewidth=2.5, label='Coherence $C(z)$')
+    ax1.axhline(1.0, color='k', linestyle='--', alpha=0.5, label='Perfect Coherence')
+
+    # Mark special epochs
+    ax1.axvline(1090, color='orange', linestyle=':', alpha=0.7, linewidth=1.5)
+    ax1.text(1090, 0.86, 'Recombination', rotation=90, va='bottom', fontsize=9, color='orange')
+
+    ax1.axvline(3400, color='purple', linestyle=':', alpha=0.7, linewidth=1.5)
+    ax1.text(3400, 0.86, 'Matter-Rad\nEquality', rotation=90, va='bottom', fontsize=8, color='purple')
+
+    # Shade coherence lag region
+    z_lag_region = (z_plot > 900) & (z_plot < 1300)
+    ax1.fill_between(z_plot[z_lag_region], 0.85, C_plot[z_lag_region],
+                      alpha=0.3, color='red', label='Information Lag')
+
+    ax1.set_xlabel('Redshift $z$', fontsize=11)
+    ax1.set_ylabel('Unitary Coherence $C(z)$', fontsize=11)
+    ax1.set_title('(A) Coherence Evolution: Future Boundary Pull', fontsize=12, fontweight='bold')
+    ax1.set_ylim(0.85, 1.02)
+    ax1.grid(alpha=0.3, which='both', linestyle=':')
+    ax1.legend(loc='lower right', fontsize=9)
+
+    # Add inset for low-z detail
+    axins = ax1.inset_axes([0.15, 0.15, 0.35, 0.35])
+    axins.plot(panels['coherence']['z_low'], panels['coherence']['C_low'], 'b-', linewidth=2)
+    axins.axhline(1.0, color='k', linestyle='--', alpha=0.5)
+    axins.set_xlim(0, 5)
+    axins.set_ylim(0.96, 1.005)
+    axins.set_xlabel('$z$', fontsize=8)
+    axins.set_ylabel('$C$', fontsize=8)
+    axins.grid(alpha=0.3)
+    axins.set_title('Low-z Detail', fontsize=8)
+
+    # ============ Panel 2: Residuals (CSGT - ΛCDM) ============
+    ax2 = fig.add_subplot(gs[0, 1])
+
+    res = panels['residuals']
+    ax2.plot(res['z'], res['H'], 'b-', linewidth=2.5, label='$H(z)$ Residual')
+    ax2.plot(res['z'], res['S8'], 'r-', linewidth=2.5, label='$S_8(z)$ Residual')
+    ax2.axhline(0, color='k', linestyle='--', alpha=0.5)
+
+    # Shade tension regions
+    ax2.fill_between(res['z'], -8, 0, alpha=0.15, color='red', label='$S_8$ Suppression')
+    ax2.fill_between(res['z'], 0, 8, alpha=0.15, color='blue', label='$H_0$ Enhancement')
+
+    ax2.set_xlabel('Redshift $z$', fontsize=11)
+    ax2.set_ylabel('Residual vs $\Lambda$CDM (%)', fontsize=11)
+    ax2.set_title('(B) CSGT Deviations: Energy Balance', fontsize=12, fontweight='bold')
+    ax2.set_ylim(-8, 8)
+    ax2.grid(alpha=0.3, linestyle=':')
+    ax2.legend(loc='upper right', fontsize=9)
+
+    # Add annotation for energy conservation
+    ax2.annotate('Energy Transfer:\n$H_0$ ↑ 5% ≈ $S_8$ ↓ 6%',
+                xy=(1.5, -4), fontsize=10,
+                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.7))
+
+    # ============ Panel 3: BAO Scale Evolution ============
+    ax3 = fig.add_subplot(gs[1, 0])
+
+    bao = panels['bao']
+    ax3.plot(bao['z'], bao['planck'], 'k--', linewidth=2,
+             label=r'$\Lambda$CDM (Planck)', alpha=0.7)
+    ax3.plot(bao['z'], bao['csgt'], 'g-', linewidth=2.5,
+             label=r'CSGT (with $\Delta\tau$ phase shift)')
+
+    # Observational data
+    ax3.errorbar(z_bao_obs, bao['obs'], yerr=bao['obs_err'],
+                 fmt='mo', markersize=8, capsize=5, alpha=0.8,
+                 label='BAO Observations (SDSS/BOSS)', zorder=5)
+
+    # Shade agreement region
+    ax3.fill_between(bao['z'],
+                      bao['csgt'] - 0.02,
+                      bao['csgt'] + 0.02,
+                      alpha=0.2, color='green', label='CSGT ±2% band')
+
+    ax3.set_xlabel('Redshift $z$', fontsize=11)
+    ax3.set_ylabel(r'$\theta_{\rm BAO}(z) / \theta_{\rm BAO}(z=0.5)$', fontsize=11)
+    ax3.set_title('(C) Baryon Acoustic Oscillations: Phase Shift Compensation', fontsize=12, fontweight='bold')
+    ax3.set_xlim(0, 1.5)
+    ax3.set_ylim(0.92, 1.08)
+    ax3.grid(alpha=0.3, linestyle=':')
+    ax3.legend(loc='upper right', fontsize=9)
+
+    # Add annotation
+    ax3.annotate(r'$\Delta\tau \approx 0.015$ compensates',
+                xy=(0.7, 1.05), fontsize=9,
+                bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.7))
+
+    # ============ Panel 4: Combined Tension Resolution ============
+    ax4 = fig.add_subplot(gs[1, 1])
+    H0_fit, S8_fit = panels['parameter_space']['csgt']
+
+    # Create 2D parameter space visualization
+    from matplotlib.patches import Ellipse
+
+    # ΛCDM + Planck
+    ell_planck = Ellipse((H0_planck, S8_planck), width=1.0, height=0.012,
+                          angle=0, facecolor='blue', alpha=0.3,
+                          edgecolor='blue', linewidth=2, label='Planck 2018')
+
+    # ΛCDM + SH0ES (inconsistent)
+    ell_shoes = Ellipse((H0_shoes, S8_planck), width=2.0, height=0.012,
+                         angle=0, facecolor='red', alpha=0.3,
+                         edgecolor='red', linewidth=2, label='SH0ES (local)')
+
+    # Weak lensing (low S8)
+    ell_wl = Ellipse((H0_planck, S8_csgt), width=1.0, height=0.04,
+                      angle=0, facecolor='orange', alpha=0.3,
+                      edgecolor='orange', linewidth=2, label='Weak Lensing')
+
+    # CSGT resolution
+    ell_csgt = Ellipse((H0_fit, S8_fit), width=1.6, height=0.04,
+                        angle=-10, facecolor='green', alpha=0.5,
+                        edgecolor='green', linewidth=3, label='CSGT Resolution')
+
+    ax4.add_patch(ell_planck)
+    ax4.add_patch(ell_shoes)
+    ax4.add_patch(ell_wl)
+    ax4.add_patch(ell_csgt)
+
+    # Add points
+    ax4.plot(H0_planck, S8_planck, 'bs', markersize=12, zorder=5)
+    ax4.plot(H0_shoes, S8_planck, 'r^', markersize=12, zorder=5)
+    ax4.plot(H0_planck, S8_csgt, 'o', color='orange', markersize=12, zorder=5)
+    ax4.plot(H0_fit, S8_fit, 'g*', markersize=20, zorder=6)
+
+    # Draw tension arrows
+    ax4.annotate('', xy=(H0_shoes, S8_planck), xytext=(H0_planck, S8_planck),
+                arrowprops=dict(arrowstyle='<->', color='red', lw=2))
+    ax4.text(70, 0.835, '$H_0$ Tension\n4.4σ', fontsize=9, color='red',
+             ha='center', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+
+    ax4.annotate('', xy=(H0_planck, S8_csgt), xytext=(H0_planck, S8_planck),
+                arrowprops=dict(arrowstyle='<->', color='orange', lw=2))
+    ax4.text(65.5, 0.805, '$S_8$\nTension\n3σ', fontsize=9, color='orange',
+             ha='center', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+
+    ax4.set_xlabel('Hubble Constant $H_0$ [km/s/Mpc]', fontsize=11)
+    ax4.set_ylabel('Structure Growth $S_8$', fontsize=11)
+    ax4.set_title('(D) Joint Parameter Space: Simultaneous Resolution', fontsize=12, fontweight='bold')
+    ax4.set_xlim(65, 75)
+    ax4.set_ylim(0.75, 0.86)
+    ax4.grid(alpha=0.3, linestyle=':')
+    ax4.legend(loc='upper left', fontsize=9)
+
+    # Add CSGT annotation
+    ax4.annotate('CSGT:\nInfo Balance',
+                xy=(H0_fit, S8_fit), xytext=(72, 0.77),
+                fontsize=10, fontweight='bold', color='darkgreen',
+                arrowprops=dict(arrowstyle='->', color='green', lw=2),
+                bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.8))
+
+    # Overall title
+    fig.suptitle('CSGT Comprehensive Analysis: Future Boundary Information Coherence',
+                 fontsize=15, fontweight='bold', y=0.995)
+    return fig
+
+if __name__ == "__main__":
+    fig = render({name: compute() for name, compute in PANELS.items()})
+    fig.savefig('csgt_comprehensive_analysis.png', dpi=300, bbox_inches='tight')
+    print("✓ Comprehensive 4-panel analysis created!")
+    print("  Panel A: Coherence C(z) evolution with recombination lag")
+    print("  Panel B: Residuals showing energy transfer")
+    print("  Panel C: BAO consistency via phase shift compensation")
+    print("  Panel D: Joint H0-S8 parameter space resolution")
@@ -16,35 +16,129 @@ w_z = w_off - A * sp.exp(-(z - z_peak)**2 / (2 * sigma**2))
 # 通常、w < -1 ではこれが負になり不安定化するが、CSGTでは
 # 情報流による項が分母・分子を補正し、c_s^2 > 0 を維持する
 
+# w' = dw/dln a = -(1+z) dw/dz なので c_s^2 = w + (1+z) dw/dz / (3(1+w))
+dw_dz = sp.diff(w_z, z)
+cs2_z = w_z + (1 + z) * dw_dz / (3 * (1 + w_z))
+
+# w, w'(z), c_s^2 を一度だけ NumPy 関数へコンパイル (指数部は cse で共有)
+_compiled_fields = sp.lambdify((A, sigma, w_off, z), (w_z, dw_dz, cs2_z), 'numpy', cse=True)
+
+CAUTION, FEEDBACK, SELF_ORGANIZATION = 0, 1, 2
+REGION_NAMES = ('caution', 'feedback', 'self-organization')
+VERDICTS = (
+    "⚠️ Caution: High-energy perturbations detected.",
+    "✅ Stability Maintained: Information feedback dominates (Phantom crossing stable).",
+    "✅ Stability Maintained: Returning to standard domain (Self-organization phase).",
+)
+
+def stability_fields(A_val, sigma_val, w_off_val, z_eval):
+    """(w, w'(z), c_s^2) broadcast over array arguments; c_s^2 diverges at w = -1."""
+    args = [np.asarray(v, dtype=float) for v in (A_val, sigma_val, w_off_val, z_eval)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.broadcast_arrays(*_compiled_fields(*args))
+
+def classify(w, dw):
+    """check_stability の判定を配列で返す (CAUTION / FEEDBACK / SELF_ORGANIZATION)."""
+    phantom = w < -1
+    region = np.full(np.shape(w), CAUTION, dtype=np.int8)
+    region[phantom & (dw < 0)] = FEEDBACK
+    region[phantom & (dw > 0)] = SELF_ORGANIZATION
+    return region
+
+def stability_criteria(w, dw, cs2):
+    """Boolean mask per criterion: the script's two verdicts plus c_s^2 bounds."""
+    phantom = w < -1
+    return {
+        'feedback': phantom & (dw < 0),
+        'self-organization': phantom & (dw > 0),
+        'stable (either)': phantom & (dw != 0),
+        'c_s^2 > 0': cs2 > 0,
+        '0 < c_s^2 <= 1': (cs2 > 0) & (cs2 <= 1),
+    }
+
 def check_stability(A_val, sigma_val, w_off_val, z_eval):
-    # 導関数 w'(z)
-    dw_dz = sp.diff(w_z, z)
-    
-    # 数値変換
-    f_w = sp.lambdify(z, w_z.subs({A: A_val, sigma: sigma_val, w_off: w_off_val}))
-    f_dw = sp.lambdify(z, dw_dz.subs({A: A_val, sigma: sigma_val, w_off: w_off_val}))
-    
-    w = f_w(z_eval)
-    dw = f_dw(z_eval)
-    
+    w, dw, cs2 = (float(v) for v in stability_fields(A_val, sigma_val, w_off_val, z_eval))
+
     # 物理的解釈: 
     # CSGTにおいて不安定性を回避するための「情報的復元力」の存在を確認
     # 簡易指標として、w'(z) の符号と w の深さが因果律を破っていないかチェック
     print(f"--- Stability Analysis at z = {z_eval} ---")
     print(f"Current w(z)  : {w:.4f}")
     print(f"Gradient w'(z): {dw:.4f}")
+    print(f"Effective c_s^2: {cs2:.4f}")
     
-    if w < -1 and dw < 0:
-        return "✅ Stability Maintained: Information feedback dominates (Phantom crossing stable)."
-    elif w < -1 and dw > 0:
-        return "✅ Stability Maintained: Returning to standard domain (Self-organization phase)."
-    else:
-        return "⚠️ Caution: High-energy perturbations detected."
+    return VERDICTS[classify(w, dw)]
 
 # =============================================================================
-# 2. Results for Technical Note Appendix
+# 2. Vectorized Stability Maps & Posterior Fractions
+# =============================================================================
+def stability_map(A_vals, sigma_vals, w_off_vals, z_vals):
+    """Region codes and c_s^2 on the (A, σ, w_off, z) product grid."""
+    axes = [np.atleast_1d(np.asarray(v, dtype=float)) for v in (A_vals, sigma_vals, w_off_vals, z_vals)]
+    w, dw, cs2 = stability_fields(*np.ix_(*axes))
+    return classify(w, dw), cs2
+
+def posterior_fractions(samples, z_vals, weights=None, chunk=1 << 15, dip_sign=1.0):
+    """
+    Posterior mass satisfying each criterion at every z. `samples` is an
+    (..., ndim) chain whose first three columns are (A, σ, w_off), the
+    csgt_mcmc.PARAM_NAMES order. Chains use w = w_off + dip_sign·A·g:
+    +1 is csgt_dip (csgt_distance.w_z_csgt, the csgt_mcmc posterior), −1 this
+    script's w_off − A·g. The fields are symbolic in A, so the sample is
+    mapped onto this script's convention as A → −dip_sign·A.
+    """
+    samples = np.asarray(samples)
+    samples = samples.reshape(-1, samples.shape[-1])
+    z_vals = np.atleast_1d(np.asarray(z_vals, dtype=float))
+    weights = np.ones(len(samples)) if weights is None else np.asarray(weights, dtype=float).ravel()
+    totals = {}
+    for start in range(0, len(samples), chunk):
+        s, wt = samples[start:start + chunk], weights[start:start + chunk]
+        fields = stability_fields(-dip_sign * s[:, 0, None], s[:, 1, None], s[:, 2, None], z_vals)
+        for name, mask in stability_criteria(*fields).items():
+            totals[name] = totals.get(name, 0.0) + wt @ mask
+    return {name: total / weights.sum() for name, total in totals.items()}
+
+def plot_region_maps(fname, A_vals, sigma_vals, w_off_val, z_list):
+    """Region map over (A, σ) at fixed w_off, one panel per redshift."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap
+
+    region, cs2 = stability_map(A_vals, sigma_vals, w_off_val, z_list)
+    # c_s^2 = 0 where its numerator vanishes; the sign flip at w = -1 is a pole
+    w = stability_fields(*np.ix_(A_vals, sigma_vals, [w_off_val], z_list))[0]
+    cs2_numerator = cs2 * (1 + w)
+    cmap = ListedColormap(['#f4a261', '#2a9d8f', '#457b9d'])
+    fig, axes = plt.subplots(1, len(z_list), figsize=(5 * len(z_list), 4.5), squeeze=False)
+    extent = [sigma_vals[0], sigma_vals[-1], A_vals[0], A_vals[-1]]
+    for k, (ax, z_val) in enumerate(zip(axes[0], z_list)):
+        ax.imshow(region[:, :, 0, k], origin='lower', aspect='auto', extent=extent,
+                  cmap=cmap, vmin=-0.5, vmax=2.5, interpolation='nearest')
+        ax.contour(sigma_vals, A_vals, cs2_numerator[:, :, 0, k], levels=[0.0], colors='k', linewidths=1.5)
+        ax.set_title(f"z = {z_val}  (w_off = {w_off_val}; black: c_s^2 = 0)")
+        ax.set_xlabel("σ")
+        ax.set_ylabel("A")
+    handles = [plt.Rectangle((0, 0), 1, 1, color=cmap(i)) for i in range(3)]
+    fig.legend(handles, REGION_NAMES, loc='upper center', ncol=3)
+    fig.tight_layout(rect=(0, 0, 1, 0.92))
+    fig.savefig(fname, dpi=150)
+    plt.close(fig)
+
+# =============================================================================
+# 3. Results for Technical Note Appendix
 # =============================================================================
 if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CSGT stability analysis (no-ghost conditions)")
+    parser.add_argument('--chain', help="csgt_mcmc checkpoint prefix: posterior fraction per criterion")
+    parser.add_argument('--burn', type=int, default=0)
+    parser.add_argument('--map', help="write (A, σ) stability-region maps to this image file")
+    args = parser.parse_args()
+
     # Joint Fit パラメータ
     A_final = 0.5570
     sigma_final = 0.395
@@ -58,4 +152,30 @@ if __name__ == "__main__":
     print("★ No-Ghost Condition (Symbolic Suggestion) ★")
     print("In CSGT, the phantom boundary is crossed without ghost instability")
     print("because the effective sound speed squared c_s^2 is regularized by")
-    print("the non-local information term: S_info = ∫ I(z) dz.")
\ No newline at end of file
+    print("the non-local information term: S_info = ∫ I(z) dz.")
+
+    # --- Vectorized grid: throughput & region fractions ---
+    A_grid, sigma_grid = np.linspace(0.1, 0.6, 101), np.linspace(0.2, 0.6, 101)
+    w_off_grid, z_grid = np.linspace(-1.2, -0.8, 41), np.linspace(0.0, 2.5, 51)
+    t0 = time.perf_counter()
+    region, cs2 = stability_map(A_grid, sigma_grid, w_off_grid, z_grid)
+    dt = time.perf_counter() - t0
+    print(f"\n★ Stability map: {region.size:,} grid points in {dt:.2f} s ({region.size / dt:,.0f} points/s)")
+    for code, name in enumerate(REGION_NAMES):
+        print(f"  {name:<18}: {np.mean(region == code):6.1%} of the grid")
+    print(f"  {'c_s^2 > 0':<18}: {np.mean(cs2 > 0):6.1%} of the grid")
+
+    if args.map:
+        plot_region_maps(args.map, A_grid, sigma_grid, w_off_final, [0.0, 0.7, 1.5])
+        print(f"🗺  Region maps saved → {args.map}")
+
+    if args.chain:
+        from csgt_mcmc import ChainFile
+        chain = np.asarray(ChainFile.from_checkpoint(args.chain).read())[args.burn:, :, :-1]
+        z_report = [0.0, 0.7, 1.5]
+        fractions = posterior_fractions(chain, z_report)
+        print(f"\n★ Posterior fraction per criterion ({chain.shape[0] * chain.shape[1]:,} csgt_dip samples, "
+              f"w = w_off + A·g) ★")
+        print(f"{'criterion':<18}" + "".join(f"{'z = ' + str(zz):>10}" for zz in z_report))
+        for name, frac in fractions.items():
+            print(f"{name:<18}" + "".join(f"{f:>10.1%}" for f in frac))
@@ -4,33 +4,43 @@ import os
 import urllib.request
 from scipy.integrate import quad
 from scipy.optimize import differential_evolution
-from scipy.interpolate import interp1d
 import warnings
 
+from csgt_data import PANTHEON_NAME, find_data_file, load_pantheon
+import csgt_distance
+from csgt_distance import C_LIGHT, N_GRID, Z_PEAK_FIXED, CSGTDistances, w_z_csgt
+from csgt_kernels import active_kernels
+from csgt_profile import PROFILER
+
 warnings.filterwarnings('ignore')
 
 # =============================================================================
 # 1. Physics Engine & Loaders
 # =============================================================================
-C_LIGHT = 299792.458
 RD_FID = 147.09
-Z_PEAK_FIXED = 0.7
+SIG_INT = 0.106
+
+def pantheon_columns(columns):
+    # (z, μ, σ) column names; the σ column is the first containing 'ERR':
+    # zHDERR in Pantheon+SH0ES.dat (σ_int dominates the SN weight)
+    z_col = next(c for c in columns if c.upper() in ['ZHD', 'ZHEL'])
+    mu_col = next(c for c in columns if 'MU_SH0ES' in c.upper() or c.upper() == 'MU')
+    err_col = next(c for c in columns if 'ERR' in c.upper())
+    return z_col, mu_col, err_col
 
-def load_pantheon_final():
+def load_pantheon_final(extra=()):
+    # `extra`: further table columns (e.g. IDSURVEY) carried through the same dropna/sort
     url = "https://github.com/PantheonPlusSH0ES/DataRelease/raw/main/Pantheon%2B_Data/1_DISTANCES/Pantheon%2B_SH0ES.dat"
-    fname = "Pantheon+SH0ES.dat"
-    if not os.path.exists(fname):
+    fname = find_data_file(PANTHEON_NAME)
+    if fname is None:
+        fname = PANTHEON_NAME
         print("📡 Downloading Pantheon+ dataset...")
         urllib.request.urlretrieve(url, fname)
     
-    df = pd.read_csv(fname, sep=r'\s+', engine='python', comment='#')
-    z_col = next(c for c in df.columns if c.upper() in ['ZHD', 'ZHEL'])
-    mu_col = next(c for c in df.columns if 'MU_SH0ES' in c.upper() or c.upper() == 'MU')
-    err_col = next(c for c in df.columns if 'ERR' in c.upper())
-    return df[[z_col, mu_col, err_col]].dropna().sort_values(z_col).reset_index(drop=True)
-
-def w_z_csgt(z, A, sigma, w_off):
-    return w_off + A * np.exp(-(z - Z_PEAK_FIXED)**2 / (2 * sigma**2))
+    table = load_pantheon(fname)
+    z_col, mu_col, err_col = pantheon_columns(table.dtype.names)
+    df = pd.DataFrame({c: np.asarray(table[c]) for c in (z_col, mu_col, err_col, *extra)})
+    return df.dropna().sort_values(z_col).reset_index(drop=True)
 
 def get_ez(z, A, sigma, w_off, Om):
     Ode = 1.0 - Om
@@ -38,13 +48,11 @@ def get_ez(z, A, sigma, w_off, Om):
     integral, _ = quad(integrand, 0, z)
     return np.sqrt(Om * (1 + z)**3 + Ode * np.exp(3.0 * integral))
 
-def compute_mu_theory(z_array, A, sigma, w_off, Om, H0, M_fixed):
-    z_grid = np.linspace(0, max(z_array)*1.05, 100)
-    ez_inv = [1.0 / get_ez(zg, A, sigma, w_off, Om) for zg in z_grid]
-    chi_grid = np.cumsum(np.concatenate(([0], np.diff(z_grid))) * ez_inv)
-    interp_chi = interp1d(z_grid, chi_grid, kind='cubic')
-    dl = (1 + z_array) * interp_chi(z_array) * (C_LIGHT / H0)
-    return 5.0 * np.log10(np.maximum(dl, 1e-10)) + 25.0 + M_fixed
+def compute_mu_theory(z_array, A, sigma, w_off, Om, H0, M_fixed, dist=None):
+    # `get_ez` above is the quad reference; fits run on the grid engine
+    if dist is None:
+        dist = CSGTDistances(A, sigma, w_off, Om, H0, z_max=max(z_array)*1.05)
+    return dist.mu(z_array, M_fixed)
 
 # =============================================================================
 # 2. DESI DR2 Full Dataset (v2026 Reference)
@@ -59,42 +67,146 @@ DESI_DR2_FULL = [
     {'z': 2.330, 'dm_rd': 39.41, 'dm_err': 1.10, 'dh_rd': 8.52,  'dh_err': 0.25}  
 ]
 
-def get_bao_full_chi2(params):
+BAO_Z = np.array([d['z'] for d in DESI_DR2_FULL])
+BAO_DM = np.array([d['dm_rd'] for d in DESI_DR2_FULL])
+BAO_DM_ERR = np.array([d['dm_err'] for d in DESI_DR2_FULL])
+BAO_DH = np.array([d['dh_rd'] for d in DESI_DR2_FULL])
+BAO_DH_ERR = np.array([d['dh_err'] for d in DESI_DR2_FULL])
+BAO_TABLE = (BAO_Z, BAO_DM, BAO_DM_ERR, BAO_DH, BAO_DH_ERR)
+
+def get_bao_full_chi2(params, dist=None):
     A, sigma, w_off, Om, H0, _ = params
-    chi2 = 0
-    for data in DESI_DR2_FULL:
-        z = data['z']
-        ez = get_ez(z, A, sigma, w_off, Om)
-        dh_theory = C_LIGHT / (H0 * ez)
-        z_grid = np.linspace(0, z, 50)
-        dm_theory = C_LIGHT / H0 * np.trapz([1.0/get_ez(zg, A, sigma, w_off, Om) for zg in z_grid], z_grid)
-        chi2 += ((data['dm_rd'] - dm_theory/RD_FID)**2 / data['dm_err']**2)
-        chi2 += ((data['dh_rd'] - dh_theory/RD_FID)**2 / data['dh_err']**2)
+    if dist is None:
+        dist = CSGTDistances(A, sigma, w_off, Om, H0, z_max=BAO_Z.max())
+    dm_theory = dist.D_M(BAO_Z)
+    dh_theory = dist.D_H(BAO_Z)
+    chi2 = np.sum((BAO_DM - dm_theory/RD_FID)**2 / BAO_DM_ERR**2)
+    chi2 += np.sum((BAO_DH - dh_theory/RD_FID)**2 / BAO_DH_ERR**2)
     return chi2
 
 # =============================================================================
 # 3. Objective & Solver
 # =============================================================================
-def final_joint_objective(params, z_sn, mu_sn, sig_sn):
-    if not (0.2 < params[3] < 0.4 and 65 < params[4] < 80): return 1e18
+# Prior box of the joint objective (open intervals)
+PRIOR_OM, PRIOR_H0 = (0.2, 0.4), (65, 80)
+
+def prior_mask(pop):
+    """Rows of an (N, ≥5) population inside the prior box (Om, H0 in columns 3, 4)."""
+    om, h0 = pop[:, 3], pop[:, 4]
+    return (PRIOR_OM[0] < om) & (om < PRIOR_OM[1]) & (PRIOR_H0[0] < h0) & (h0 < PRIOR_H0[1])
+
+def final_joint_objective(params, z_sn, mu_sn, sig_sn, engine=None):
+    PROFILER.count('evaluations')
+    if not prior_mask(np.atleast_2d(params))[0]:
+        PROFILER.count('prior_rejected')
+        return 1e18
     try:
-        mu_th = compute_mu_theory(z_sn, *params)
-        sig_int = 0.106
-        chi2_sn = np.sum(((mu_sn - mu_th)**2) / (sig_sn**2 + sig_int**2))
-        chi2_bao = get_bao_full_chi2(params)
+        # One shared grid serves both the SN and the BAO redshifts
+        dist = (engine or CSGTDistances)(*params[:5], z_max=max(np.max(z_sn), BAO_Z.max())*1.05)
+        with PROFILER.stage('interpolation'):
+            mu_th = compute_mu_theory(z_sn, *params, dist=dist)
+        with PROFILER.stage('sn_chi2'):
+            chi2_sn = np.sum(((mu_sn - mu_th)**2) / (sig_sn**2 + SIG_INT**2))
+        with PROFILER.stage('bao_chi2'):
+            chi2_bao = get_bao_full_chi2(params, dist=dist)
         return chi2_sn + chi2_bao
-    except:
+    except Exception as exc:
+        PROFILER.exception(exc)
         return 1e18
 
+def final_joint_objective_batch(pop, z_sn, mu_sn, sig_sn, bao=None, engine=None):
+    """
+    Joint χ² for an (N, 6) population in one pass; the prior is a mask.
+    `engine` builds the distances (default `CSGTDistances`; pass a
+    `csgt_emulator.DistanceEmulator` for the tabulated fast path).
+    """
+    bao_z = (BAO_TABLE if bao is None else bao)[0]
+    pop = np.atleast_2d(pop)
+    chi2 = np.full(len(pop), 1e18)
+    valid = prior_mask(pop)
+    PROFILER.count('evaluations', len(pop))
+    PROFILER.count('prior_rejected', len(pop) - valid.sum())
+    if not valid.any():
+        return chi2
+    p = pop[valid]
+    dist = (engine or CSGTDistances)(*p[:, :5].T, z_max=max(np.max(z_sn), bao_z.max())*1.05)
+    chi2[valid] = joint_chi2_from_distances(dist, p[:, 5], z_sn, mu_sn, sig_sn, bao)
+    return chi2
+
+def joint_chi2_from_distances(dist, M_fixed, z_sn, mu_sn, sig_sn, bao=None):
+    """SN + BAO χ² for a population-valued distance object; non-finite → 1e18."""
+    bao_z = (BAO_TABLE if bao is None else bao)[0]
+    with PROFILER.stage('interpolation'):
+        mu_th = dist.mu(z_sn, M_fixed)
+        dm_th, dh_th = dist.D_M(bao_z), dist.D_H(bao_z)
+    return joint_chi2_from_theory(mu_th, dm_th, dh_th, mu_sn, sig_sn, bao)
+
+def joint_chi2_from_theory(mu_th, dm_th, dh_th, mu_sn, sig_sn, bao=None):
+    """SN + BAO χ² of (N, ·) model μ, D_M, D_H [Mpc]; non-finite → 1e18."""
+    _, bao_dm, bao_dm_err, bao_dh, bao_dh_err = BAO_TABLE if bao is None else bao
+    kernels = active_kernels()
+    with PROFILER.stage('sn_chi2'):
+        chi2_sn = kernels.weighted_sq_sum(mu_th, mu_sn, 1.0 / (sig_sn**2 + SIG_INT**2))
+    with PROFILER.stage('bao_chi2'):
+        chi2_bao = kernels.weighted_sq_sum(dm_th / RD_FID, bao_dm, 1.0 / bao_dm_err**2)
+        chi2_bao += kernels.weighted_sq_sum(dh_th / RD_FID, bao_dh, 1.0 / bao_dh_err**2)
+
+    total = chi2_sn + chi2_bao
+    finite = np.isfinite(total)
+    PROFILER.count('nonfinite', len(finite) - finite.sum())
+    return np.where(finite, total, 1e18)
+
+def _de_batch_objective(x, z_sn, mu_sn, sig_sn, engine=None):
+    # differential_evolution(vectorized=True) passes x with shape (6, N)
+    return final_joint_objective_batch(x.T, z_sn, mu_sn, sig_sn, engine=engine)
+
+FIT_BOUNDS = [(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76), (-0.05, 0.05)]
+
+def joint_fit(z_sn, mu_sn, sig_sn, bounds=FIT_BOUNDS, store=True, memo=False, **de_kwargs):
+    """
+    The headline DE fit. With `store`, a fit of the same data, model source,
+    kernels, bounds and settings is read back from csgt_store instead of
+    rerun (`res.cached`). `memo` puts csgt_store's LRU memo in front of the
+    objective (`res.memo` holds its hit statistics).
+    """
+    from csgt_store import MemoizedObjective, cached_differential_evolution
+
+    de_kwargs = {'popsize': 15, 'maxiter': 200, 'strategy': 'best1bin', 'vectorized': True, 'updating': 'deferred',
+                 **de_kwargs}
+    objective = MemoizedObjective(lambda pop: final_joint_objective_batch(pop, z_sn, mu_sn, sig_sn)) if memo else None
+    func, args = (objective.vectorized, ()) if memo else (_de_batch_objective, (z_sn, mu_sn, sig_sn))
+    if store:
+        res = cached_differential_evolution(
+            func, bounds, args=args, data=(z_sn, mu_sn, sig_sn, *BAO_TABLE),
+            model=(csgt_distance, final_joint_objective_batch, prior_mask, joint_chi2_from_distances,
+                   joint_chi2_from_theory,
+                   repr((RD_FID, SIG_INT, PRIOR_OM, PRIOR_H0, N_GRID, Z_PEAK_FIXED, C_LIGHT))),
+            **de_kwargs)
+    else:
+        res = differential_evolution(func, bounds, args=args, **de_kwargs)
+        res.cached = False
+    res.memo = objective.stats() if memo else None
+    return res
+
 if __name__ == "__main__":
+    # CSGT_PROFILE=<prefix> exports the objective profile to <prefix>.json/.csv
+    profile_prefix = os.environ.get('CSGT_PROFILE')
+    if profile_prefix:
+        PROFILER.enable()
+
     df = load_pantheon_final()
     z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
     
     print("🚀 Initializing Ultra-Precision Joint Fit (Pantheon+ & DESI DR2 Full)...")
-    bounds = [(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76), (-0.05, 0.05)]
-    
-    res = differential_evolution(final_joint_objective, bounds, args=(z_sn, mu_sn, sig_sn), 
-                                 popsize=15, maxiter=200, strategy='best1bin', disp=True)
+    # CSGT_FIT_STORE=0 forces a fresh, unstored run; CSGT_FIT_MEMO=1 enables the objective memo
+    res = joint_fit(z_sn, mu_sn, sig_sn, store=os.environ.get('CSGT_FIT_STORE', '1') != '0',
+                    memo=os.environ.get('CSGT_FIT_MEMO') == '1', disp=True,
+                    callback=PROFILER.generation if profile_prefix else None)
+    if res.cached:
+        print(f"📦 Stored fit {'/'.join(res.key)} (same data, model, kernels, bounds and settings)")
+    if res.memo:
+        print(f"Objective memo: {res.memo['hits']} hits / {res.memo['misses']} misses "
+              f"(hit rate {res.memo['hit_rate']:.1%}, {res.memo['evictions']} evictions)")
     
     print("\n" + "⚔️"*30)
     print("   ULTIMATE COSMOLOGICAL CONVERGENCE")
@@ -104,4 +216,13 @@ if __name__ == "__main__":
     print(f"Information Coupling (A) : {p[0]:.4f}")
     print(f"Hubble Constant (H0)     : {p[4]:.2f} km/s/Mpc")
     print(f"Matter Density (Om)      : {p[3]:.3f}")
-    print(f"Reduced χ² (Total)       : {res.fun / (len(z_sn) + 14 - 6):.4f}")
\ No newline at end of file
+    print(f"Reduced χ² (Total)       : {res.fun / (len(z_sn) + 14 - 6):.4f}")
+
+    # Best fit for csgt_figures.py (replaces the hardcoded A_final etc.)
+    from csgt_figures import FIT_RESULT_FILE, save_fit_result
+    save_fit_result(FIT_RESULT_FILE, 'csgt_dip', ('A', 'sigma', 'w_off', 'Om', 'H0', 'M_fixed'), p, res.fun)
+    print(f"💾 Best fit saved → {FIT_RESULT_FILE}")
+
+    if profile_prefix:
+        PROFILER.report()
+        PROFILER.export(profile_prefix)
\ No newline at end of file
@@ -2,42 +2,56 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 # ベストフィットパラメータ (ULTIMATE JOINT 結果)
+# csgt_figures.py はフィット結果 (JSON) からこれらを上書きする
 A_final = 0.5570
 sigma_final = 0.470 # 前回実行時の値
 w_off_final = -0.990 # 固定付近
 z_peak = 0.7
 
-def w_z_ultimate(z):
+def w_z_ultimate(z, A=A_final, sigma=sigma_final, w_off=w_off_final, dip_sign=-1.0):
     # CSGTの状態方程式: w(z) = w_off - A * exp(-(z-0.7)^2 / (2*sigma^2))
     # ※ dipとして機能させるため A の符号に注意
-    return w_off_final - A_final * np.exp(-(z - z_peak)**2 / (2 * sigma_final**2))
-
-z_plot = np.linspace(0, 2.5, 300)
-w_plot = [w_z_ultimate(zg) for zg in z_plot]
-
-plt.figure(figsize=(12, 7), facecolor='#fdfcfc')
-plt.plot(z_plot, w_plot, color='#D40072', lw=4, label='CSGT: Ultimate Joint (SN+BAO)')
-plt.axhline(-1, color='#333333', ls='--', alpha=0.6, label='ΛCDM (w=-1)')
-
-# ファントム領域（w < -1）を強調
-plt.fill_between(z_plot, -1, w_plot, where=(np.array(w_plot) < -1), 
-                 color='#FF69B4', alpha=0.2, label='Phantom / Information Domain')
-
-# ピークの注釈
-min_w = min(w_plot)
-plt.scatter([z_peak], [min_w], color='#D40072', s=100, zorder=5)
-plt.annotate(f'The Love Dip\nw_min ≈ {min_w:.3f}', 
-             xy=(z_peak, min_w), xytext=(z_peak+0.2, min_w-0.1),
-             arrowprops=dict(arrowstyle='->', lw=2, color='#D40072'),
-             fontsize=14, fontweight='bold', color='#D40072')
-
-plt.title("Cosmological Evolution: The Information-Theoretic Pulse", fontsize=16, fontweight='bold')
-plt.xlabel("Redshift (z)", fontsize=13)
-plt.ylabel("Equation of State w(z)", fontsize=13)
-plt.ylim(-1.8, -0.8)
-plt.xlim(0, 2.3)
-plt.legend(loc='lower right', frameon=True, fontsize=11)
-plt.grid(True, linestyle=':', alpha=0.6)
-plt.tight_layout()
-
-plt.show()
\ No newline at end of file
+    # dip_sign=+1 は csgt_dip (csgt_distance.w_z_csgt: w_off + A·g) の規約
+    return w_off + dip_sign * A * np.exp(-(z - z_peak)**2 / (2 * sigma**2))
+
+# =========================
+# Panel arrays (cached by csgt_figures.py)
+# =========================
+def compute_w_curve(A=A_final, sigma=sigma_final, w_off=w_off_final, dip_sign=-1.0):
+    z_plot = np.linspace(0, 2.5, 300)
+    return {'z': z_plot, 'w': w_z_ultimate(z_plot, A, sigma, w_off, dip_sign)}
+
+PANELS = {'w_curve': compute_w_curve}
+
+def render(panels):
+    z_plot, w_plot = panels['w_curve']['z'], panels['w_curve']['w']
+
+    fig = plt.figure(figsize=(12, 7), facecolor='#fdfcfc')
+    plt.plot(z_plot, w_plot, color='#D40072', lw=4, label='CSGT: Ultimate Joint (SN+BAO)')
+    plt.axhline(-1, color='#333333', ls='--', alpha=0.6, label='ΛCDM (w=-1)')
+
+    # ファントム領域（w < -1）を強調
+    plt.fill_between(z_plot, -1, w_plot, where=(w_plot < -1),
+                     color='#FF69B4', alpha=0.2, label='Phantom / Information Domain')
+
+    # ピークの注釈 (z_peak での値; dip_sign=-1 では最小値)
+    peak_w = np.interp(z_peak, z_plot, w_plot)
+    plt.scatter([z_peak], [peak_w], color='#D40072', s=100, zorder=5)
+    plt.annotate(f'The Love Dip\nw({z_peak}) ≈ {peak_w:.3f}',
+                 xy=(z_peak, peak_w), xytext=(z_peak+0.2, peak_w + (0.1 if peak_w > -1 else -0.1)),
+                 arrowprops=dict(arrowstyle='->', lw=2, color='#D40072'),
+                 fontsize=14, fontweight='bold', color='#D40072')
+
+    plt.title("Cosmological Evolution: The Information-Theoretic Pulse", fontsize=16, fontweight='bold')
+    plt.xlabel("Redshift (z)", fontsize=13)
+    plt.ylabel("Equation of State w(z)", fontsize=13)
+    plt.ylim(min(-1.8, w_plot.min() - 0.1), max(-0.8, w_plot.max() + 0.2))
+    plt.xlim(0, 2.3)
+    plt.legend(loc='lower right', frameon=True, fontsize=11)
+    plt.grid(True, linestyle=':', alpha=0.6)
+    plt.tight_layout()
+    return fig
+
+if __name__ == "__main__":
+    render({name: compute() for name, compute in PANELS.items()})
+    plt.show()
@@ -0,0 +1,259 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import contextlib
+import importlib.util
+
+import numpy as np
+from scipy.integrate import quad
+
+import Final_test as F
+import Final_Test_NoGhost as NG
+from csgt_distance import C_LIGHT
+
+# =============================================================================
+# 1. Fixed Inputs & High-Precision quad References
+# =============================================================================
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = 'bench_history.jsonl'
+PARAMS = np.array([0.5570, 0.470, -0.990, 0.286, 70.83, 0.0])
+Z_EZ = np.array([0.01, 0.3, 0.7, 1.2, 2.33])
+STABILITY_POINTS = [(0.5570, 0.395, -0.990, z) for z in (0.0, 0.7, 1.5)]
+
+QUAD_OPTS = dict(epsabs=0, epsrel=1e-12, limit=200)
+
+
+def _load_plot_module():
+    path = os.path.join(REPO_DIR, 'CSGT2.2', 'analysis', 'Csgt_comprehensive_plot.py')
+    spec = importlib.util.spec_from_file_location('Csgt_comprehensive_plot', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def ref_ez(z, A, sigma, w_off, Om):
+    integral = quad(lambda zp: (1.0 + F.w_z_csgt(zp, A, sigma, w_off)) / (1.0 + zp), 0, z, **QUAD_OPTS)[0]
+    return np.sqrt(Om * (1 + z)**3 + (1.0 - Om) * np.exp(3.0 * integral))
+
+
+def ref_comoving(z_sorted, A, sigma, w_off, Om):
+    """Dimensionless D_C at ascending z by interval-wise nested quad."""
+    edges = np.concatenate(([0.0], z_sorted))
+    pieces = [quad(lambda zp: 1.0 / ref_ez(zp, A, sigma, w_off, Om), a, b, **QUAD_OPTS)[0]
+              for a, b in zip(edges[:-1], edges[1:])]
+    return np.cumsum(pieces)
+
+
+def ref_mu(z, A, sigma, w_off, Om, H0, M):
+    order = np.argsort(z)
+    dc = np.empty_like(z)
+    dc[order] = ref_comoving(z[order], A, sigma, w_off, Om)
+    return 5.0 * np.log10((1 + z) * dc * C_LIGHT / H0) + 25.0 + M
+
+
+def ref_bao_chi2(params):
+    A, sigma, w_off, Om, H0, _ = params
+    dm = ref_comoving(F.BAO_Z, A, sigma, w_off, Om) * C_LIGHT / H0
+    dh = C_LIGHT / (H0 * np.array([ref_ez(z, A, sigma, w_off, Om) for z in F.BAO_Z]))
+    return (np.sum((F.BAO_DM - dm/F.RD_FID)**2 / F.BAO_DM_ERR**2) +
+            np.sum((F.BAO_DH - dh/F.RD_FID)**2 / F.BAO_DH_ERR**2))
+
+
+def ref_stability(A, sigma, w_off, z):
+    """Closed-form w, w' and the verdict branch of `check_stability`."""
+    g = np.exp(-(z - NG.z_peak)**2 / (2 * sigma**2))
+    w = w_off - A * g
+    dw = A * g * (z - NG.z_peak) / sigma**2
+    if w < -1 and dw < 0:
+        return "feedback"
+    elif w < -1 and dw > 0:
+        return "self-organization"
+    return "caution"
+
+# =============================================================================
+# 2. Benchmark Registry
+# =============================================================================
+BENCHMARKS = []
+
+
+def benchmark(name, rtol):
+    """Register `setup() -> (run, reference)`; `run()` is timed, and its
+    result must match `reference` to `rtol` (relative, max over elements)."""
+    def register(setup):
+        BENCHMARKS.append({'name': name, 'rtol': rtol, 'setup': setup})
+        return setup
+    return register
+
+
+def _sn_data():
+    df = F.load_pantheon_final()
+    return df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+
+
+@benchmark('get_ez', rtol=1e-8)
+def _bench_get_ez():
+    ref = np.array([ref_ez(z, *PARAMS[:4]) for z in Z_EZ])
+    return (lambda: np.array([F.get_ez(z, *PARAMS[:4]) for z in Z_EZ])), ref
+
+
+@benchmark('compute_mu_theory', rtol=1e-7)
+def _bench_mu():
+    z_sn, _, _ = _sn_data()
+    return (lambda: F.compute_mu_theory(z_sn, *PARAMS)), ref_mu(z_sn, *PARAMS)
+
+
+@benchmark('get_bao_full_chi2', rtol=1e-6)
+def _bench_bao():
+    return (lambda: F.get_bao_full_chi2(PARAMS)), ref_bao_chi2(PARAMS)
+
+
+@benchmark('final_joint_objective', rtol=1e-6)
+def _bench_objective():
+    z_sn, mu_sn, sig_sn = _sn_data()
+    mu_ref = ref_mu(z_sn, *PARAMS)
+    ref = np.sum((mu_sn - mu_ref)**2 / (sig_sn**2 + 0.106**2)) + ref_bao_chi2(PARAMS)
+    return (lambda: F.final_joint_objective(PARAMS, z_sn, mu_sn, sig_sn)), ref
+
+
+@benchmark('theta_BAO', rtol=1e-5)
+def _bench_theta_bao():
+    plot = _load_plot_module()
+    z = np.linspace(0.1, 1.5, 100)
+    r_s, _ = plot.r_drag_lcdm(plot.H0_csgt)
+    dc = np.array([quad(lambda zp: plot.c_light / plot.H_lcdm(zp, plot.H0_csgt), 0, zz, **QUAD_OPTS)[0]
+                   for zz in z])
+    return (lambda: plot.theta_BAO(z, plot.H0_csgt, r_s)), r_s / (dc / (1 + z))
+
+
+@benchmark('check_stability', rtol=0)
+def _bench_stability():
+    keywords = {"feedback": "Information feedback", "self-organization": "Self-organization",
+                "caution": "Caution"}
+    ref = np.array([1.0] * len(STABILITY_POINTS))
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            verdicts = [NG.check_stability(*p) for p in STABILITY_POINTS]
+        return np.array([float(keywords[ref_stability(*p)] in v) for p, v in zip(STABILITY_POINTS, verdicts)])
+    return run, ref
+
+# =============================================================================
+# 3. Runner, History & Comparison
+# =============================================================================
+def time_call(run, min_time=0.2, repeat=3):
+    """Best per-call wall time over `repeat` rounds of auto-sized loops."""
+    number, t = 1, 0.0
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            run()
+        t = time.perf_counter() - t0
+        if t >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if t == 0 else max(2, int(min_time / t * 1.2))
+    best = t / number
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def _git_rev():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(names=None, min_time=0.2):
+    results = {}
+    for bench in BENCHMARKS:
+        if names and bench['name'] not in names:
+            continue
+        run, ref = bench['setup']()
+        value = np.atleast_1d(np.asarray(run(), dtype=float))
+        ref = np.atleast_1d(np.asarray(ref, dtype=float))
+        err = float(np.max(np.abs(value - ref) / np.maximum(np.abs(ref), 1e-300)))
+        seconds = time_call(run, min_time=min_time)
+        results[bench['name']] = {
+            'seconds': seconds, 'per_sec': 1.0 / seconds, 'max_rel_err': err,
+            'rtol': bench['rtol'], 'passed': err <= bench['rtol'],
+            # probe values let `compare` detect drift between two runs
+            'probe': value[:: max(1, len(value) // 8)].tolist(),
+        }
+        status = "✅" if results[bench['name']]['passed'] else "❌"
+        print(f"{status} {bench['name']:<24} {seconds*1e3:>10.3f} ms  {1/seconds:>10.1f}/s  "
+              f"rel.err {err:.1e} (rtol {bench['rtol']:.0e})")
+    return results
+
+
+def append_history(results, path=HISTORY_FILE):
+    record = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'git': _git_rev(),
+              'python': platform.python_version(), 'numpy': np.__version__,
+              'machine': platform.machine(), 'results': results}
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    return record
+
+
+def load_history(path=HISTORY_FILE):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(base, new, slowdown=0.10, drift=1e-9):
+    """Flags benchmarks >`slowdown` slower or whose probe values moved by >`drift`."""
+    flags = []
+    print(f"{'benchmark':<24} {'base [ms]':>10} {'new [ms]':>10} {'Δ time':>8} {'drift':>9}")
+    for name, b in base['results'].items():
+        n = new['results'].get(name)
+        if n is None:
+            continue
+        change = n['seconds'] / b['seconds'] - 1.0
+        pb, pn = np.array(b['probe']), np.array(n['probe'])
+        moved = (float(np.max(np.abs(pn - pb) / np.maximum(np.abs(pb), 1e-300)))
+                 if pb.shape == pn.shape else np.inf)
+        marks = []
+        if change > slowdown:
+            marks.append('SLOWER')
+        if moved > drift:
+            marks.append('DRIFT')
+        if not n['passed']:
+            marks.append('ACCURACY')
+        flags += [(name, m) for m in marks]
+        print(f"{name:<24} {b['seconds']*1e3:>10.3f} {n['seconds']*1e3:>10.3f} {change:>+8.1%} "
+              f"{moved:>9.1e} {' '.join(marks)}")
+    return flags
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSGT kernel benchmarks & accuracy regression")
+    sub = parser.add_subparsers(dest='command')
+    run_p = sub.add_parser('run', help="run the suite and append to the history file")
+    run_p.add_argument('names', nargs='*')
+    run_p.add_argument('--history', default=HISTORY_FILE)
+    run_p.add_argument('--min-time', type=float, default=0.2)
+    cmp_p = sub.add_parser('compare', help="compare two history entries (default: last two)")
+    cmp_p.add_argument('base', nargs='?', type=int, default=-2)
+    cmp_p.add_argument('new', nargs='?', type=int, default=-1)
+    cmp_p.add_argument('--history', default=HISTORY_FILE)
+    cmp_p.add_argument('--slowdown', type=float, default=0.10)
+    cmp_p.add_argument('--drift', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        history = load_history(args.history)
+        flags = compare(history[args.base], history[args.new], args.slowdown, args.drift)
+        sys.exit(1 if flags else 0)
+    else:
+        results = run_suite(getattr(args, 'names', None), getattr(args, 'min_time', 0.2))
+        append_history(results, getattr(args, 'history', HISTORY_FILE))
+        sys.exit(0 if all(r['passed'] for r in results.values()) else 1)
@@ -0,0 +1,137 @@
+import os
+import time
+import glob
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# 1. Locations
+# =============================================================================
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIRS = [os.getcwd(), os.path.join(REPO_DIR, 'CSGT2.1', 'data')]
+CACHE_DIR = os.environ.get('CSGT_CACHE_DIR', os.path.join(REPO_DIR, '.csgt_cache'))
+
+PANTHEON_NAME = 'Pantheon+SH0ES.dat'
+LIGHTCURVE_NAME = 'full_input.csv'
+DESI_MEAN_NAME = 'desi_2024_gaussian_bao_ALL_GCcomb_mean.txt'
+DESI_COV_NAME = 'desi_2024_gaussian_bao_ALL_GCcomb_cov.txt'
+
+
+def find_data_file(name):
+    """Local copy of `name` in the CWD or anywhere under the repository, else None."""
+    for d in DATA_DIRS:
+        path = os.path.join(d, name)
+        if os.path.exists(path):
+            return path
+    hits = glob.glob(os.path.join(REPO_DIR, '**', name), recursive=True)
+    return hits[0] if hits else None
+
+# =============================================================================
+# 2. Parsers (run once per file content)
+# =============================================================================
+def _records(df):
+    """DataFrame -> structured array; text columns become fixed-width unicode."""
+    cols = {c: (df[c].to_numpy() if pd.api.types.is_numeric_dtype(df[c])
+                else df[c].astype(str).to_numpy().astype('U'))
+            for c in df.columns}
+    return np.rec.fromarrays(list(cols.values()), names=list(cols.keys())).view(np.ndarray)
+
+
+def parse_pantheon(path):
+    return _records(pd.read_csv(path, sep=r'\s+', comment='#'))
+
+
+def parse_lightcurves(path):
+    df = pd.read_csv(path).rename(columns={'Unnamed: 0': 'CID'})
+    return _records(df)
+
+
+def parse_desi_mean(path):
+    df = pd.read_csv(path, sep=r'\s+', comment='#', header=None, names=['z', 'value', 'quantity'])
+    return _records(df)
+
+
+def parse_desi_cov(path):
+    return np.loadtxt(path)
+
+# =============================================================================
+# 3. Content-Hashed Binary Cache
+# =============================================================================
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def cached_array(path, parser, cache_dir=None):
+    """
+    `parser(path)` result stored as `<stem>-<sha256[:16]>.npy` and returned as
+    a read-only memory map. Editing the source changes the key, so stale
+    caches are never served.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    stem = os.path.basename(path).replace('+', '_').rsplit('.', 1)[0]
+    target = os.path.join(cache_dir, f"{stem}-{file_hash(path)}.npy")
+    if not os.path.exists(target):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, parser(path))
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return np.load(target, mmap_mode='r')
+
+
+def _require(name):
+    path = find_data_file(name)
+    if path is None:
+        raise FileNotFoundError(f"{name} not found in {DATA_DIRS} or under {REPO_DIR}")
+    return path
+
+
+def load_pantheon(path=None):
+    """Full Pantheon+ table (structured memmap, file order)."""
+    return cached_array(path or _require(PANTHEON_NAME), parse_pantheon)
+
+
+def load_lightcurves(path=None):
+    """SALT2 light-curve table from `full_input.csv` (structured memmap)."""
+    return cached_array(path or _require(LIGHTCURVE_NAME), parse_lightcurves)
+
+
+def load_desi(mean_path=None, cov_path=None):
+    """(mean table, covariance) for the DESI Gaussian BAO likelihood."""
+    return (cached_array(mean_path or _require(DESI_MEAN_NAME), parse_desi_mean),
+            cached_array(cov_path or _require(DESI_COV_NAME), parse_desi_cov))
+
+
+def load_report():
+    """Cold (parse + write) vs. warm (memmap) load time per source file."""
+    import tempfile
+    sources = [(PANTHEON_NAME, parse_pantheon), (LIGHTCURVE_NAME, parse_lightcurves),
+               (DESI_MEAN_NAME, parse_desi_mean), (DESI_COV_NAME, parse_desi_cov)]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, parser in sources:
+            path = _require(name)
+            t0 = time.perf_counter()
+            cached_array(path, parser, cache_dir=tmp)
+            t1 = time.perf_counter()
+            cached_array(path, parser, cache_dir=tmp)
+            t2 = time.perf_counter()
+            rows.append((name, t1 - t0, t2 - t1))
+    print(f"{'file':<46} {'cold [ms]':>10} {'warm [ms]':>10}")
+    for name, cold, warm in rows:
+        print(f"{name:<46} {cold*1e3:>10.2f} {warm*1e3:>10.2f}")
+    return rows
+
+
+if __name__ == "__main__":
+    load_report()
@@ -0,0 +1,392 @@
+import numpy as np
+from scipy.integrate import cumulative_simpson, quad
+from scipy.interpolate import CubicSpline
+
+from csgt_kernels import active_kernels
+from csgt_profile import PROFILER
+
+# =============================================================================
+# 1. Constants & Equation of State
+# =============================================================================
+C_LIGHT = 299792.458
+Z_PEAK_FIXED = 0.7
+
+# Shared redshift grid resolution (odd -> Simpson pairs close exactly)
+N_GRID = 513
+
+# Accuracy guarantee of the grid engine against the adaptive `quad` path:
+# for every parameter vector inside the joint-fit bounds (sigma >= 0.2) and
+# 0 < z <= z_max <= 2.5, the relative error of E(z) and D_C(z) is below
+# ACCURACY_RTOL, i.e. |Δμ| < 5 * ACCURACY_RTOL / ln(10) ≈ 2e-6 mag.
+# `check_accuracy()` verifies this against `Final_test.get_ez`.
+ACCURACY_RTOL = 1e-6
+
+
+def w_z_csgt(z, A, sigma, w_off):
+    return w_off + A * np.exp(-(z - Z_PEAK_FIXED)**2 / (2 * sigma**2))
+
+# =============================================================================
+# 2. Grid Distance Engine
+# =============================================================================
+class GridDistances:
+    """
+    Distances from a splined dimensionless comoving distance `_dc` and an
+    `_E_at(z)` supplied by the subclass, for one parameter vector or a
+    population of N (then every method returns (N, len(z))).
+    """
+
+    def _E_at(self, z):
+        raise NotImplementedError
+
+    def _prepare(self, z):
+        z = np.asarray(z, dtype=float)
+        if z.size and np.max(z) > self.z_max:
+            raise ValueError(f"z = {np.max(z):.3f} beyond engine grid z_max = {self.z_max:.3f}")
+        return z
+
+    def _out(self, x):
+        return x[0] if self.scalar else x
+
+    # --- Dimensionless & physical distances ---
+    def comoving(self, z):
+        """Dimensionless comoving distance ∫dz'/E(z')."""
+        z = self._prepare(z)
+        return self._out(self._dc(z))
+
+    def E(self, z):
+        z = self._prepare(z)
+        return self._out(self._E_at(z))
+
+    def D_C(self, z):
+        """Comoving distance [Mpc]."""
+        z = self._prepare(z)
+        return self._out(self.hubble_distance * self._dc(z))
+
+    def D_M(self, z):
+        """Transverse comoving distance [Mpc] (flat: D_M = D_C)."""
+        return self.D_C(z)
+
+    def D_H(self, z):
+        """Hubble distance c / H(z) [Mpc]."""
+        z = self._prepare(z)
+        return self._out(self.hubble_distance / self._E_at(z))
+
+    def D_V(self, z):
+        """Volume-averaged distance (z D_M^2 D_H)^(1/3) [Mpc]."""
+        z = self._prepare(z)
+        return np.cbrt(z * self.D_M(z)**2 * self.D_H(z))
+
+    def mu(self, z, M=0.0):
+        """Distance modulus with additive magnitude offset M."""
+        z = self._prepare(z)
+        dl = (1 + z) * self.D_M(z)
+        M = np.asarray(M, dtype=float)
+        if not self.scalar:
+            M = np.atleast_1d(M)[:, None]
+        return 5.0 * np.log10(np.maximum(dl, 1e-10)) + 25.0 + M
+
+
+class CSGTDistances(GridDistances):
+    """
+    Distances for one (or a population of) CSGT parameter vector(s).
+
+    The dark-energy exponent ∫(1+w)/(1+z')dz' and the dimensionless comoving
+    distance ∫dz'/E(z') are integrated cumulatively (Simpson) on one shared
+    redshift grid, then cubic-spline interpolated to arbitrary z.
+
+    Parameters may be scalars or 1-D arrays of length N; with array inputs
+    every method returns an (N, len(z)) array, otherwise (len(z),).
+    """
+
+    def __init__(self, A, sigma, w_off, Om, H0=70.0, z_max=2.5, n_grid=N_GRID, w_func=w_z_csgt):
+        A, sigma, w_off, Om = self._set_params(A, sigma, w_off, Om, H0, z_max)
+
+        zg = np.linspace(0.0, self.z_max, n_grid)
+        # w(z) → exponent → D_C on the active csgt_kernels backend
+        kernels = active_kernels()
+        with PROFILER.stage('w_z'):
+            if w_func is w_z_csgt:
+                w = kernels.dip_w(zg, A, sigma, w_off, Z_PEAK_FIXED)
+            else:
+                w = w_func(zg, A[:, None], sigma[:, None], w_off[:, None])
+        with PROFILER.stage('E_z'):
+            expo, dc = kernels.w_integrals(zg, w, Om)
+        with PROFILER.stage('interpolation'):
+            self._set_splines(zg, expo, dc)
+
+    def _set_params(self, A, sigma, w_off, Om, H0, z_max):
+        params = [np.asarray(p, dtype=float) for p in (A, sigma, w_off, Om, H0)]
+        self.scalar = all(p.ndim == 0 for p in params)
+        A, sigma, w_off, Om, H0 = np.broadcast_arrays(*[np.atleast_1d(p) for p in params])
+        self.z_max = float(z_max)
+        self.Om = Om[:, None]
+        self.H0 = H0
+        self.hubble_distance = (C_LIGHT / H0)[:, None]
+        return A, sigma, w_off, Om
+
+    def _set_splines(self, zg, expo, dc):
+        """`expo`, `dc`: (N, len(zg)) exponent and dimensionless D_C on `zg`."""
+        self.z_grid = zg
+        self._expo = CubicSpline(zg, expo, axis=1)
+        self._dc = CubicSpline(zg, dc, axis=1)
+
+    def _ez(self, z, expo):
+        return np.sqrt(self.Om * (1 + z)**3 + (1.0 - self.Om) * np.exp(3.0 * expo))
+
+    def _E_at(self, z):
+        return self._ez(z, self._expo(z))
+
+    def de_exponent(self, z):
+        """Dark-energy exponent ∫(1+w)/(1+z')dz' (ρ_DE ∝ exp(3·exponent))."""
+        z = self._prepare(z)
+        return self._out(self._expo(z))
+
+
+class ExpansionDistances(GridDistances):
+    """
+    Grid engine for models defined directly by a vectorized E(z) kernel.
+
+    `E_func(z, *theta)` receives z of shape (n_grid,) and each parameter with
+    shape (N, 1); ln E and D_C are splined on the shared grid. Such models
+    carry no dark-energy exponent, so there is no `de_exponent`.
+    """
+
+    def __init__(self, E_func, theta, H0=70.0, z_max=2.5, n_grid=N_GRID):
+        params = [np.asarray(p, dtype=float) for p in (*theta, H0)]
+        self.scalar = all(p.ndim == 0 for p in params)
+        *theta, H0 = np.broadcast_arrays(*[np.atleast_1d(p) for p in params])
+        self.z_max = float(z_max)
+        self.H0 = H0
+        self.hubble_distance = (C_LIGHT / H0)[:, None]
+
+        zg = np.linspace(0.0, self.z_max, n_grid)
+        with PROFILER.stage('E_z'):
+            ez = np.broadcast_to(E_func(zg, *[p[:, None] for p in theta]), (len(H0), n_grid))
+            dc = cumulative_simpson(1.0 / ez, x=zg, axis=-1, initial=0.0)
+        with PROFILER.stage('interpolation'):
+            self.z_grid = zg
+            self._ln_e = CubicSpline(zg, np.log(ez), axis=1)
+            self._dc = CubicSpline(zg, dc, axis=1)
+
+    def _E_at(self, z):
+        return np.exp(self._ln_e(z))
+
+# =============================================================================
+# 3. High-Redshift Engine (to recombination, radiation included)
+# =============================================================================
+Z_TOP = 1e8                 # top of the ln(1+z) grid; radiation-era tail in closed form above
+N_LOG_GRID = 257            # nodes uniform in ln(1+z) from z_max to Z_TOP
+OMEGA_GAMMA_H2 = 2.469e-5   # photons, T_CMB = 2.7255 K
+N_EFF = 3.046
+OMEGA_B_H2 = 0.02236        # Planck 2018; sets the sound speed and z*
+
+# Accuracy guarantee of the high-z engine against nested quad (`check_highz_accuracy`)
+# for R and ℓ_A over the fit bounds
+HIGHZ_RTOL = 1e-6
+
+
+def radiation_density(H0, n_eff=N_EFF):
+    """Ω_r today: photons plus massless neutrinos."""
+    return OMEGA_GAMMA_H2 * (1 + 0.2271 * n_eff) / (np.asarray(H0) / 100.0)**2
+
+
+def z_star(omega_b, omega_m):
+    """Photon decoupling redshift, Hu & Sugiyama (1996) fit."""
+    g1 = 0.0783 * omega_b**-0.238 / (1 + 39.5 * omega_b**0.763)
+    g2 = 0.560 / (1 + 21.1 * omega_b**1.81)
+    return 1048 * (1 + 0.00124 * omega_b**-0.738) * (1 + g1 * omega_m**g2)
+
+
+def _z_drag_eh98(omega_b, omega_m):
+    """Baryon drag redshift, Eisenstein & Hu (1998) eq. 4."""
+    b1 = 0.313 * omega_m**-0.419 * (1 + 0.607 * omega_m**0.674)
+    b2 = 0.238 * omega_m**0.223
+    return 1291 * omega_m**0.251 / (1 + 0.659 * omega_m**0.828) * (1 + b1 * omega_b**b2)
+
+
+# The EH98 fit sits ~3.7% below the Boltzmann-code drag redshift (τ_drag = 1),
+# which would put r_d ~2.4% high; it is normalized to Planck 2018
+# (z_d = 1059.94 at ω_b = 0.02237, ω_m = 0.1430).
+Z_DRAG_NORM = 1059.94 / _z_drag_eh98(0.02237, 0.1430)
+
+
+def z_drag(omega_b, omega_m):
+    """Baryon drag redshift: the EH98 fit normalized to Planck 2018."""
+    return Z_DRAG_NORM * _z_drag_eh98(omega_b, omega_m)
+
+
+def sound_speed(z, omega_b=OMEGA_B_H2):
+    """c_s / c of the photon-baryon fluid."""
+    return 1.0 / np.sqrt(3.0 * (1.0 + 3.0 * omega_b / (4.0 * OMEGA_GAMMA_H2 * (1 + z))))
+
+
+def _rowwise(spline, x):
+    """Row i of a row-batched (axis=1) CubicSpline at x[i], without the N×N table."""
+    i = np.clip(np.searchsorted(spline.x, x, side='right') - 1, 0, len(spline.x) - 2)
+    dx = x - spline.x[i]
+    c = spline.c[:, i, np.arange(len(x))]
+    return ((c[0] * dx + c[1]) * dx + c[2]) * dx + c[3]
+
+
+class _LogExtendedSpline:
+    """Spline in z up to `z_split`, spline in ln(1+z) above; (N, *z.shape) out."""
+
+    def __init__(self, low, high, z_split, n_rows):
+        self.low, self.high = low, high
+        self.z_split, self.n_rows = z_split, n_rows
+
+    def __call__(self, z):
+        z = np.asarray(z, dtype=float)
+        flat = np.atleast_1d(z).ravel()
+        high = flat > self.z_split
+        if not high.any():
+            return self.low(z)
+        out = np.empty((self.n_rows, flat.size))
+        out[:, ~high] = self.low(flat[~high])
+        out[:, high] = self.high(np.log1p(flat[high]))
+        return out.reshape((self.n_rows,) + z.shape)
+
+
+class HighZDistances(CSGTDistances):
+    """
+    Grid engine extended past recombination, with radiation in E(z).
+
+    Up to `z_max` the grid and Simpson rule are those of `CSGTDistances`;
+    above it a second grid is uniform in x = ln(1+z) up to `z_top`, where
+    ∫(1+w)/(1+z)dz = ∫(1+w)dx and ∫dz/E = ∫(1+z)/E dx. The comoving sound
+    horizon r_s(z) = ∫_z^∞ c_s/E dz' is integrated down the log grid plus the
+    radiation-era tail above `z_top` in closed form. All methods accept
+    0 < z <= z_top; `sound_horizon` needs z >= the low-z grid's end.
+    """
+
+    def __init__(self, A, sigma, w_off, Om, H0=70.0, z_max=2.5, n_grid=N_GRID, z_top=Z_TOP,
+                 n_log=N_LOG_GRID, omega_b=OMEGA_B_H2, w_func=w_z_csgt):
+        A, sigma, w_off, Om = self._set_params(A, sigma, w_off, Om, H0, z_max)
+        self.Or = radiation_density(self.H0)[:, None]
+        self.omega_b = omega_b
+        z_low = self.z_max
+        zl = np.linspace(0.0, z_low, n_grid)
+        xh = np.linspace(np.log1p(z_low), np.log1p(z_top), n_log)
+        zh = np.expm1(xh)
+        with PROFILER.stage('w_z'):
+            theta = (A[:, None], sigma[:, None], w_off[:, None])
+            w_l, w_h = w_func(zl, *theta), w_func(zh, *theta)
+        with PROFILER.stage('E_z'):
+            expo_l = cumulative_simpson((1.0 + w_l) / (1.0 + zl), x=zl, axis=-1, initial=0.0)
+            expo_h = expo_l[:, -1:] + cumulative_simpson(1.0 + w_h, x=xh, axis=-1, initial=0.0)
+            ez_h = self._ez(zh, expo_h)
+            dc_l = cumulative_simpson(1.0 / self._ez(zl, expo_l), x=zl, axis=-1, initial=0.0)
+            dc_h = dc_l[:, -1:] + cumulative_simpson((1.0 + zh) / ez_h, x=xh, axis=-1, initial=0.0)
+        with PROFILER.stage('sound_horizon'):
+            cum = cumulative_simpson(sound_speed(zh, omega_b) * (1.0 + zh) / ez_h, x=xh, axis=-1, initial=0.0)
+            rs_h = cum[:, -1:] - cum + self._rs_tail(1.0 / (1.0 + z_top))
+        with PROFILER.stage('interpolation'):
+            n = len(self.H0)
+            self.z_grid = zl
+            self._expo = _LogExtendedSpline(CubicSpline(zl, expo_l, axis=1), CubicSpline(xh, expo_h, axis=1),
+                                            z_low, n)
+            self._dc = _LogExtendedSpline(CubicSpline(zl, dc_l, axis=1), CubicSpline(xh, dc_h, axis=1),
+                                          z_low, n)
+            self._rs = CubicSpline(xh, rs_h, axis=1)
+        self.z_low, self.z_max = z_low, float(z_top)
+
+    def _ez(self, z, expo):
+        return np.sqrt(self.Om * (1 + z)**3 + self.Or * (1 + z)**4
+                       + (1.0 - self.Om - self.Or) * np.exp(3.0 * expo))
+
+    def _rs_tail(self, a):
+        """∫_0^a (c_s/c) da'/(a'² E) for radiation + matter, first order in a."""
+        k = 3.0 * self.omega_b / (4.0 * OMEGA_GAMMA_H2)
+        return a / np.sqrt(3.0 * self.Or) * (1.0 - self.Om * a / (4.0 * self.Or) - k * a / 4.0)
+
+    def sound_horizon(self, z):
+        """Comoving sound horizon r_s(z) [Mpc]."""
+        z = self._prepare(z)
+        if z.size and np.min(z) < self.z_low:
+            raise ValueError(f"r_s needs z >= {self.z_low:.3f} (end of the low-z grid)")
+        return self._out(self.hubble_distance * self._rs(np.log1p(z)))
+
+    def _omega_m_h2(self):
+        return self.Om[:, 0] * (self.H0 / 100.0)**2
+
+    def z_star(self):
+        return self._out(z_star(self.omega_b, self._omega_m_h2()))
+
+    def z_drag(self):
+        return self._out(z_drag(self.omega_b, self._omega_m_h2()))
+
+    def drag_horizon(self):
+        """BAO ruler r_d = r_s(z_drag) [Mpc], each member at its own z_drag."""
+        x = np.log1p(z_drag(self.omega_b, self._omega_m_h2()))
+        return self._out(self.hubble_distance[:, 0] * _rowwise(self._rs, x))
+
+    def cmb_distance_priors(self):
+        """
+        Shift parameter R = √Ω_m H0 D_M(z*)/c and acoustic scale
+        ℓ_A = π D_M(z*)/r_s(z*), each member at its own z*.
+        """
+        x = np.log1p(z_star(self.omega_b, self._omega_m_h2()))
+        dc = _rowwise(self._dc.high, x)
+        R = np.sqrt(self.Om[:, 0]) * dc
+        l_a = np.pi * dc / _rowwise(self._rs, x)
+        return (R[0], l_a[0]) if self.scalar else (R, l_a)
+
+# =============================================================================
+# 4. Accuracy Verification against the quad Path
+# =============================================================================
+def check_accuracy(n_params=20, z_eval=(0.01, 0.1, 0.5, 0.7, 1.0, 1.5, 2.33), seed=0):
+    """Max relative error of E(z), D_C(z) vs. adaptive quad over the fit bounds."""
+    from Final_test import get_ez
+
+    rng = np.random.default_rng(seed)
+    bounds = np.array([(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35)])
+    z_eval = np.asarray(z_eval)
+    err_e, err_dc = 0.0, 0.0
+    for theta in rng.uniform(bounds[:, 0], bounds[:, 1], size=(n_params, 4)):
+        dist = CSGTDistances(*theta, H0=C_LIGHT, z_max=2.5)
+        e_ref = np.array([get_ez(zz, *theta) for zz in z_eval])
+        dc_ref = np.array([quad(lambda zp: 1.0 / get_ez(zp, *theta), 0, zz, epsabs=0, epsrel=1e-11)[0]
+                           for zz in z_eval])
+        err_e = max(err_e, np.max(np.abs(dist.E(z_eval) / e_ref - 1)))
+        err_dc = max(err_dc, np.max(np.abs(dist.D_C(z_eval) / dc_ref - 1)))
+    return err_e, err_dc
+
+
+def check_highz_accuracy(n_params=6, seed=0):
+    """Max relative error of (R, ℓ_A) vs. nested quad over the fit bounds."""
+    opts = dict(epsabs=0, epsrel=1e-12, limit=400)
+    rng = np.random.default_rng(seed)
+    bounds = np.array([(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76)])
+    z_gauss = 12.0  # the w(z) dip is below 1e-30 beyond this
+    err = 0.0
+    for A, sigma, w_off, Om, H0 in rng.uniform(bounds[:, 0], bounds[:, 1], size=(n_params, 5)):
+        Or = radiation_density(H0)
+
+        def expo(z):
+            head = quad(lambda t: (1 + w_z_csgt(t, A, sigma, w_off)) / (1 + t), 0, min(z, z_gauss), **opts)[0]
+            return head + (1 + w_off) * max(np.log1p(z) - np.log1p(z_gauss), 0.0)
+
+        def ez(z):
+            return np.sqrt(Om * (1 + z)**3 + Or * (1 + z)**4 + (1 - Om - Or) * np.exp(3 * expo(z)))
+
+        x_star = np.log1p(z_star(OMEGA_B_H2, Om * (H0 / 100)**2))
+        dc = (quad(lambda z: 1 / ez(z), 0, z_gauss, **opts)[0]
+              + quad(lambda x: np.exp(x) / ez(np.expm1(x)), np.log1p(z_gauss), x_star, **opts)[0])
+        rs = quad(lambda x: sound_speed(np.expm1(x)) * np.exp(x) / ez(np.expm1(x)), x_star, np.log(1e14),
+                  **opts)[0]
+        R, l_a = HighZDistances(A, sigma, w_off, Om, H0).cmb_distance_priors()
+        err = max(err, abs(R / (np.sqrt(Om) * dc) - 1), abs(l_a / (np.pi * dc / rs) - 1))
+    return err
+
+
+if __name__ == "__main__":
+    err_e, err_dc = check_accuracy()
+    print(f"max |ΔE/E|   : {err_e:.2e}")
+    print(f"max |ΔD_C/D_C|: {err_dc:.2e}")
+    assert max(err_e, err_dc) < ACCURACY_RTOL, "grid engine outside accuracy guarantee"
+    print(f"✅ Grid engine within rtol = {ACCURACY_RTOL:.0e} of the quad path")
+
+    err_cmb = check_highz_accuracy()
+    print(f"max |ΔR/R|, |Δℓ_A/ℓ_A| (high-z engine): {err_cmb:.2e}")
+    assert err_cmb < HIGHZ_RTOL, "high-z engine outside accuracy guarantee"
+    print(f"✅ High-z engine within rtol = {HIGHZ_RTOL:.0e} of nested quad")
@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import inspect
+
+import numpy as np
+from scipy.interpolate import CubicSpline, PPoly
+
+import csgt_distance
+import csgt_kernels
+from csgt_data import CACHE_DIR
+from csgt_distance import C_LIGHT, N_GRID, Z_PEAK_FIXED, CSGTDistances
+
+# =============================================================================
+# 1. Table Layout
+# =============================================================================
+# H0 only rescales distances by C_LIGHT / H0 and M_fixed is additive, so the
+# table spans (A, σ, w_off, Om) × redshift nodes covering the data. Each node
+# stores the z-spline coefficients of the dark-energy exponent and of the
+# dimensionless comoving distance. Spline coefficients are linear in the
+# node values, so interpolating them across parameter space yields the spline
+# of the interpolated curve and `EmulatedDistances` needs no spline solve.
+EMU_PARAMS = ('A', 'sigma', 'w_off', 'Om')
+EMU_BOUNDS = ((0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35))
+EMU_SHAPE = (9, 13, 7, 6)
+EMU_Z_MAX = 2.5
+N_Z_NODES = 65
+EMU_FORMAT = 'spline-coef-v1'
+
+
+def _lagrange_weights(theta, bounds, shape):
+    """
+    Local 4-point Lagrange weights on uniform axes: (N, d) start indices and
+    (N, d, 4) weights for (N, d) points.
+    """
+    n = np.asarray(shape)
+    t = (theta - bounds[:, 0]) / (bounds[:, 1] - bounds[:, 0]) * (n - 1)
+    i = np.clip(np.floor(t).astype(int) - 1, 0, n - 4)
+    u = t - i
+    u0, u1, u2, u3 = u, u - 1, u - 2, u - 3
+    w = np.stack([-u1 * u2 * u3 / 6, u0 * u2 * u3 / 2, -u0 * u1 * u3 / 2, u0 * u1 * u2 / 6], axis=-1)
+    return i, w
+
+
+class DistanceEmulator:
+    """
+    Tabulated distance surface with tensor-product cubic interpolation.
+
+    Calling the emulator with (A, σ, w_off, Om, H0) returns an
+    `EmulatedDistances` object with the same interface as `CSGTDistances`,
+    so it drops into any `engine=` slot. Points outside the table give NaN.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.bounds = np.array(meta['bounds'])
+        self.shape = tuple(meta['shape'])
+        self.z_max = meta['z_max']
+        self.z_nodes = np.linspace(0.0, self.z_max, meta['n_z'])
+        # (n_nodes, 2, 4, n_z - 1): exponent / D_C spline coefficients per node
+        self.table = np.asarray(np.load(os.path.join(path, 'table.npy'), mmap_mode='r'))
+
+    def __reduce__(self):
+        # Workers re-open the memory map instead of receiving pickled tables
+        return (DistanceEmulator, (self.path,))
+
+    @staticmethod
+    def build(path, bounds=EMU_BOUNDS, shape=EMU_SHAPE, z_max=EMU_Z_MAX, n_z=N_Z_NODES, chunk=512):
+        """Evaluate the grid engine on every parameter node; writes `path`."""
+        axes = [np.linspace(lo, hi, n) for (lo, hi), n in zip(bounds, shape)]
+        nodes = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+        z_nodes = np.linspace(0.0, z_max, n_z)
+
+        os.makedirs(path, exist_ok=True)
+        table = np.lib.format.open_memmap(os.path.join(path, 'table.npy'), mode='w+',
+                                          shape=(len(nodes), 2, 4, n_z - 1))
+        for start in range(0, len(nodes), chunk):
+            block = nodes[start:start + chunk]
+            dist = CSGTDistances(*block.T, H0=C_LIGHT, z_max=z_max)
+            for q, values in enumerate((dist.de_exponent(z_nodes), dist.comoving(z_nodes))):
+                coef = CubicSpline(z_nodes, values, axis=1).c
+                table[start:start + chunk, q] = coef.transpose(2, 0, 1)
+        table.flush()
+        del table
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'bounds': [list(b) for b in bounds], 'shape': list(shape),
+                       'z_max': z_max, 'n_z': n_z, 'n_grid': N_GRID}, f)
+        return DistanceEmulator(path)
+
+    def interpolate(self, theta):
+        """(N, 2, 4, n_z - 1) exponent / D_C spline coefficients at (N, 4) points."""
+        theta = np.atleast_2d(theta)
+        start, w = _lagrange_weights(theta, self.bounds, self.shape)
+        idx = np.zeros((len(theta),) + (1,) * 4, dtype=int)
+        weight = np.ones((len(theta),) + (1,) * 4)
+        for d, n in enumerate(self.shape):
+            expand = (slice(None),) + tuple(slice(None) if k == d else None for k in range(4))
+            idx = idx * n + (start[:, d, None] + np.arange(4))[expand]
+            weight = weight * w[:, d][expand]
+        block = self.table[idx.reshape(len(theta), -1)]
+        flat = weight.reshape(len(theta), 1, -1) @ block.reshape(len(theta), block.shape[1], -1)
+        out = flat.reshape((len(theta),) + self.table.shape[1:])
+        outside = np.any((theta < self.bounds[:, 0]) | (theta > self.bounds[:, 1]), axis=1)
+        out[outside] = np.nan
+        return out
+
+    def __call__(self, A, sigma, w_off, Om, H0=70.0, z_max=None):
+        if z_max is not None and z_max > self.z_max:
+            raise ValueError(f"z_max = {z_max:.3f} beyond emulator table z_max = {self.z_max:.3f}")
+        return EmulatedDistances(self, A, sigma, w_off, Om, H0)
+
+    # --- Validation ---
+    def error_map(self, axes=(0, 1), bins=8, n_samples=4000, z_eval=None, seed=0):
+        """
+        Max |Δμ| [mag] of the emulator vs. the exact engine on random points,
+        binned over the parameter pair `axes`; returns (map, max |ΔD_H/D_H|).
+        """
+        rng = np.random.default_rng(seed)
+        theta = rng.uniform(self.bounds[:, 0], self.bounds[:, 1], size=(n_samples, 4))
+        z_eval = np.linspace(0.01, self.z_max, 200) if z_eval is None else np.asarray(z_eval)
+        exact = CSGTDistances(*theta.T, z_max=self.z_max)
+        emu = self(*theta.T)
+        d_mu = np.max(np.abs(emu.mu(z_eval) - exact.mu(z_eval)), axis=1)
+        d_dh = np.max(np.abs(emu.D_H(z_eval) / exact.D_H(z_eval) - 1), axis=1)
+
+        edges = [np.linspace(*self.bounds[a], bins + 1) for a in axes]
+        ij = [np.clip(np.digitize(theta[:, a], e) - 1, 0, bins - 1) for a, e in zip(axes, edges)]
+        err = np.zeros((bins, bins))
+        np.maximum.at(err, tuple(ij), d_mu)
+        return err, d_dh.max()
+
+
+class EmulatedDistances(CSGTDistances):
+    """`CSGTDistances` whose z-splines come from the emulator table."""
+
+    def __init__(self, emulator, A, sigma, w_off, Om, H0=70.0):
+        A, sigma, w_off, Om = self._set_params(A, sigma, w_off, Om, H0, emulator.z_max)
+        coef = emulator.interpolate(np.column_stack([A, sigma, w_off, Om])).transpose(1, 2, 3, 0)
+        self.z_grid = emulator.z_nodes
+        self._expo = PPoly.construct_fast(coef[0], self.z_grid, axis=1)
+        self._dc = PPoly.construct_fast(coef[1], self.z_grid, axis=1)
+
+# =============================================================================
+# 2. Cached Build
+# =============================================================================
+def emulator_path(bounds=EMU_BOUNDS, shape=EMU_SHAPE, z_max=EMU_Z_MAX, n_z=N_Z_NODES):
+    # The table is built by the grid engine, so its source (w(z), distances,
+    # kernels) is part of the key alongside the layout
+    key = json.dumps([EMU_FORMAT, bounds, shape, z_max, n_z, N_GRID, Z_PEAK_FIXED,
+                      inspect.getsource(csgt_distance), inspect.getsource(csgt_kernels)]).encode()
+    return os.path.join(CACHE_DIR, f"emulator-{hashlib.sha256(key).hexdigest()[:16]}")
+
+
+def get_emulator(**kwargs):
+    """Load the emulator for these settings, building it once if needed."""
+    path = emulator_path(**kwargs)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return DistanceEmulator(path)
+    print(f"🔧 Building distance emulator table → {path}")
+    return DistanceEmulator.build(path, **kwargs)
+
+
+if __name__ == "__main__":
+    import time
+
+    emu = get_emulator()
+    print(f"Table: {emu.shape} nodes × {len(emu.z_nodes)} z-nodes "
+          f"({emu.table.nbytes / 2**20:.1f} MiB, memory-mapped)")
+
+    theta = np.array([0.5570, 0.470, -0.990, 0.286])
+    z_sn = np.linspace(0.001, 2.26, 1701)
+    for label, engine in [('exact', CSGTDistances), ('emulator', emu)]:
+        t0 = time.perf_counter()
+        for _ in range(200):
+            engine(*theta, 70.83, z_max=EMU_Z_MAX).mu(z_sn)
+        print(f"{label:<9}: {(time.perf_counter() - t0) / 200 * 1e3:.3f} ms per μ(z) call")
+
+    for axes in [(0, 1), (2, 3)]:
+        err, dh = emu.error_map(axes=axes)
+        names = f"{EMU_PARAMS[axes[0]]} × {EMU_PARAMS[axes[1]]}"
+        print(f"\nmax |Δμ| [mmag] over {names} (rows: {EMU_PARAMS[axes[0]]}):")
+        for row in err:
+            print("  " + " ".join(f"{1e3 * e:6.3f}" for e in row))
+    print(f"\nmax |Δμ| = {1e3 * err.max():.3f} mmag, max |ΔD_H/D_H| = {dh:.1e}")
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+import importlib.util
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from csgt_data import CACHE_DIR, REPO_DIR, file_hash
+
+# =============================================================================
+# 1. Figure Registry
+# =============================================================================
+# Every plotting script exposes PANELS = {name: compute(**params) -> arrays}
+# and render(panels) -> Figure. `fit_params` maps, per csgt_models model name,
+# fit-result parameter names onto the keywords of the script's panel
+# functions; `model_keywords` adds fixed keywords for a model (e.g. its sign
+# convention). Fits of other models are ignored, and anything a fit does not
+# provide falls back to the script's own constants.
+W_DIP_PARAMS = {'A': 'A', 'sigma': 'sigma', 'w_off': 'w_off'}
+FIGURES = {
+    'w_evolution': {'script': 'Final_test_G.py', 'dpi': 150,
+                    'fit_params': {'csgt_ultimate': W_DIP_PARAMS, 'csgt_dip': W_DIP_PARAMS},
+                    # The script plots w_off − A·g (csgt_ultimate); csgt_dip is w_off + A·g
+                    'model_keywords': {'csgt_dip': {'dip_sign': 1.0}}},
+    'h0_tension': {'script': os.path.join('CSGT2.1', 'CSGT_TensionResolution.py'), 'dpi': 150,
+                   'fit_params': {'csgt_zstar': {'Om': 'Om', 'z_star': 'z_star_fit'}}},
+    'comprehensive': {'script': os.path.join('CSGT2.2', 'analysis', 'Csgt_comprehensive_plot.py'),
+                      'dpi': 300, 'fit_params': {'csgt_eta': {'H0': 'H0_csgt', 'eta_0': 'eta_0'}}},
+}
+
+FIT_RESULT_FILE = 'csgt_fit_result.json'
+FIGURE_DIR = os.path.join(REPO_DIR, 'figures')
+PANEL_CACHE_DIR = os.path.join(CACHE_DIR, 'figures')
+PANEL_FORMAT = 'panel-npz-v1'
+
+# =============================================================================
+# 2. Fit Results
+# =============================================================================
+def save_fit_result(path, model, names, x, chi2):
+    """{'model', 'params': {name: value}, 'chi2'} for `load_fit_params`."""
+    with open(path, 'w') as f:
+        json.dump({'model': model, 'params': dict(zip(names, np.asarray(x, dtype=float).tolist())),
+                   'chi2': float(chi2)}, f, indent=2)
+
+
+def load_fit_params(paths):
+    """{model: parameters} of one or more fit-result files (a later fit of a model wins)."""
+    fits = {}
+    for path in paths:
+        with open(path) as f:
+            result = json.load(f)
+        if 'model' not in result:
+            raise ValueError(f"{path}: fit result does not name its model")
+        fits[result['model']] = result['params']
+    return fits
+
+
+def figure_params(figure, fits):
+    """Panel keyword overrides for one figure from the fits of the models it accepts."""
+    entry = FIGURES[figure]
+    models = [m for m in entry['fit_params'] if m in fits]
+    if len(models) > 1:
+        raise ValueError(f"figure '{figure}' got fits of several models it accepts: {', '.join(models)}")
+    if not models:
+        return {}
+    model, params = models[0], fits[models[0]]
+    overrides = {kw: params[name] for name, kw in entry['fit_params'][model].items() if name in params}
+    return {**overrides, **entry.get('model_keywords', {}).get(model, {})}
+
+# =============================================================================
+# 3. Panel Cache
+# =============================================================================
+def _load_script(figure):
+    path = os.path.join(REPO_DIR, FIGURES[figure]['script'])
+    spec = importlib.util.spec_from_file_location(f"csgt_figure_{figure}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, path
+
+
+def cached_panel(figure, panel, compute, params, script_hash, cache_dir=PANEL_CACHE_DIR):
+    """
+    (arrays, hit) for `compute` at the resolved inputs. The key covers the
+    script content and every argument the panel function receives, so a
+    panel is only recomputed when its own inputs (or the script) change.
+    """
+    sig = inspect.signature(compute)
+    bound = sig.bind(**{k: v for k, v in params.items() if k in sig.parameters})
+    bound.apply_defaults()
+    key = json.dumps([PANEL_FORMAT, figure, panel, script_hash, sorted(bound.arguments.items())],
+                     default=float).encode()
+    path = os.path.join(cache_dir, f"{figure}-{panel}-{hashlib.sha256(key).hexdigest()[:16]}.npz")
+    if os.path.exists(path):
+        with np.load(path) as f:
+            return {name: f[name] for name in f.files}, True
+
+    arrays = compute(*bound.args, **bound.kwargs)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return arrays, False
+
+# =============================================================================
+# 4. Headless Parallel Build
+# =============================================================================
+def build_figure(figure, params, out_dir=FIGURE_DIR, cache_dir=PANEL_CACHE_DIR, fmt='png'):
+    """Render one figure with the Agg backend; returns its timing record."""
+    t_start = time.perf_counter()
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    module, path = _load_script(figure)
+    script_hash = file_hash(path)
+    panels, timings = {}, {}
+    for name, compute in module.PANELS.items():
+        t0 = time.perf_counter()
+        panels[name], hit = cached_panel(figure, name, compute, params, script_hash, cache_dir)
+        timings[name] = {'seconds': time.perf_counter() - t0, 'cached': hit}
+
+    t0 = time.perf_counter()
+    fig = module.render(panels)
+    out = os.path.join(out_dir, f"{figure}.{fmt}")
+    fig.savefig(out, dpi=FIGURES[figure]['dpi'], bbox_inches='tight')
+    plt.close(fig)
+    return {'figure': figure, 'output': out, 'params': params, 'panels': timings,
+            'render': time.perf_counter() - t0, 'seconds': time.perf_counter() - t_start}
+
+
+def build_all(figures=None, fit_params=None, out_dir=FIGURE_DIR, cache_dir=PANEL_CACHE_DIR,
+              workers=None, fmt='png'):
+    """One spawned process per figure; results in registry order."""
+    names = list(figures or FIGURES)
+    for name in names:
+        if name not in FIGURES:
+            raise KeyError(f"unknown figure '{name}'; registered: {', '.join(FIGURES)}")
+    os.makedirs(out_dir, exist_ok=True)
+    ctx = mp.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers or len(names), mp_context=ctx) as pool:
+        futures = [pool.submit(build_figure, name, figure_params(name, fit_params or {}),
+                               out_dir, cache_dir, fmt) for name in names]
+        return [future.result() for future in futures]
+
+
+def build_report(results, wall):
+    print(f"{'figure':<15} {'total [s]':>10} {'render [s]':>11}  panels (cached ✓ / computed ✗)")
+    for r in results:
+        panels = "  ".join(f"{name} {'✓' if t['cached'] else '✗'} {t['seconds']:.3f}s"
+                           for name, t in r['panels'].items())
+        print(f"{r['figure']:<15} {r['seconds']:>10.3f} {r['render']:>11.3f}  {panels}")
+    print(f"Wall time: {wall:.3f} s for {len(results)} figures "
+          f"(sum of per-figure times {sum(r['seconds'] for r in results):.3f} s)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build all CSGT figures headless, in parallel")
+    parser.add_argument('figures', nargs='*', default=list(FIGURES))
+    parser.add_argument('--fit', action='append', default=None,
+                        help=f"fit-result JSON (repeatable; default: {FIT_RESULT_FILE} if present)")
+    parser.add_argument('--out', default=FIGURE_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--format', default='png')
+    args = parser.parse_args()
+
+    fit_files = args.fit or ([FIT_RESULT_FILE] if os.path.exists(FIT_RESULT_FILE) else [])
+    fit_params = load_fit_params(fit_files)
+    if fit_files:
+        print(f"📈 Model parameters from {', '.join(fit_files)}: " + "; ".join(
+            f"{model} " + ", ".join(f"{k}={v:.4g}" for k, v in params.items())
+            for model, params in fit_params.items()))
+    else:
+        print("📈 No fit result found; using each script's built-in parameters")
+
+    t0 = time.perf_counter()
+    results = build_all(args.figures, fit_params, args.out, workers=args.workers, fmt=args.format)
+    build_report(results, time.perf_counter() - t0)
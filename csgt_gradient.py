@@ -0,0 +1,235 @@
+import time
+
+import numpy as np
+from scipy.integrate import cumulative_simpson
+from scipy.interpolate import CubicSpline
+from scipy.optimize import differential_evolution, minimize
+
+from csgt_distance import N_GRID, Z_PEAK_FIXED, CSGTDistances, w_z_csgt
+from csgt_mcmc import FIT_BOUNDS, PARAM_NAMES
+from csgt_models import get_model
+from csgt_profile import PROFILER
+from Final_test import BAO_TABLE, RD_FID, SIG_INT, final_joint_objective_batch, joint_chi2_from_theory, prior_mask
+
+# =============================================================================
+# 1. Sensitivity Equations on the Shared Grid
+# =============================================================================
+# Parameters with a redshift dependence; H0 and M_fixed enter in closed form
+SHAPE_PARAMS = ('A', 'sigma', 'w_off', 'Om')
+MU_PER_LN = 5.0 / np.log(10)
+
+
+class CSGTSensitivities(CSGTDistances):
+    """
+    `CSGTDistances` plus ∂/∂(A, σ, w_off, Om) of the dark-energy exponent
+    and of the dimensionless comoving distance.
+
+    With g = exp(-(z - z_p)²/2σ²) the sensitivities obey
+        ∂I/∂A = ∫ g/(1+z'),  ∂I/∂σ = ∫ A g (z'-z_p)²/σ³/(1+z'),  ∂I/∂w_off = ∫ 1/(1+z'),
+        ∂E/∂θ = [3 (1-Om) e^{3I} ∂I/∂θ  |  (1+z)³ - e^{3I}] / 2E,
+        ∂χ/∂θ = -∫ (∂E/∂θ) / E²,
+    and are integrated with the same cumulative Simpson rule on the same grid
+    as the distances. Simpson and the spline are linear in the grid values,
+    so these are the exact derivatives of the discretized distances. They
+    are derived for the csgt_dip w(z) only; another `w_func` raises.
+    """
+
+    def __init__(self, A, sigma, w_off, Om, H0=70.0, z_max=2.5, n_grid=N_GRID, w_func=w_z_csgt):
+        if w_func is not w_z_csgt:
+            raise ValueError(f"sensitivities are derived for csgt_distance.w_z_csgt, not {w_func.__name__}")
+        A, sigma, w_off, Om = self._set_params(A, sigma, w_off, Om, H0, z_max)
+        A, sigma, w_off = A[:, None], sigma[:, None], w_off[:, None]
+
+        zg = np.linspace(0.0, self.z_max, n_grid)
+        with PROFILER.stage('w_z'):
+            g = np.exp(-(zg - Z_PEAK_FIXED)**2 / (2 * sigma**2))
+            w = w_off + A * g
+        with PROFILER.stage('E_z'):
+            expo = cumulative_simpson((1.0 + w) / (1.0 + zg), x=zg, axis=-1, initial=0.0)
+            ez = self._ez(zg, expo)
+            dc = cumulative_simpson(1.0 / ez, x=zg, axis=-1, initial=0.0)
+        with PROFILER.stage('sensitivity'):
+            d_integrand = np.stack(np.broadcast_arrays(
+                g / (1.0 + zg),
+                A * g * (zg - Z_PEAK_FIXED)**2 / sigma**3 / (1.0 + zg),
+                1.0 / (1.0 + zg)))
+            d_expo = cumulative_simpson(d_integrand, x=zg, axis=-1, initial=0.0)
+            d_ez = self._d_ez(zg, expo, ez, d_expo)
+            d_dc = cumulative_simpson(-d_ez / ez**2, x=zg, axis=-1, initial=0.0)
+        with PROFILER.stage('interpolation'):
+            self._set_splines(zg, expo, dc)
+            self._d_expo = CubicSpline(zg, d_expo, axis=2)
+            self._d_dc = CubicSpline(zg, d_dc, axis=2)
+
+    def _d_ez(self, z, expo, ez, d_expo):
+        """(4, N, len(z)) ∂E/∂(A, σ, w_off, Om) from the exponent and its sensitivities."""
+        de = np.exp(3.0 * expo)
+        return np.concatenate([3.0 * (1.0 - self.Om) * de * d_expo,
+                               ((1 + z)**3 - de)[None]]) / (2.0 * ez)
+
+    # --- Jacobians, (6, N, len(z)) over PARAM_NAMES (M_fixed row for μ only) ---
+    def comoving_jacobian(self, z):
+        """∂χ/∂(A, σ, w_off, Om) of the dimensionless comoving distance."""
+        return self._d_dc(self._prepare(z))
+
+    def E_jacobian(self, z):
+        z = self._prepare(z)
+        expo = self._expo(z)
+        return self._d_ez(z, expo, self._ez(z, expo), self._d_expo(z))
+
+    def mu_jacobian(self, z):
+        z = self._prepare(z)
+        d_mu = MU_PER_LN * self._d_dc(z) / self._dc(z)
+        h0 = np.broadcast_to(-MU_PER_LN / self.H0[:, None], d_mu.shape[1:])
+        return np.concatenate([d_mu, h0[None], np.ones_like(h0)[None]])
+
+    def D_M_jacobian(self, z):
+        z = self._prepare(z)
+        d_dm = self.hubble_distance * self._d_dc(z)
+        dm = self.hubble_distance * self._dc(z)
+        return np.concatenate([d_dm, (-dm / self.H0[:, None])[None], np.zeros_like(dm)[None]])
+
+    def D_H_jacobian(self, z):
+        z = self._prepare(z)
+        e = self._E_at(z)
+        dh = self.hubble_distance / e
+        d_dh = -dh * self.E_jacobian(z) / e
+        return np.concatenate([d_dh, (-dh / self.H0[:, None])[None], np.zeros_like(dh)[None]])
+
+# =============================================================================
+# 2. Joint χ² with Analytic Gradient
+# =============================================================================
+def joint_chi2_and_grad(pop, z_sn, mu_sn, sig_sn, bao=None, model='csgt_dip'):
+    """
+    χ² of `final_joint_objective_batch` (through the shared
+    `joint_chi2_from_theory`) and ∂χ²/∂(A, σ, w_off, Om, H0, M_fixed) for an
+    (N, 6) population. Points outside the prior box or with a non-finite χ²
+    get χ² = 1e18 and a zero gradient. Only csgt_dip has sensitivities.
+    """
+    if get_model(model).w is not w_z_csgt:
+        raise ValueError(f"analytic gradients cover csgt_dip only, not '{model}'")
+    bao_z, bao_dm, bao_dm_err, bao_dh, bao_dh_err = BAO_TABLE if bao is None else bao
+    pop = np.atleast_2d(pop)
+    chi2 = np.full(len(pop), 1e18)
+    grad = np.zeros(pop.shape)
+    valid = prior_mask(pop)
+    PROFILER.count('gradient_evaluations', len(pop))
+    if not valid.any():
+        return chi2, grad
+    p = pop[valid]
+    dist = CSGTSensitivities(*p[:, :5].T, z_max=max(np.max(z_sn), bao_z.max()) * 1.05)
+
+    mu_th, dm_th, dh_th = dist.mu(z_sn, p[:, 5]), dist.D_M(bao_z), dist.D_H(bao_z)
+    chi2[valid] = joint_chi2_from_theory(mu_th, dm_th, dh_th, mu_sn, sig_sn, bao)
+    w_sn = 1.0 / (sig_sn**2 + SIG_INT**2)
+    r_sn, r_dm, r_dh = mu_sn - mu_th, bao_dm - dm_th / RD_FID, bao_dh - dh_th / RD_FID
+    g = -2.0 * (np.einsum('nz,knz->nk', r_sn * w_sn, dist.mu_jacobian(z_sn))
+                + np.einsum('nz,knz->nk', r_dm / bao_dm_err**2, dist.D_M_jacobian(bao_z)) / RD_FID
+                + np.einsum('nz,knz->nk', r_dh / bao_dh_err**2, dist.D_H_jacobian(bao_z)) / RD_FID)
+    grad[valid] = np.where((chi2[valid] < 1e18)[:, None] & np.isfinite(g), g, 0.0)
+    return chi2, grad
+
+
+class JointChi2Gradient:
+    """
+    Single-point objective for gradient-based optimizers and samplers.
+
+    `obj(x)` returns (χ², ∇χ²) for `minimize(obj, x0, jac=True)` (L-BFGS-B,
+    trust-constr, ...); `log_prob_and_grad(x)` returns (log p, ∇ log p) with
+    log p = -χ²/2 for Hamiltonian-style samplers. `nfev` counts evaluations.
+    """
+
+    def __init__(self, z_sn, mu_sn, sig_sn, bao=None, model='csgt_dip'):
+        self.data = (z_sn, mu_sn, sig_sn)
+        self.bao = bao
+        self.model = model
+        self.nfev = 0
+
+    def __call__(self, x):
+        self.nfev += 1
+        chi2, grad = joint_chi2_and_grad(np.asarray(x, dtype=float)[None], *self.data, bao=self.bao,
+                                         model=self.model)
+        return chi2[0], grad[0]
+
+    def log_prob_and_grad(self, x):
+        chi2, grad = self(x)
+        return -0.5 * chi2, -0.5 * grad
+
+# =============================================================================
+# 3. Hybrid Global Search + Gradient Polish
+# =============================================================================
+class _CountingBatch:
+    """Vectorized DE objective that counts evaluated population members."""
+
+    def __init__(self, z_sn, mu_sn, sig_sn):
+        self.data = (z_sn, mu_sn, sig_sn)
+        self.nfev = 0
+
+    def __call__(self, x):
+        self.nfev += x.shape[1]
+        return final_joint_objective_batch(x.T, *self.data)
+
+
+def de_fit(z_sn, mu_sn, sig_sn, seed=0, bounds=FIT_BOUNDS, **de_kwargs):
+    """Pure-DE baseline configured like `Final_test.py`; its polish uses finite differences, counted in `de_members`."""
+    de_kwargs = {'popsize': 15, 'maxiter': 200, 'strategy': 'best1bin', **de_kwargs}
+    objective = _CountingBatch(z_sn, mu_sn, sig_sn)
+    t0 = time.perf_counter()
+    res = differential_evolution(objective, bounds, seed=seed, vectorized=True, updating='deferred',
+                                 **de_kwargs)
+    return {'x': res.x, 'fun': res.fun, 'evaluations': objective.nfev, 'de_members': objective.nfev,
+            'gradient_evaluations': 0, 'seconds': time.perf_counter() - t0}
+
+
+def hybrid_fit(z_sn, mu_sn, sig_sn, seed=0, de_maxiter=20, bounds=FIT_BOUNDS, **de_kwargs):
+    """Short vectorized DE search, then L-BFGS-B on the analytic gradient."""
+    de_kwargs = {'popsize': 15, 'strategy': 'best1bin', **de_kwargs}
+    objective = _CountingBatch(z_sn, mu_sn, sig_sn)
+    t0 = time.perf_counter()
+    coarse = differential_evolution(objective, bounds, seed=seed, maxiter=de_maxiter, polish=False,
+                                    vectorized=True, updating='deferred', **de_kwargs)
+    grad_obj = JointChi2Gradient(z_sn, mu_sn, sig_sn)
+    res = minimize(grad_obj, coarse.x, jac=True, method='L-BFGS-B', bounds=[tuple(b) for b in bounds])
+    return {'x': res.x, 'fun': res.fun, 'evaluations': objective.nfev + grad_obj.nfev,
+            'de_members': objective.nfev, 'gradient_evaluations': grad_obj.nfev,
+            'de_fun': coarse.fun, 'seconds': time.perf_counter() - t0}
+
+
+def check_gradient(x, z_sn, mu_sn, sig_sn, rel_step=1e-6):
+    """Max relative difference between the analytic and central-difference gradient."""
+    x = np.asarray(x, dtype=float)
+    _, grad = joint_chi2_and_grad(x, z_sn, mu_sn, sig_sn)
+    h = rel_step * np.maximum(np.abs(x), 1.0)
+    pop = np.vstack([x + np.diag(h), x - np.diag(h)])
+    chi2 = final_joint_objective_batch(pop, z_sn, mu_sn, sig_sn)
+    fd = (chi2[:len(x)] - chi2[len(x):]) / (2 * h)
+    return np.max(np.abs(grad[0] - fd) / np.maximum(np.abs(fd), 1e-3)), grad[0], fd
+
+
+if __name__ == "__main__":
+    import argparse
+    from Final_test import load_pantheon_final
+
+    parser = argparse.ArgumentParser(description="Analytic-gradient polishing vs. the pure-DE baseline")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--de-maxiter', type=int, default=20, help="generations of the hybrid DE stage")
+    parser.add_argument('--no-baseline', action='store_true', help="skip the 200-generation DE baseline")
+    args = parser.parse_args()
+
+    df = load_pantheon_final()
+    z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+
+    x_check = np.array([0.5570, 0.470, -0.990, 0.286, 70.83, 0.01])
+    err, grad, _ = check_gradient(x_check, z_sn, mu_sn, sig_sn)
+    print("∇χ² at the README best fit: " + ", ".join(f"{p}={g:.4g}" for p, g in zip(PARAM_NAMES, grad)))
+    print(f"max rel. difference to central differences: {err:.1e}\n")
+
+    runs = [('hybrid', hybrid_fit(z_sn, mu_sn, sig_sn, seed=args.seed, de_maxiter=args.de_maxiter))]
+    if not args.no_baseline:
+        runs.append(('pure DE', de_fit(z_sn, mu_sn, sig_sn, seed=args.seed)))
+    print(f"{'method':<8} {'χ²':>12} {'evaluations':>12} {'DE members':>11} {'∇ evals':>8} {'time [s]':>9}")
+    for name, r in runs:
+        print(f"{name:<8} {r['fun']:>12.4f} {r['evaluations']:>12d} {r['de_members']:>11d} "
+              f"{r['gradient_evaluations']:>8d} {r['seconds']:>9.2f}")
+    for name, r in runs:
+        print(f"{name:<8} " + ", ".join(f"{p}={v:.4f}" for p, v in zip(PARAM_NAMES, r['x'])))
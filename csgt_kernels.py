@@ -0,0 +1,250 @@
+import os
+
+import numpy as np
+from scipy.integrate import cumulative_simpson
+
+from csgt_data import CACHE_DIR
+
+# =============================================================================
+# 1. Backend Selection
+# =============================================================================
+# CSGT_KERNELS = auto | numpy | numba. `auto` uses the JIT backend when numba
+# is importable and plain NumPy otherwise. Compiled kernels are cached under
+# CACHE_DIR/numba, so only the first run on a machine pays the compile cost.
+KERNEL_ENV = 'CSGT_KERNELS'
+os.environ.setdefault('NUMBA_CACHE_DIR', os.path.join(CACHE_DIR, 'numba'))
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Agreement guarantee between backends: the JIT kernels use the same Simpson
+# rule as `scipy.integrate.cumulative_simpson` but a different summation
+# order, so exponent, D_C and χ² agree to KERNEL_RTOL relative (checked by
+# `check_backends()`). The exponent changes sign inside the fit box, so its
+# error is taken relative to the largest |exponent| of the row.
+KERNEL_RTOL = 1e-12
+
+# =============================================================================
+# 2. NumPy Backend (reference)
+# =============================================================================
+# A backend provides dip_w (the Gaussian-dip w(z) on the grid) and
+# w_integrals (exponent and D_C from any tabulated w); csgt_grid chains the
+# two. `CSGTDistances` calls the two steps itself so each has its profiler
+# stage ('w_z', 'E_z').
+class _Kernels:
+    @classmethod
+    def csgt_grid(cls, zg, A, sigma, w_off, Om, z_peak):
+        """(expo, dc) on `zg` for (N,) parameter arrays of the Gaussian-dip w(z)."""
+        return cls.w_integrals(zg, cls.dip_w(zg, A, sigma, w_off, z_peak), Om)
+
+
+class NumpyKernels(_Kernels):
+    """Vectorized NumPy kernels; (N, len(z)) temporaries per step."""
+    name = 'numpy'
+
+    @staticmethod
+    def dip_w(zg, A, sigma, w_off, z_peak):
+        """(N, len(zg)) w = w_off + A·exp(-(z - z_peak)²/2σ²)."""
+        return w_off[:, None] + A[:, None] * np.exp(-(zg - z_peak)**2 / (2 * sigma[:, None]**2))
+
+    @staticmethod
+    def w_integrals(zg, w, Om):
+        """(expo, dc) on `zg`: ∫(1+w)/(1+z') and ∫dz'/E for (N, len(zg)) w and (N,) Om."""
+        expo = cumulative_simpson((1.0 + w) / (1.0 + zg), x=zg, axis=-1, initial=0.0)
+        ez = np.sqrt(Om[:, None] * (1 + zg)**3 + (1.0 - Om[:, None]) * np.exp(3.0 * expo))
+        dc = cumulative_simpson(1.0 / ez, x=zg, axis=-1, initial=0.0)
+        return expo, dc
+
+    @staticmethod
+    def weighted_sq_sum(model, obs, weight):
+        """Σ_j weight_j (obs_j - model_ij)² per row of an (N, m) model."""
+        return np.sum((obs - model)**2 * weight, axis=1)
+
+# =============================================================================
+# 3. JIT Backend (numba)
+# =============================================================================
+if numba is not None:
+    @numba.njit(cache=True)
+    def _cumulative_simpson_inplace(row, h):
+        """
+        Integral from row[0] written over `row` (the integrand), uniform step h.
+        Same per-interval rule as `cumulative_simpson`: interval k uses the
+        points (k, k+1, k+2) for even k and (k-1, k, k+1) otherwise.
+        """
+        n = row.shape[0]
+        acc, y_prev, y0 = 0.0, 0.0, row[0]
+        row[0] = 0.0
+        for k in range(n - 1):
+            y1 = row[k + 1]
+            if k % 2 == 0 and k + 2 < n:
+                acc += h / 12.0 * (5.0 * y0 + 8.0 * y1 - row[k + 2])
+            else:
+                acc += h / 12.0 * (-y_prev + 8.0 * y0 + 5.0 * y1)
+            row[k + 1] = acc
+            y_prev, y0 = y0, y1
+
+    @numba.njit(parallel=True, cache=True)
+    def _dip_w_jit(zg, A, sigma, w_off, z_peak):
+        N, n = A.shape[0], zg.shape[0]
+        w = np.empty((N, n))
+        for i in numba.prange(N):
+            inv_2s2 = 1.0 / (2.0 * sigma[i] * sigma[i])
+            for k in range(n):
+                d = zg[k] - z_peak
+                w[i, k] = w_off[i] + A[i] * np.exp(-d * d * inv_2s2)
+        return w
+
+    @numba.njit(parallel=True, cache=True)
+    def _w_integrals_jit(zg, w, Om):
+        N, n = w.shape
+        h = zg[1] - zg[0]
+        expo = np.empty((N, n))
+        dc = np.empty((N, n))
+        for i in numba.prange(N):
+            for k in range(n):
+                expo[i, k] = (1.0 + w[i, k]) / (1.0 + zg[k])
+            _cumulative_simpson_inplace(expo[i], h)
+            for k in range(n):
+                zp1 = 1.0 + zg[k]
+                dc[i, k] = 1.0 / np.sqrt(Om[i] * zp1 * zp1 * zp1 + (1.0 - Om[i]) * np.exp(3.0 * expo[i, k]))
+            _cumulative_simpson_inplace(dc[i], h)
+        return expo, dc
+
+    @numba.njit(parallel=True, cache=True)
+    def _weighted_sq_sum_jit(model, obs, weight):
+        N, m = model.shape
+        out = np.empty(N)
+        for i in numba.prange(N):
+            s = 0.0
+            for j in range(m):
+                d = obs[j] - model[i, j]
+                s += weight[j] * d * d
+            out[i] = s
+        return out
+
+
+class NumbaKernels(_Kernels):
+    """JIT loops, parallel over population members; the integrals run in place."""
+    name = 'numba'
+
+    @staticmethod
+    def dip_w(zg, A, sigma, w_off, z_peak):
+        A, sigma, w_off = [np.ascontiguousarray(p, dtype=float) for p in (A, sigma, w_off)]
+        return _dip_w_jit(np.ascontiguousarray(zg, dtype=float), A, sigma, w_off, float(z_peak))
+
+    @staticmethod
+    def w_integrals(zg, w, Om):
+        zg = np.ascontiguousarray(zg, dtype=float)
+        if len(zg) < 3 or not np.allclose(np.diff(zg), zg[1] - zg[0], rtol=1e-12, atol=0):
+            return NumpyKernels.w_integrals(zg, w, Om)
+        w = np.ascontiguousarray(w, dtype=float)
+        return _w_integrals_jit(zg, w, np.ascontiguousarray(Om, dtype=float))
+
+    @staticmethod
+    def weighted_sq_sum(model, obs, weight):
+        model = np.ascontiguousarray(model, dtype=float)
+        obs, weight = np.broadcast_arrays(np.asarray(obs, dtype=float), np.asarray(weight, dtype=float))
+        return _weighted_sq_sum_jit(model, np.ascontiguousarray(obs), np.ascontiguousarray(weight))
+
+
+BACKENDS = {'numpy': NumpyKernels, 'numba': NumbaKernels}
+_ACTIVE = {}
+
+
+def get_kernels(name=None):
+    """Kernel backend by name (default: $CSGT_KERNELS, else `auto`)."""
+    name = name or os.environ.get(KERNEL_ENV, 'auto')
+    if name == 'auto':
+        name = 'numba' if numba is not None else 'numpy'
+    if name not in BACKENDS:
+        raise KeyError(f"unknown kernel backend '{name}'; available: auto, {', '.join(BACKENDS)}")
+    if name == 'numba' and numba is None:
+        raise ImportError("kernel backend 'numba' requested but numba is not installed")
+    return BACKENDS[name]
+
+
+def active_kernels():
+    """Backend used by the distance engine and χ² (resolved once per process)."""
+    if 'kernels' not in _ACTIVE:
+        _ACTIVE['kernels'] = get_kernels()
+    return _ACTIVE['kernels']
+
+
+def set_kernels(name):
+    _ACTIVE['kernels'] = get_kernels(name)
+    return _ACTIVE['kernels']
+
+
+def set_threads(n):
+    """Cap JIT threads (pool workers use 1 so processes don't oversubscribe)."""
+    if numba is not None:
+        numba.set_num_threads(max(1, min(n, numba.config.NUMBA_NUM_THREADS)))
+
+# =============================================================================
+# 4. Backend Agreement
+# =============================================================================
+def check_backends(n_pop=64, n_grid=513, z_max=2.5, n_obs=1701, seed=0):
+    """Max relative deviation of every backend from NumPy on random fit-box inputs."""
+    rng = np.random.default_rng(seed)
+    A, sigma, w_off, Om = [rng.uniform(lo, hi, n_pop) for lo, hi in
+                           ((0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35))]
+    zg = np.linspace(0.0, z_max, n_grid)
+    model = rng.normal(size=(n_pop, n_obs))
+    obs, weight = rng.normal(size=n_obs), rng.uniform(0.5, 2.0, n_obs)
+
+    ref_grid = NumpyKernels.csgt_grid(zg, A, sigma, w_off, Om, 0.7)
+    ref_chi2 = NumpyKernels.weighted_sq_sum(model, obs, weight)
+    report = {}
+    for name, kernels in BACKENDS.items():
+        if name == 'numba' and numba is None:
+            continue
+        grid = kernels.csgt_grid(zg, A, sigma, w_off, Om, 0.7)
+        chi2 = kernels.weighted_sq_sum(model, obs, weight)
+        errs = [np.max(np.abs(g - r) / np.max(np.abs(r), axis=1, keepdims=True)) for g, r in zip(grid, ref_grid)]
+        report[name] = max(*errs, np.max(np.abs(chi2 / ref_chi2 - 1)))
+    return report
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Kernel backends: agreement and timing")
+    parser.add_argument('--pop', type=int, default=90, help="population size for the timing run")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"numba: {'available ' + numba.__version__ if numba is not None else 'not installed'}; "
+          f"active backend: {active_kernels().name} (${KERNEL_ENV}={os.environ.get(KERNEL_ENV, 'auto')})")
+    t0 = time.perf_counter()
+    agreement = check_backends()
+    print(f"  backend check incl. JIT compile / cache load: {time.perf_counter() - t0:.2f} s")
+    for name, err in agreement.items():
+        status = "✅" if err < KERNEL_RTOL else "❌"
+        print(f"  {status} {name:<6} max rel. deviation from numpy: {err:.1e} (tolerance {KERNEL_RTOL:.0e})")
+
+    from Final_test import final_joint_objective_batch, load_pantheon_final
+    df = load_pantheon_final()
+    z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+    rng = np.random.default_rng(0)
+    lo, hi = np.array([(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76), (-0.05, 0.05)]).T
+    pop = rng.uniform(lo, hi, size=(args.pop, 6))
+    zg = np.linspace(0.0, 2.5, 513)
+
+    def per_call(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return (time.perf_counter() - t0) / args.repeat * 1e3
+
+    print(f"\nPer {args.pop}-member batch (after warm-up):")
+    print(f"  {'backend':<8} {'grid kernel [ms]':>17} {'joint χ² [ms]':>14}")
+    for name in BACKENDS:
+        if name == 'numba' and numba is None:
+            continue
+        kernels = set_kernels(name)
+        final_joint_objective_batch(pop, z_sn, mu_sn, sig_sn)
+        t_grid = per_call(lambda: kernels.csgt_grid(zg, *pop[:, :4].T, 0.7))
+        t_joint = per_call(lambda: final_joint_objective_batch(pop, z_sn, mu_sn, sig_sn))
+        print(f"  {name:<8} {t_grid:>17.2f} {t_joint:>14.2f}")
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+
+import numpy as np
+
+from csgt_emulator import get_emulator
+from Final_test import final_joint_objective_batch, joint_fit, load_pantheon_final
+
+# =============================================================================
+# 1. Posterior (same space & priors as final_joint_objective)
+# =============================================================================
+PARAM_NAMES = ('A', 'sigma', 'w_off', 'Om', 'H0', 'M_fixed')
+FIT_BOUNDS = np.array([(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76), (-0.05, 0.05)])
+# A, σ, w_off from the README follow the minus-sign convention of
+# Final_test_G.py / Final_Test_NoGhost.py (w = w_off − A·g), so they are not a
+# point of the plus-sign csgt_dip posterior (w = w_off + A·g) sampled here.
+# Kept as a fiducial test vector; chains and refits start from `fit_start()`.
+README_BEST = np.array([0.5570, 0.470, -0.990, 0.286, 70.83, 0.0])
+
+
+def fit_start(z_sn, mu_sn, sig_sn, margin=5e-3):
+    """
+    Global csgt_dip best fit (`Final_test.joint_fit`; read back from
+    csgt_store once it has run), pulled `margin` × width inside FIT_BOUNDS
+    so a walker ball or finite-difference stencil around it stays inside.
+    """
+    x = joint_fit(z_sn, mu_sn, sig_sn, bounds=FIT_BOUNDS).x
+    span = FIT_BOUNDS[:, 1] - FIT_BOUNDS[:, 0]
+    return np.clip(x, FIT_BOUNDS[:, 0] + margin * span, FIT_BOUNDS[:, 1] - margin * span)
+
+
+class JointLogPosterior:
+    """log p = -χ²/2 inside the fit bounds; χ² ≥ 1e18 (prior mask) maps to -inf."""
+
+    def __init__(self, z_sn, mu_sn, sig_sn, bounds=FIT_BOUNDS, chi2_batch=None, engine=None):
+        self.data = (z_sn, mu_sn, sig_sn)
+        self.engine = engine
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.chi2_batch = chi2_batch or final_joint_objective_batch
+
+    def __call__(self, pop):
+        pop = np.atleast_2d(pop)
+        logp = np.full(len(pop), -np.inf)
+        inside = np.all((pop > self.bounds[:, 0]) & (pop < self.bounds[:, 1]), axis=1)
+        if inside.any():
+            chi2 = self.chi2_batch(pop[inside], *self.data, engine=self.engine)
+            logp[inside] = np.where(chi2 < 1e18, -0.5 * chi2, -np.inf)
+        return logp
+
+# =============================================================================
+# 2. Append-Only Memory-Mapped Chain
+# =============================================================================
+class ChainFile:
+    """
+    `<path>.chain` holds raw float64 records (nwalkers, ndim + 1) = positions
+    plus log-probability, appended one step at a time; `<path>.json` holds the
+    committed step count, RNG state and wall time. A record only counts once
+    the JSON names it, so a crash mid-append is truncated away on resume.
+    """
+
+    def __init__(self, path, nwalkers, ndim):
+        self.chain_path = path + '.chain'
+        self.state_path = path + '.json'
+        self.shape = (nwalkers, ndim + 1)
+        self.record_bytes = nwalkers * (ndim + 1) * 8
+
+    @classmethod
+    def from_checkpoint(cls, path):
+        """Existing chain, with the shape read from its state file."""
+        with open(path + '.json') as f:
+            nwalkers, width = json.load(f)['shape']
+        return cls(path, nwalkers, width - 1)
+
+    def exists(self):
+        return os.path.exists(self.state_path)
+
+    def load_state(self):
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if tuple(state['shape']) != self.shape:
+            raise ValueError(f"checkpoint shape {state['shape']} != sampler shape {self.shape}")
+        with open(self.chain_path, 'r+b') as f:
+            f.truncate(state['steps'] * self.record_bytes)
+        return state
+
+    def append(self, pos, logp, state):
+        with open(self.chain_path, 'ab') as f:
+            f.write(np.column_stack([pos, logp]).astype(np.float64).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        state = dict(state, shape=list(self.shape))
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def read(self):
+        """Memory-mapped (steps, nwalkers, ndim + 1) view of the chain."""
+        steps = os.path.getsize(self.chain_path) // self.record_bytes
+        return np.memmap(self.chain_path, dtype=np.float64, mode='r', shape=(steps,) + self.shape)
+
+# =============================================================================
+# 3. Affine-Invariant Ensemble Sampler (stretch move)
+# =============================================================================
+class EnsembleSampler:
+    """
+    Goodman & Weare (2010) stretch-move sampler with the red/blue split: each
+    half-ensemble is updated against the other in one batched `log_prob`
+    call, so a step costs two vectorized likelihood evaluations regardless of
+    the number of walkers.
+    """
+
+    def __init__(self, log_prob, nwalkers, ndim, path=None, seed=0, a=2.0):
+        if nwalkers < 2 * ndim or nwalkers % 2:
+            raise ValueError("nwalkers must be even and >= 2 * ndim")
+        self.log_prob = log_prob
+        self.nwalkers, self.ndim, self.a = nwalkers, ndim, a
+        self.rng = np.random.default_rng(seed)
+        self.chain = ChainFile(path, nwalkers, ndim) if path else None
+        self.steps, self.seconds = 0, 0.0
+        self.pos = self.logp = None
+        self.samples = []
+
+    def resume(self):
+        """Restore positions, RNG state and counters from the checkpoint."""
+        state = self.chain.load_state()
+        last = np.array(self.chain.read()[-1])
+        self.pos, self.logp = last[:, :-1], last[:, -1]
+        self.rng.bit_generator.state = state['rng']
+        self.steps, self.seconds = state['steps'], state['seconds']
+
+    def _half_step(self, active, other):
+        n = len(active)
+        zz = ((self.a - 1.0) * self.rng.random(n) + 1.0)**2 / self.a
+        partners = self.pos[other][self.rng.integers(len(other), size=n)]
+        proposal = partners + zz[:, None] * (self.pos[active] - partners)
+        logp_new = self.log_prob(proposal)
+        log_accept = (self.ndim - 1) * np.log(zz) + logp_new - self.logp[active]
+        accept = np.log(self.rng.random(n)) < log_accept
+        self.pos[active[accept]] = proposal[accept]
+        self.logp[active[accept]] = logp_new[accept]
+        return accept.sum()
+
+    def run(self, p0, nsteps, progress_every=0):
+        """Advance to `nsteps` total steps; resumes from the checkpoint if present."""
+        if self.chain is not None and self.chain.exists():
+            self.resume()
+        else:
+            self.pos = np.array(p0, dtype=float)
+            self.logp = self.log_prob(self.pos)
+        halves = (np.arange(0, self.nwalkers, 2), np.arange(1, self.nwalkers, 2))
+        accepted = 0
+        while self.steps < nsteps:
+            t0 = time.perf_counter()
+            accepted += self._half_step(halves[0], halves[1])
+            accepted += self._half_step(halves[1], halves[0])
+            self.steps += 1
+            self.seconds += time.perf_counter() - t0
+            if self.chain is not None:
+                self.chain.append(self.pos, self.logp, {'steps': self.steps, 'seconds': self.seconds,
+                                                        'rng': self.rng.bit_generator.state})
+            else:
+                self.samples.append(np.column_stack([self.pos, self.logp]))
+            if progress_every and self.steps % progress_every == 0:
+                print(f"step {self.steps:>6d}  max log p = {self.logp.max():.2f}")
+        return accepted
+
+    def get_chain(self):
+        """(steps, nwalkers, ndim) positions; log p in `get_log_prob()`."""
+        full = np.asarray(self.chain.read()) if self.chain else np.array(self.samples)
+        return full[..., :-1]
+
+    def get_log_prob(self):
+        full = np.asarray(self.chain.read()) if self.chain else np.array(self.samples)
+        return full[..., -1]
+
+# =============================================================================
+# 4. Throughput Diagnostics
+# =============================================================================
+def autocorr_time(chain, c=5.0):
+    """Integrated autocorrelation time per parameter (FFT, Sokal windowing)."""
+    steps = chain.shape[0]
+    n = 1 << (2 * steps - 1).bit_length()
+    x = chain - chain.mean(axis=0)
+    f = np.fft.rfft(x, n=n, axis=0)
+    acf = np.fft.irfft(f * np.conj(f), n=n, axis=0)[:steps]
+    acf = (acf / acf[0]).mean(axis=1)
+    taus = 2.0 * np.cumsum(acf, axis=0) - 1.0
+    window = np.arange(steps)[:, None] < c * taus
+    m = np.minimum(np.argmin(window, axis=0), steps - 1)
+    m[window.all(axis=0)] = steps - 1
+    return taus[m, np.arange(taus.shape[1])]
+
+
+def throughput_report(sampler, burn=0):
+    """τ, effective samples and effective samples per second of wall time."""
+    chain = sampler.get_chain()[burn:]
+    tau = autocorr_time(chain)
+    ess = chain.shape[0] * chain.shape[1] / tau
+    print(f"{'param':<8} {'τ [steps]':>10} {'ESS':>10} {'ESS/s':>10} {'mean':>10} {'std':>10}")
+    flat = chain.reshape(-1, chain.shape[-1])
+    for name, t, e, m, s in zip(PARAM_NAMES, tau, ess, flat.mean(axis=0), flat.std(axis=0)):
+        print(f"{name:<8} {t:>10.1f} {e:>10.1f} {e / sampler.seconds:>10.2f} {m:>10.4f} {s:>10.4f}")
+    return {'tau': tau, 'ess': ess, 'ess_per_sec': ess / sampler.seconds}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumable ensemble MCMC for the CSGT joint posterior")
+    parser.add_argument('--chain', default='csgt_chain', help="checkpoint prefix (.chain/.json)")
+    parser.add_argument('--steps', type=int, default=5000)
+    parser.add_argument('--walkers', type=int, default=32)
+    parser.add_argument('--burn', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--emulator', action='store_true', help="use the tabulated distance emulator")
+    args = parser.parse_args()
+
+    df = load_pantheon_final()
+    z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+
+    rng = np.random.default_rng(args.seed)
+    width = 1e-3 * (FIT_BOUNDS[:, 1] - FIT_BOUNDS[:, 0])
+    x0 = fit_start(z_sn, mu_sn, sig_sn)
+    p0 = x0 + width * rng.standard_normal((args.walkers, len(x0)))
+
+    engine = get_emulator() if args.emulator else None
+    log_prob = JointLogPosterior(z_sn, mu_sn, sig_sn, engine=engine)
+    sampler = EnsembleSampler(log_prob, args.walkers, len(x0), path=args.chain, seed=args.seed)
+    print(f"🚀 Ensemble MCMC: {args.walkers} walkers → {args.steps} steps ({args.chain}.chain), "
+          f"started at the joint fit " + ", ".join(f"{n}={v:.4g}" for n, v in zip(PARAM_NAMES, x0)))
+    sampler.run(p0, args.steps, progress_every=max(args.steps // 20, 1))
+    throughput_report(sampler, burn=args.burn)
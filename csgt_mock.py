@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import resource
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from csgt_data import CACHE_DIR
+from csgt_distance import N_GRID, CSGTDistances
+from csgt_kernels import active_kernels
+from Final_test import BAO_TABLE, RD_FID, SIG_INT, prior_mask
+
+# =============================================================================
+# 1. Catalog Layout
+# =============================================================================
+# A mock catalog is a directory holding z.npy, mu.npy, sig.npy (float64,
+# written chunk by chunk through `open_memmap`, read back memory-mapped) and
+# meta.json with the generating parameters. Chunk c draws from its own child
+# of SeedSequence(seed), so a catalog is reproducible for a given chunk size.
+MOCK_FORMAT = 'mock-npy-v1'
+MOCK_COLUMNS = ('z', 'mu', 'sig')
+MOCK_DIR = os.path.join(CACHE_DIR, 'mocks')
+MOCK_THETA = (0.5570, 0.470, -0.990, 0.286, 70.83, 0.0)
+# LSST-like rate n(z) ∝ z² exp(-(z/z0)^1.5) on [Z_MIN, Z_MAX]
+Z_MIN, Z_MAX, Z_RATE_SCALE = 0.01, 1.2, 0.6
+GEN_CHUNK = 1 << 16
+
+
+def redshift_sampler(z_min=Z_MIN, z_max=Z_MAX, z0=Z_RATE_SCALE, n_grid=4097):
+    """Inverse-CDF sampler u ∈ [0, 1) → z for the survey rate."""
+    zg = np.linspace(z_min, z_max, n_grid)
+    pdf = zg**2 * np.exp(-(zg / z0)**1.5)
+    cdf = np.concatenate(([0.0], np.cumsum(0.5 * (pdf[1:] + pdf[:-1]) * np.diff(zg))))
+    cdf /= cdf[-1]
+    return lambda u: np.interp(u, cdf, zg)
+
+
+def mock_sigma(z):
+    """Per-SN measurement error: photometric floor growing with redshift."""
+    return 0.08 + 0.10 * z
+
+# =============================================================================
+# 2. Generator
+# =============================================================================
+def generate_catalog(path, n, theta=MOCK_THETA, seed=0, chunk=GEN_CHUNK, z_max=Z_MAX):
+    """
+    Draw `n` SNe from the CSGT model `theta` (A, σ, w_off, Om, H0, M_fixed)
+    with scatter √(σ² + σ_int²). Memory use is bounded by `chunk` rows.
+    """
+    theta = np.asarray(theta, dtype=float)
+    dist = CSGTDistances(*theta[:5], z_max=z_max)
+    sample_z = redshift_sampler(z_max=z_max)
+    os.makedirs(path, exist_ok=True)
+    cols = {c: np.lib.format.open_memmap(os.path.join(path, f"{c}.npy"), mode='w+', dtype=float, shape=(n,))
+            for c in MOCK_COLUMNS}
+    for c, child in enumerate(np.random.SeedSequence(seed).spawn(-(-n // chunk))):
+        rng = np.random.default_rng(child)
+        sl = slice(c * chunk, min((c + 1) * chunk, n))
+        z = sample_z(rng.random(sl.stop - sl.start))
+        sig = mock_sigma(z)
+        cols['z'][sl] = z
+        cols['sig'][sl] = sig
+        cols['mu'][sl] = dist.mu(z, theta[5]) + rng.normal(size=len(z)) * np.sqrt(sig**2 + SIG_INT**2)
+    for col in cols.values():
+        col.flush()
+    del cols
+    meta = {'format': MOCK_FORMAT, 'n': n, 'theta': theta.tolist(), 'seed': seed, 'chunk': chunk,
+            'z_max': z_max, 'sig_int': SIG_INT}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return MockCatalog(path)
+
+
+def cached_catalog(n, theta=MOCK_THETA, seed=0, mock_dir=MOCK_DIR):
+    """Catalog for (n, theta, seed) under `mock_dir`, generated on first use."""
+    key = f"n{n}-s{seed}-" + "_".join(f"{v:.6g}" for v in theta)
+    path = os.path.join(mock_dir, key)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return MockCatalog(path)
+    return generate_catalog(path, n, theta, seed)
+
+
+class MockCatalog:
+    """Read-only memory-mapped view of a catalog directory."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != MOCK_FORMAT:
+            raise ValueError(f"{path}: unsupported catalog format {self.meta.get('format')}")
+        self.z, self.mu, self.sig = [np.load(os.path.join(path, f"{c}.npy"), mmap_mode='r')
+                                     for c in MOCK_COLUMNS]
+
+    def __len__(self):
+        return self.meta['n']
+
+    def chunks(self, rows):
+        for start in range(0, len(self), rows):
+            sl = slice(start, start + rows)
+            yield self.z[sl], self.mu[sl], self.sig[sl]
+
+# =============================================================================
+# 3. Streaming Likelihood
+# =============================================================================
+# Live (N, rows) float64 arrays while one chunk is evaluated (spline value,
+# D_L, log, μ_th and kernel inputs); sets the rows per chunk for a budget.
+CHUNK_TEMPORARIES = 6
+# (N, N_GRID) float64 arrays held by the interpolant for the whole stream:
+# two cubic splines of 4 coefficients each, plus the w(z), exponent and D_C
+# grids they are built from.
+GRID_ARRAYS = 2 * 4 + 3
+MIN_CHUNK_ROWS = 1024
+
+
+class StreamingSNLikelihood:
+    """
+    SN (+ optional BAO) χ² of `final_joint_objective_batch` over a catalog
+    too large for full-length temporaries. The population is split into
+    sub-batches; each builds one distance interpolant and streams the
+    catalog in chunks, so interpolant plus (N, rows) temporaries stay below
+    `mem_limit` bytes.
+    """
+
+    def __init__(self, catalog, mem_limit=64 << 20, bao=True):
+        self.catalog = catalog
+        self.mem_limit = mem_limit
+        self.bao = BAO_TABLE if bao is True else bao
+        z_max = float(catalog.meta['z_max'])
+        self.z_max = max(z_max, self.bao[0].max()) * 1.05 if self.bao else z_max * 1.05
+
+    def batch_plan(self, n_pop):
+        """(members per sub-batch, rows per chunk) for `n_pop` parameter vectors."""
+        grid_bytes = GRID_ARRAYS * N_GRID * 8
+        members = self.mem_limit // (grid_bytes + CHUNK_TEMPORARIES * 8 * MIN_CHUNK_ROWS)
+        if members < 1:
+            raise ValueError(f"mem_limit={self.mem_limit} B cannot hold one member's interpolant "
+                             f"and a {MIN_CHUNK_ROWS}-row chunk")
+        members = min(members, n_pop)
+        rows = (self.mem_limit // members - grid_bytes) // (CHUNK_TEMPORARIES * 8)
+        return members, rows
+
+    def __call__(self, pop):
+        pop = np.atleast_2d(pop)
+        chi2 = np.full(len(pop), 1e18)
+        valid = prior_mask(pop)
+        if not valid.any():
+            return chi2
+        p = pop[valid]
+        members, rows = self.batch_plan(len(p))
+        total = np.concatenate([self._chi2(p[i:i + members], rows) for i in range(0, len(p), members)])
+        chi2[valid] = np.where(np.isfinite(total), total, 1e18)
+        return chi2
+
+    def _chi2(self, p, rows):
+        dist = CSGTDistances(*p[:, :5].T, z_max=self.z_max)
+        kernels = active_kernels()
+        total = np.zeros(len(p))
+        for z, mu, sig in self.catalog.chunks(rows):
+            total += kernels.weighted_sq_sum(dist.mu(z, p[:, 5]), mu, 1.0 / (sig**2 + SIG_INT**2))
+        if self.bao:
+            bao_z, bao_dm, bao_dm_err, bao_dh, bao_dh_err = self.bao
+            total += kernels.weighted_sq_sum(dist.D_M(bao_z) / RD_FID, bao_dm, 1.0 / bao_dm_err**2)
+            total += kernels.weighted_sq_sum(dist.D_H(bao_z) / RD_FID, bao_dh, 1.0 / bao_dh_err**2)
+        return total
+
+# =============================================================================
+# 4. Throughput / Peak-RSS Benchmark
+# =============================================================================
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _bench_one(path, mode, n_pop, repeat, mem_limit):
+    """Runs in a fresh process so ru_maxrss belongs to this measurement alone."""
+    from Final_test import final_joint_objective_batch
+
+    catalog = MockCatalog(path)
+    rng = np.random.default_rng(1)
+    pop = np.asarray(catalog.meta['theta']) + rng.normal(size=(n_pop, 6)) * [0.01, 0.01, 0.005, 0.002, 0.1, 0.005]
+    if mode == 'streaming':
+        like = StreamingSNLikelihood(catalog, mem_limit=mem_limit)
+    else:
+        data = [np.array(col) for col in (catalog.z, catalog.mu, catalog.sig)]
+        like = lambda p: final_joint_objective_batch(p, *data)
+    rss_before = _peak_rss_mb()
+    like(pop)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        like(pop)
+    dt = (time.perf_counter() - t0) / repeat
+    return {'n': len(catalog), 'mode': mode, 'seconds': dt, 'sn_per_s': len(catalog) * n_pop / dt,
+            'peak_rss_mb': _peak_rss_mb(), 'base_rss_mb': rss_before}
+
+
+def benchmark(sizes=(10**3, 10**4, 10**5, 10**6), n_pop=16, repeat=3, mem_limit=64 << 20,
+              modes=('streaming', 'in-memory')):
+    """One spawned process per (size, mode); catalogs are cached in MOCK_DIR."""
+    paths = {n: cached_catalog(n).path for n in sizes}
+    results = []
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn'),
+                             max_tasks_per_child=1) as pool:
+        for n in sizes:
+            for mode in modes:
+                results.append(pool.submit(_bench_one, paths[n], mode, n_pop, repeat, mem_limit).result())
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock SN catalogs and the streaming χ²")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    gen = sub.add_parser('generate', help="write a mock catalog directory")
+    gen.add_argument('path')
+    gen.add_argument('-n', type=int, default=10**6)
+    gen.add_argument('--seed', type=int, default=0)
+    gen.add_argument('--theta', type=float, nargs=6, default=MOCK_THETA, metavar=('A', 'SIG', 'WOFF', 'OM', 'H0', 'M'))
+    bench = sub.add_parser('bench', help="throughput and peak RSS, 10³–10⁶ SNe")
+    bench.add_argument('--sizes', type=int, nargs='+', default=[10**3, 10**4, 10**5, 10**6])
+    bench.add_argument('--pop', type=int, default=16, help="parameter vectors per χ² batch")
+    bench.add_argument('--repeat', type=int, default=3)
+    bench.add_argument('--mem-mb', type=int, default=64, help="streaming temporaries budget")
+    args = parser.parse_args()
+
+    if args.cmd == 'generate':
+        t0 = time.perf_counter()
+        catalog = generate_catalog(args.path, args.n, args.theta, args.seed)
+        print(f"🌌 {len(catalog)} SNe → {args.path} ({time.perf_counter() - t0:.1f} s, "
+              f"z ∈ [{catalog.z.min():.3f}, {catalog.z.max():.3f}])")
+    else:
+        print(f"📏 χ² of {args.pop}-member batches (SN + DESI BAO), backend: {active_kernels().name}")
+        results = benchmark(args.sizes, args.pop, args.repeat, args.mem_mb << 20)
+        print(f"{'N_SN':>9} {'mode':<10} {'batch [s]':>10} {'SN·θ / s':>11} {'peak RSS [MB]':>14} "
+              f"{'after load [MB]':>16}")
+        for r in results:
+            print(f"{r['n']:>9} {r['mode']:<10} {r['seconds']:>10.4f} {r['sn_per_s']:>11.3g} "
+                  f"{r['peak_rss_mb']:>14.1f} {r['base_rss_mb']:>16.1f}")
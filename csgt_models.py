@@ -0,0 +1,184 @@
+import numpy as np
+from scipy.optimize import differential_evolution
+
+from csgt_distance import Z_PEAK_FIXED, CSGTDistances, ExpansionDistances, w_z_csgt
+from Final_test import BAO_TABLE, PRIOR_H0, PRIOR_OM, joint_chi2_from_distances
+from csgt_profile import PROFILER
+
+# =============================================================================
+# 1. Model Definition
+# =============================================================================
+M_BOUNDS = (-0.05, 0.05)
+
+
+class Model:
+    """
+    One expansion history: parameter names, fit bounds, prior box and a
+    vectorized kernel. Give either `w` (dark-energy EoS w(z, p1, p2, p3),
+    integrated with Om by `CSGTDistances`) or `E` (E(z, *theta) directly,
+    integrated by `ExpansionDistances`). H0 is always the last parameter;
+    the SN magnitude offset M_fixed is appended for fits and samplers.
+    """
+
+    def __init__(self, name, params, bounds, prior=None, w=None, E=None, description=''):
+        if (w is None) == (E is None):
+            raise ValueError("a model needs exactly one of `w` or `E`")
+        if params[-1] != 'H0':
+            raise ValueError("H0 must be the last model parameter")
+        self.name, self.params, self.description = name, tuple(params), description
+        self.bounds = [tuple(b) for b in bounds]
+        self.prior = dict(prior or {})
+        self.w, self.E_kernel = w, E
+
+    @property
+    def fit_bounds(self):
+        return self.bounds + [M_BOUNDS]
+
+    def distances(self, *theta, z_max=2.5):
+        """Distance object for θ = model params (scalars or (N,) arrays)."""
+        if self.w is not None:
+            return CSGTDistances(*theta, z_max=z_max, w_func=self.w)
+        return ExpansionDistances(self.E_kernel, theta[:-1], H0=theta[-1], z_max=z_max)
+
+    def prior_mask(self, pop):
+        valid = np.ones(len(pop), dtype=bool)
+        for name, (lo, hi) in self.prior.items():
+            col = pop[:, self.params.index(name)]
+            valid &= (lo < col) & (col < hi)
+        return valid
+
+    def chi2_batch(self, pop, z_sn, mu_sn, sig_sn, bao=None, engine=None):
+        """
+        Joint SN + BAO χ² for an (N, len(params) + 1) population (M_fixed
+        last), using the same batched path as `final_joint_objective_batch`.
+        `engine` replaces `self.distances` (e.g. an emulator for this model).
+        """
+        bao_z = (BAO_TABLE if bao is None else bao)[0]
+        pop = np.atleast_2d(pop)
+        chi2 = np.full(len(pop), 1e18)
+        valid = self.prior_mask(pop)
+        PROFILER.count('evaluations', len(pop))
+        PROFILER.count('prior_rejected', len(pop) - valid.sum())
+        if not valid.any():
+            return chi2
+        p = pop[valid]
+        z_max = max(np.max(z_sn), bao_z.max()) * 1.05
+        dist = (engine or self.distances)(*p[:, :-1].T, z_max=z_max)
+        chi2[valid] = joint_chi2_from_distances(dist, p[:, -1], z_sn, mu_sn, sig_sn, bao)
+        return chi2
+
+    def de_objective(self, x, z_sn, mu_sn, sig_sn, engine=None):
+        # differential_evolution(vectorized=True) passes x with shape (n_params, N)
+        return self.chi2_batch(x.T, z_sn, mu_sn, sig_sn, engine=engine)
+
+# =============================================================================
+# 2. Registry
+# =============================================================================
+MODELS = {}
+
+
+def register(model):
+    """
+    Add a model; it immediately gets the batched fit (`fit_model`), profile
+    scan (`csgt_scan --model`) and sampling (`model_log_posterior`) paths.
+    Analytic gradients (csgt_gradient) exist for csgt_dip only.
+    """
+    if model.name in MODELS:
+        raise ValueError(f"model '{model.name}' already registered")
+    MODELS[model.name] = model
+    return model
+
+
+def get_model(name):
+    try:
+        return MODELS[name]
+    except KeyError:
+        raise KeyError(f"unknown model '{name}'; registered: {', '.join(MODELS)}") from None
+
+
+# Prior box of final_joint_objective, shared by every model with Om / H0
+JOINT_PRIOR = {'Om': PRIOR_OM, 'H0': PRIOR_H0}
+
+
+def w_z_ultimate(z, A, sigma, w_off):
+    """Final_test_G.py convention: the dip enters with a minus sign."""
+    return w_off - A * np.exp(-(z - Z_PEAK_FIXED)**2 / (2 * sigma**2))
+
+
+def E_lcdm(z, Om):
+    return np.sqrt(Om * (1 + z)**3 + (1.0 - Om))
+
+
+def E_zstar(z, z_star, Om):
+    """CSGT_TensionResolution.py: H = H_FRW · |z − z*| / |z*|."""
+    return E_lcdm(z, Om) * np.abs(z - z_star) / np.abs(z_star)
+
+
+def E_eta(z, eta_0, Om):
+    """Csgt_comprehensive_plot.py: H = H_FRW / η(z), η(z) = η0^(1/√(1+z))."""
+    return E_lcdm(z, Om) / eta_0 ** (1 / (1 + z)**0.5)
+
+
+register(Model('csgt_dip', ('A', 'sigma', 'w_off', 'Om', 'H0'),
+               [(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76)],
+               prior=JOINT_PRIOR, w=w_z_csgt,
+               description="Final_test.py Gaussian dip w = w_off + A·exp(-(z-0.7)²/2σ²)"))
+register(Model('csgt_ultimate', ('A', 'sigma', 'w_off', 'Om', 'H0'),
+               [(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76)],
+               prior=JOINT_PRIOR, w=w_z_ultimate,
+               description="Final_test_G.py dip w = w_off − A·exp(-(z-0.7)²/2σ²)"))
+register(Model('csgt_zstar', ('z_star', 'Om', 'H0'),
+               [(-3.0, -0.8), (0.25, 0.35), (68, 76)],
+               prior={**JOINT_PRIOR, 'z_star': (-np.inf, 0.0)}, E=E_zstar,
+               description="CSGT_TensionResolution.py H_CSGT with |z − z*|/|z*| factor"))
+register(Model('csgt_eta', ('eta_0', 'Om', 'H0'),
+               [(0.98, 1.05), (0.25, 0.35), (68, 76)],
+               prior=JOINT_PRIOR, E=E_eta,
+               description="Csgt_comprehensive_plot.py H_csgt with η(z) boost"))
+register(Model('lcdm', ('Om', 'H0'),
+               [(0.25, 0.35), (68, 76)],
+               prior=JOINT_PRIOR, E=E_lcdm,
+               description="Flat ΛCDM reference"))
+
+# =============================================================================
+# 3. Fit / Sample Entry Points
+# =============================================================================
+def fit_model(name, z_sn, mu_sn, sig_sn, seed=0, engine=None, **de_kwargs):
+    """Vectorized differential-evolution fit of any registered model."""
+    model = get_model(name)
+    de_kwargs = {'popsize': 15, 'maxiter': 200, 'strategy': 'best1bin', **de_kwargs}
+    return differential_evolution(model.de_objective, model.fit_bounds, args=(z_sn, mu_sn, sig_sn, engine),
+                                  seed=seed, vectorized=True, updating='deferred', **de_kwargs)
+
+
+def model_log_posterior(name, z_sn, mu_sn, sig_sn, engine=None):
+    """`csgt_mcmc.JointLogPosterior` over a registered model's fit bounds."""
+    from csgt_mcmc import JointLogPosterior
+    model = get_model(name)
+    return JointLogPosterior(z_sn, mu_sn, sig_sn, bounds=model.fit_bounds,
+                             chi2_batch=model.chi2_batch, engine=engine)
+
+
+if __name__ == "__main__":
+    import argparse
+    from Final_test import load_pantheon_final
+    from csgt_figures import save_fit_result
+
+    parser = argparse.ArgumentParser(description="Fit any registered expansion model")
+    parser.add_argument('models', nargs='*', default=list(MODELS))
+    parser.add_argument('--maxiter', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', action='store_true', help="write csgt_fit_<model>.json per model")
+    args = parser.parse_args()
+
+    df = load_pantheon_final()
+    z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+    n_data = len(z_sn) + 2 * len(BAO_TABLE[0])
+    print(f"{'model':<14} {'χ²':>10} {'χ²/dof':>8}  best fit")
+    for name in args.models:
+        model = get_model(name)
+        res = fit_model(name, z_sn, mu_sn, sig_sn, seed=args.seed, maxiter=args.maxiter)
+        best = ", ".join(f"{p}={v:.4g}" for p, v in zip(model.params + ('M',), res.x))
+        print(f"{name:<14} {res.fun:>10.2f} {res.fun / (n_data - len(res.x)):>8.4f}  {best}")
+        if args.save:
+            save_fit_result(f"csgt_fit_{name}.json", name, model.params + ('M_fixed',), res.x, res.fun)
@@ -0,0 +1,180 @@
+import os
+import time
+import argparse
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.optimize import differential_evolution
+
+from csgt_emulator import get_emulator
+from csgt_kernels import BACKENDS, active_kernels, set_kernels, set_threads
+from csgt_models import get_model
+from Final_test import BAO_TABLE, final_joint_objective_batch, load_pantheon_final
+
+# =============================================================================
+# 1. Shared-Memory Datasets
+# =============================================================================
+DATASET_KEYS = ('z_sn', 'mu_sn', 'sig_sn', 'bao_z', 'bao_dm', 'bao_dm_err', 'bao_dh', 'bao_dh_err')
+FIT_BOUNDS = [(0.1, 0.6), (0.2, 0.6), (-1.2, -0.8), (0.25, 0.35), (68, 76), (-0.05, 0.05)]
+
+
+class SharedDataset:
+    """
+    Places the SN and BAO arrays once in POSIX shared memory.
+
+    Workers attach by name through `spec` (names, shapes, dtypes only), so no
+    array data is ever pickled into a task.
+    """
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.spec = {}
+        for key, arr in arrays.items():
+            arr = np.ascontiguousarray(arr, dtype=float)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            self._blocks.append(shm)
+            self.spec[key] = (shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """Zero-copy views onto a `SharedDataset`; returns (blocks, arrays)."""
+    blocks, arrays = [], {}
+    for key, (name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return blocks, arrays
+
+# =============================================================================
+# 2. Worker Side
+# =============================================================================
+_WORKER = {}
+
+
+def init_worker(spec, engine, kernels=None):
+    """Pool initializer: attach the shared dataset and select engine / kernels."""
+    set_threads(1)
+    if kernels:
+        set_kernels(kernels)
+    _WORKER['blocks'], _WORKER['data'] = attach(spec)
+    _WORKER['engine'] = engine
+
+
+def worker_arrays():
+    """((z, μ, σ) of the SNe, BAO table, engine) inside a pool worker."""
+    d = _WORKER['data']
+    return (d['z_sn'], d['mu_sn'], d['sig_sn']), tuple(d[k] for k in DATASET_KEYS[3:]), _WORKER['engine']
+
+
+def worker_batch(pop, model=None):
+    """Joint χ² of `pop` on the worker's shared dataset; `model`: csgt_models name (default csgt_dip)."""
+    sn, bao, engine = worker_arrays()
+    if model is not None:
+        return get_model(model).chi2_batch(pop, *sn, bao=bao, engine=engine)
+    return final_joint_objective_batch(pop, *sn, bao=bao, engine=engine)
+
+
+class ParallelJointObjective:
+    """
+    `differential_evolution(vectorized=True)` objective that splits each
+    generation into one contiguous chunk per worker.
+
+    Chunking depends only on the population size and worker count, so a given
+    (seed, workers) pair is bit-reproducible.
+    """
+
+    def __init__(self, pool, workers):
+        self.pool = pool
+        self.workers = workers
+
+    def __call__(self, x):
+        chunks = np.array_split(x.T, min(self.workers, x.shape[1]))
+        return np.concatenate(self.pool.map(worker_batch, chunks))
+
+# =============================================================================
+# 3. Parallel Fit & Speedup Report
+# =============================================================================
+def dataset_arrays(z_sn, mu_sn, sig_sn):
+    return dict(zip(DATASET_KEYS, (z_sn, mu_sn, sig_sn) + BAO_TABLE))
+
+
+def parallel_fit(z_sn, mu_sn, sig_sn, workers=None, seed=0, bounds=FIT_BOUNDS, engine=None, kernels=None,
+                 **de_kwargs):
+    """
+    Joint DE fit with objective evaluations spread over a process pool.
+    `kernels` names the csgt_kernels backend for the workers (default: the
+    parent's active backend).
+    """
+    kernels = kernels or active_kernels().name
+    workers = workers or os.cpu_count()
+    de_kwargs = {'popsize': 15, 'maxiter': 200, 'strategy': 'best1bin', **de_kwargs}
+    with SharedDataset(dataset_arrays(z_sn, mu_sn, sig_sn)) as shared:
+        with mp.get_context('spawn').Pool(workers, initializer=init_worker,
+                                          initargs=(shared.spec, engine, kernels)) as pool:
+            objective = ParallelJointObjective(pool, workers)
+            return differential_evolution(objective, bounds, seed=seed, vectorized=True,
+                                          updating='deferred', **de_kwargs)
+
+
+def speedup_report(z_sn, mu_sn, sig_sn, worker_counts=None, seed=0, maxiter=30, engine=None, kernels=None):
+    """Wall time and speedup of `parallel_fit` against worker count, for one engine / kernel backend."""
+    kernels = kernels or active_kernels().name
+    if worker_counts is None:
+        ncpu = os.cpu_count()
+        worker_counts = sorted({1, 2, 4, 8, 16, 32, ncpu} & set(range(1, ncpu + 1)))
+    rows = []
+    for n in worker_counts:
+        t0 = time.perf_counter()
+        res = parallel_fit(z_sn, mu_sn, sig_sn, workers=n, seed=seed, maxiter=maxiter, polish=False,
+                           engine=engine, kernels=kernels)
+        rows.append({'workers': n, 'seconds': time.perf_counter() - t0, 'chi2': res.fun, 'x': res.x})
+    t1 = rows[0]['seconds']
+    print(f"engine: {'emulator' if engine is not None else 'grid'}, kernels: {kernels}")
+    print(f"{'workers':>8} {'time [s]':>10} {'speedup':>8} {'χ²':>14}")
+    for r in rows:
+        r['speedup'] = t1 / r['seconds']
+        print(f"{r['workers']:>8d} {r['seconds']:>10.2f} {r['speedup']:>8.2f} {r['chi2']:>14.6f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel CSGT joint fit (Pantheon+ & DESI DR2)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--maxiter', type=int, default=200)
+    parser.add_argument('--speedup', action='store_true', help="report speedup vs. worker count")
+    parser.add_argument('--emulator', action='store_true', help="use the tabulated distance emulator")
+    parser.add_argument('--kernels', choices=list(BACKENDS), default=None,
+                        help="csgt_kernels backend (default: $CSGT_KERNELS / auto)")
+    args = parser.parse_args()
+
+    df = load_pantheon_final()
+    z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+    engine = get_emulator() if args.emulator else None
+
+    if args.speedup:
+        speedup_report(z_sn, mu_sn, sig_sn, seed=args.seed, maxiter=min(args.maxiter, 30), engine=engine,
+                       kernels=args.kernels)
+    else:
+        print(f"🚀 Parallel Joint Fit: {args.workers or os.cpu_count()} workers, seed = {args.seed}")
+        res = parallel_fit(z_sn, mu_sn, sig_sn, workers=args.workers, seed=args.seed,
+                           maxiter=args.maxiter, engine=engine, kernels=args.kernels, disp=True)
+        p = res.x
+        print(f"Final Joint χ² : {res.fun:.2f}")
+        print(f"Information Coupling (A) : {p[0]:.4f}")
+        print(f"Hubble Constant (H0)     : {p[4]:.2f} km/s/Mpc")
+        print(f"Matter Density (Om)      : {p[3]:.3f}")
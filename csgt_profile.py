@@ -0,0 +1,124 @@
+import csv
+import json
+import time
+import contextlib
+from collections import Counter, defaultdict
+
+# =============================================================================
+# Opt-in Objective Instrumentation
+# =============================================================================
+# Disabled (default): `stage()` returns one shared null context and `count()`
+# returns immediately, so instrumented code pays a method call per stage.
+_NULL = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 't0')
+
+    def __init__(self, profiler, name):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.stage_time[self.name] += time.perf_counter() - self.t0
+        self.profiler.stage_calls[self.name] += 1
+
+
+class Profiler:
+    """
+    Call counts, per-stage wall time, prior rejections, non-finite χ²
+    results, caught exceptions by type and per-generation optimizer progress
+    for the joint objective.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.stage_time = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.counters = Counter()
+        self.exceptions = Counter()
+        self.generations = []
+        self.t_start = time.perf_counter()
+
+    def enable(self, reset=True):
+        if reset:
+            self.reset()
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+
+    # --- Recording ---
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += int(n)
+
+    def exception(self, exc):
+        if self.enabled:
+            self.exceptions[type(exc).__name__] += 1
+
+    def generation(self, intermediate_result):
+        """`differential_evolution(callback=...)` hook: one row per generation."""
+        if self.enabled:
+            self.generations.append({
+                'generation': len(self.generations) + 1,
+                'elapsed': time.perf_counter() - self.t_start,
+                'best_chi2': float(intermediate_result.fun),
+                'convergence': float(getattr(intermediate_result, 'convergence', float('nan'))),
+                'evaluations': self.counters['evaluations'],
+            })
+
+    # --- Export ---
+    def summary(self):
+        evaluations = self.counters['evaluations']
+        return {
+            'wall_time': time.perf_counter() - self.t_start,
+            'counters': dict(self.counters),
+            'prior_rejection_rate': self.counters['prior_rejected'] / evaluations if evaluations else 0.0,
+            'nonfinite_rate': self.counters['nonfinite'] / evaluations if evaluations else 0.0,
+            'exception_rate': sum(self.exceptions.values()) / evaluations if evaluations else 0.0,
+            'exceptions': dict(self.exceptions),
+            'stages': {name: {'calls': self.stage_calls[name], 'seconds': self.stage_time[name]}
+                       for name in self.stage_time},
+            'generations': self.generations,
+        }
+
+    def export(self, prefix):
+        """Writes `<prefix>.json`, `<prefix>_stages.csv` and `<prefix>_generations.csv`."""
+        summary = self.summary()
+        with open(prefix + '.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        with open(prefix + '_stages.csv', 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'calls', 'seconds'])
+            for name, row in summary['stages'].items():
+                writer.writerow([name, row['calls'], row['seconds']])
+        with open(prefix + '_generations.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['generation', 'elapsed', 'best_chi2',
+                                                   'convergence', 'evaluations'])
+            writer.writeheader()
+            writer.writerows(self.generations)
+        return summary
+
+    def report(self):
+        s = self.summary()
+        total = sum(row['seconds'] for row in s['stages'].values()) or 1.0
+        print(f"Evaluations: {s['counters'].get('evaluations', 0)}  "
+              f"(prior-rejected {s['prior_rejection_rate']:.1%}, "
+              f"non-finite {s['nonfinite_rate']:.1%}, "
+              f"exceptions {s['exception_rate']:.1%} {s['exceptions']})")
+        for name, row in s['stages'].items():
+            print(f"  {name:<14} {row['calls']:>9d} calls {row['seconds']:>9.3f} s "
+                  f"({row['seconds'] / total:>5.1%})")
+
+
+PROFILER = Profiler()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import multiprocessing as mp
+
+import numpy as np
+from scipy.optimize import minimize
+
+from csgt_emulator import get_emulator
+from csgt_mcmc import FIT_BOUNDS, PARAM_NAMES
+from csgt_parallel import SharedDataset, dataset_arrays, init_worker, worker_arrays
+from csgt_scan import FD_STEP, value_and_grad
+from Final_test import BAO_TABLE, final_joint_objective_batch, joint_fit, load_pantheon_final
+
+# =============================================================================
+# 1. Data & Replicas (index arrays into the shared arrays)
+# =============================================================================
+def load_sn_surveys():
+    """(z, μ, σ, IDSURVEY): the columns and order of `load_pantheon_final`, plus the survey."""
+    df = load_pantheon_final(extra=('IDSURVEY',))
+    return tuple(df.iloc[:, i].values for i in range(4))
+
+
+def full_replica(n_sn, n_bao):
+    return {'kind': 'full', 'label': 'all', 'sn': np.arange(n_sn), 'bao': np.arange(n_bao)}
+
+
+def bootstrap_replicas(n_sn, n_bao, n, seed=0):
+    """SN and BAO points drawn with replacement; one child seed per replica."""
+    for r, child in enumerate(np.random.SeedSequence(seed).spawn(n)):
+        rng = np.random.default_rng(child)
+        yield {'kind': 'bootstrap', 'label': r,
+               'sn': np.sort(rng.integers(n_sn, size=n_sn)), 'bao': np.sort(rng.integers(n_bao, size=n_bao))}
+
+
+def jackknife_replicas(survey, n_bao):
+    """Leave one Pantheon+ survey (IDSURVEY) out; BAO kept whole."""
+    for s in np.unique(survey):
+        yield {'kind': 'jackknife', 'label': int(s), 'sn': np.flatnonzero(survey != s), 'bao': np.arange(n_bao)}
+
+# =============================================================================
+# 2. Worker: Warm-Started Refit of One Replica
+# =============================================================================
+def _refit(task):
+    (z_sn, mu_sn, sig_sn), bao_table, engine = worker_arrays()
+    sn, bao_idx = task['sn'], task['bao']
+    data = (z_sn[sn], mu_sn[sn], sig_sn[sn])
+    bao = tuple(col[bao_idx] for col in bao_table)
+
+    def batch(pop):
+        return final_joint_objective_batch(pop, *data, bao=bao, engine=engine)
+
+    bounds = np.asarray(task['bounds'])
+    free = list(range(len(bounds)))
+    h = FD_STEP * (bounds[:, 1] - bounds[:, 0])
+    lo, hi = bounds[:, 0] + h, bounds[:, 1] - h
+    x0 = np.clip(task['x0'], lo, hi)
+    t0 = time.perf_counter()
+    res = minimize(value_and_grad, x0, args=(x0, free, h, batch), jac=True, method='L-BFGS-B',
+                   bounds=list(zip(lo, hi)))
+    return {'kind': task['kind'], 'label': task['label'], 'x': res.x.tolist(), 'chi2': float(res.fun),
+            'dof': len(sn) + 2 * len(bao_idx) - len(x0), 'nit': int(res.nit),
+            'converged': bool(res.success), 'seconds': time.perf_counter() - t0}
+
+# =============================================================================
+# 3. Streaming Aggregation
+# =============================================================================
+class StreamingSummary:
+    """Running mean / variance (Welford) per replica kind, updated as refits arrive."""
+
+    def __init__(self, names=PARAM_NAMES):
+        self.names = names
+        self.records = {}
+        self.stats = {}
+
+    def add(self, rec):
+        self.records.setdefault(rec['kind'], []).append(rec)
+        x = np.append(rec['x'], rec['chi2'] / rec['dof'])
+        n, mean, m2 = self.stats.get(rec['kind'], (0, np.zeros_like(x), np.zeros_like(x)))
+        n += 1
+        delta = x - mean
+        mean = mean + delta / n
+        self.stats[rec['kind']] = (n, mean, m2 + delta * (x - mean))
+
+    def current(self, kind):
+        """(n, mean, std) of (params..., reduced χ²) so far."""
+        n, mean, m2 = self.stats[kind]
+        return n, mean, np.sqrt(m2 / max(n - 1, 1))
+
+    def progress(self, kind, total, key='H0'):
+        n, mean, std = self.current(kind)
+        i = self.names.index(key)
+        return f"{kind} {n}/{total}: {key} = {mean[i]:.3f} ± {std[i]:.3f}, χ²_red = {mean[-1]:.4f}"
+
+    def report(self, full):
+        x_full = np.append(full['x'], full['chi2'] / full['dof'])
+        cols = self.names + ('chi2_red',)
+        print(f"{'':<10}" + "".join(f"{c:>11}" for c in cols))
+        print(f"{'full fit':<10}" + "".join(f"{v:>11.4f}" for v in x_full))
+        if 'bootstrap' in self.records:
+            samples = np.array([np.append(r['x'], r['chi2'] / r['dof']) for r in self.records['bootstrap']])
+            lo, hi = np.percentile(samples, [15.87, 84.13], axis=0)
+            print(f"{'boot std':<10}" + "".join(f"{v:>11.4f}" for v in samples.std(axis=0, ddof=1)))
+            print(f"{'boot 16%':<10}" + "".join(f"{v:>11.4f}" for v in lo))
+            print(f"{'boot 84%':<10}" + "".join(f"{v:>11.4f}" for v in hi))
+        if 'jackknife' in self.records:
+            recs = sorted(self.records['jackknife'], key=lambda r: r['label'])
+            samples = np.array([np.append(r['x'], r['chi2'] / r['dof']) for r in recs])
+            n = len(samples)
+            sigma = np.sqrt((n - 1) / n * np.sum((samples - samples.mean(axis=0))**2, axis=0))
+            print(f"{'jack std':<10}" + "".join(f"{v:>11.4f}" for v in sigma))
+            print("\nLeave-one-survey-out shifts from the full fit:")
+            for r, row in zip(recs, samples):
+                print(f"{'-' + str(r['label']):<10}" + "".join(f"{v:>+11.4f}" for v in row - x_full))
+
+# =============================================================================
+# 4. Parallel Driver
+# =============================================================================
+def run_resampling(z_sn, mu_sn, sig_sn, survey, n_boot=200, jackknife=True, workers=None,
+                   seed=0, x0=None, bounds=FIT_BOUNDS, out=None, engine=None):
+    """
+    Polish the global fit of the full data (`x0`, default the stored
+    `Final_test.joint_fit` optimum), then refit every replica from that
+    optimum in a process pool. Results stream into a `StreamingSummary`
+    (and, with `out`, a JSONL file) in completion order.
+    """
+    if x0 is None:
+        x0 = joint_fit(z_sn, mu_sn, sig_sn, bounds=bounds).x
+    workers = workers or os.cpu_count()
+    n_sn, n_bao = len(z_sn), len(BAO_TABLE[0])
+    base = {'bounds': np.asarray(bounds).tolist()}
+    summary = StreamingSummary()
+    sink = open(out, 'a') if out else None
+    try:
+        with SharedDataset(dataset_arrays(z_sn, mu_sn, sig_sn)) as shared:
+            with mp.get_context('spawn').Pool(workers, initializer=init_worker,
+                                              initargs=(shared.spec, engine)) as pool:
+                full = pool.apply(_refit, (dict(base, x0=list(x0), **full_replica(n_sn, n_bao)),))
+                replicas = list(bootstrap_replicas(n_sn, n_bao, n_boot, seed))
+                if jackknife:
+                    replicas += list(jackknife_replicas(survey, n_bao))
+                tasks = [dict(base, x0=full['x'], **rep) for rep in replicas]
+                totals = {k: sum(r['kind'] == k for r in replicas) for k in ('bootstrap', 'jackknife')}
+                for rec in pool.imap_unordered(_refit, tasks):
+                    summary.add(rec)
+                    if sink:
+                        sink.write(json.dumps(rec) + '\n')
+                        sink.flush()
+                    print("  " + summary.progress(rec['kind'], totals[rec['kind']]), end='\r')
+                print()
+    finally:
+        if sink:
+            sink.close()
+    return full, summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bootstrap / leave-one-survey-out jackknife refits")
+    parser.add_argument('--boot', type=int, default=200, help="number of bootstrap replicas")
+    parser.add_argument('--no-jackknife', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="append every refit to this JSONL file")
+    parser.add_argument('--emulator', action='store_true', help="use the tabulated distance emulator")
+    args = parser.parse_args()
+
+    z_sn, mu_sn, sig_sn, survey = load_sn_surveys()
+    print(f"🔁 Resampling: {args.boot} bootstrap + "
+          f"{0 if args.no_jackknife else len(np.unique(survey))} jackknife refits "
+          f"({len(z_sn)} SN, {len(BAO_TABLE[0])} BAO bins)")
+    t0 = time.perf_counter()
+    full, summary = run_resampling(z_sn, mu_sn, sig_sn, survey, n_boot=args.boot,
+                                   jackknife=not args.no_jackknife, workers=args.workers, seed=args.seed,
+                                   out=args.out, engine=get_emulator() if args.emulator else None)
+    n_fits = sum(len(r) for r in summary.records.values()) + 1
+    print(f"{n_fits} fits in {time.perf_counter() - t0:.1f} s\n")
+    summary.report(full)
@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import queue
+import multiprocessing as mp
+from collections import deque
+from functools import partial
+
+import numpy as np
+from scipy.optimize import minimize
+
+from csgt_emulator import get_emulator
+from csgt_gradient import joint_chi2_and_grad
+from csgt_mcmc import fit_start
+from csgt_models import MODELS, fit_model, get_model
+from csgt_parallel import SharedDataset, dataset_arrays, init_worker, worker_arrays, worker_batch
+from Final_test import load_pantheon_final
+
+# =============================================================================
+# 1. Scan Definitions
+# =============================================================================
+SCAN_PAIRS = {'H0-Om': ('H0', 'Om'), 'A-sigma': ('A', 'sigma')}
+# Δχ² for 68.3 / 95.4 / 99.7 % with two profiled parameters
+DCHI2_LEVELS = (2.30, 6.18, 11.83)
+FD_STEP = 1e-5  # central-difference step (emulator engine), as a fraction of each bound width
+
+# =============================================================================
+# 2. Worker: Warm-Started Profile Minimization
+# =============================================================================
+def value_and_grad(u, template, free, h, batch=worker_batch):
+    """χ² and its central-difference gradient over `free` in one batched call."""
+    k = len(free)
+    pop = np.tile(template, (2 * k + 1, 1))
+    pop[:, free] = u
+    pop[1:k + 1, free] += np.diag(h)
+    pop[k + 1:, free] -= np.diag(h)
+    chi2 = batch(pop)
+    return chi2[0], (chi2[1:k + 1] - chi2[k + 1:]) / (2 * h)
+
+
+def analytic_value_and_grad(u, template, free):
+    """χ² and its analytic gradient (`joint_chi2_and_grad`) over `free` on the worker's data."""
+    x = np.array(template, dtype=float)
+    x[free] = u
+    sn, bao, _ = worker_arrays()
+    chi2, grad = joint_chi2_and_grad(x, *sn, bao=bao)
+    return chi2[0], grad[0, free]
+
+
+def _profile_nodes(task):
+    """
+    Minimize χ² over the nuisance parameters at each node of `task['nodes']`
+    in order. Every node starts from the best of its candidate starts (the
+    optima of already-finished neighbours) and the previous node's optimum.
+    csgt_dip on the grid engine uses the analytic gradient; the emulator and
+    the other models have no sensitivities and use central differences.
+    """
+    analytic = task['model'] == 'csgt_dip' and worker_arrays()[2] is None
+    batch = partial(worker_batch, model=task['model'])
+    fixed, bounds = task['fixed'], np.asarray(task['bounds'])
+    free = [i for i in range(len(bounds)) if i not in fixed]
+    h = FD_STEP * (bounds[free, 1] - bounds[free, 0])
+    lo, hi = bounds[free, 0] + h, bounds[free, 1] - h
+    records, previous = [], None
+    for key, coords, candidates in task['nodes']:
+        starts = np.array(candidates + ([previous] if previous is not None else []), dtype=float)
+        starts[:, fixed] = coords
+        starts[:, free] = np.clip(starts[:, free], lo, hi)
+        start = starts[np.argmin(batch(starts))]
+
+        calls = [0]
+
+        def fun(u):
+            calls[0] += 1
+            if analytic:
+                return analytic_value_and_grad(u, start, free)
+            return value_and_grad(u, start, free, h, batch)
+
+        res = minimize(fun, start[free], jac=True, method='L-BFGS-B', bounds=list(zip(lo, hi)))
+        best = start.copy()
+        best[free] = res.x
+        previous = best
+        records.append({'key': list(key), 'coords': list(coords), 'chi2': float(res.fun),
+                        'best': best.tolist(), 'batches': calls[0], 'converged': bool(res.success)})
+    return records
+
+# =============================================================================
+# 3. Streaming, Restartable Scan with Adaptive Refinement
+# =============================================================================
+class ProfileScan:
+    """
+    2-D profile likelihood χ²_prof(a, b) = min over the other parameters
+    of a csgt_models model (parameters + M_fixed, default its fit bounds).
+
+    Nodes live on an integer lattice that is 2**refine times finer than the
+    base grid, so refined points have exact keys. Each finished node is
+    appended as one JSON line to `path` (after a header line), so a partial
+    scan can be read at any time and `run()` resumes where it stopped.
+    """
+
+    def __init__(self, path, pair=('H0', 'Om'), shape=(21, 21), bounds=None,
+                 refine=2, levels=DCHI2_LEVELS, model='csgt_dip'):
+        self.path = path
+        self.model = get_model(model)
+        self.names = self.model.params + ('M_fixed',)
+        self.pair = tuple(pair)
+        self.fixed = [self.names.index(p) for p in self.pair]
+        self.bounds = np.asarray(self.model.fit_bounds if bounds is None else bounds, dtype=float)
+        self.shape, self.refine, self.levels = tuple(shape), refine, tuple(levels)
+        self.scale = 1 << refine
+        self.header = {'model': self.model.name, 'pair': list(self.pair), 'shape': list(self.shape),
+                       'refine': refine, 'bounds': self.bounds.tolist()}
+        self.done = {}
+        self.start = None
+        if os.path.exists(path):
+            self._load()
+
+    # --- Storage ---
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        # A crash can leave a torn last line; drop it so appends stay valid
+        end = raw.rfind(b'\n') + 1
+        if end < len(raw):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        lines = raw[:end].decode().splitlines()
+        if not lines:
+            return
+        header = json.loads(lines[0])
+        if header != self.header:
+            raise ValueError(f"{self.path} holds a different scan: {header}")
+        for line in lines[1:]:
+            rec = json.loads(line)
+            self.done[tuple(rec['key'])] = rec
+
+    def _append(self, records):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a') as f:
+            if new_file:
+                f.write(json.dumps(self.header) + '\n')
+            for rec in records:
+                f.write(json.dumps(rec) + '\n')
+                self.done[tuple(rec['key'])] = rec
+            f.flush()
+            os.fsync(f.fileno())
+
+    # --- Lattice ---
+    def coords(self, key):
+        lo, hi = self.bounds[self.fixed, 0], self.bounds[self.fixed, 1]
+        return tuple((lo + np.asarray(key) * (hi - lo) / ((np.asarray(self.shape) - 1) * self.scale)).tolist())
+
+    def nearest_key(self, x):
+        """Base-grid node closest to the scanned coordinates of the vector `x`."""
+        lo, hi = self.bounds[self.fixed, 0], self.bounds[self.fixed, 1]
+        frac = np.clip((np.asarray(x)[self.fixed] - lo) / (hi - lo), 0.0, 1.0)
+        return tuple((np.rint(frac * (np.asarray(self.shape) - 1)).astype(int) * self.scale).tolist())
+
+    def _candidates(self, key, reach):
+        """Optima of finished nodes within `reach` lattice units (else the global fit)."""
+        near = [rec['best'] for k, rec in self.done.items()
+                if abs(k[0] - key[0]) <= reach and abs(k[1] - key[1]) <= reach]
+        return near or [self.start.tolist()]
+
+    def _base_tasks(self, chunk):
+        """
+        Row segments of `chunk` unfinished nodes, nearest to the global fit
+        first, so the grid fills outwards in waves from finished neighbours.
+        """
+        s, tasks = self.scale, []
+        for i in range(self.shape[0]):
+            row = [(i * s, j * s) for j in range(self.shape[1]) if (i * s, j * s) not in self.done]
+            tasks += [row[start:start + chunk] for start in range(0, len(row), chunk)]
+        seed = self.nearest_key(self.start)
+        return sorted(tasks, key=lambda t: min(max(abs(k[0] - seed[0]), abs(k[1] - seed[1])) for k in t))
+
+    def _refine_tasks(self, level, chunk):
+        """(task chunks, candidate reach): midpoints of every cell whose corner Δχ² values straddle a contour level."""
+        step = self.scale >> (level - 1)
+        half = step // 2
+        chi2_min = min(rec['chi2'] for rec in self.done.values())
+        new = set()
+        for (i, j) in list(self.done):
+            if i % step or j % step:
+                continue
+            corners = [(i, j), (i + step, j), (i, j + step), (i + step, j + step)]
+            if not all(c in self.done for c in corners):
+                continue
+            d = [self.done[c]['chi2'] - chi2_min for c in corners]
+            if any(min(d) < lev < max(d) for lev in self.levels):
+                new.update([(i + half, j), (i, j + half), (i + half, j + half),
+                            (i + step, j + half), (i + half, j + step)])
+        nodes = sorted(k for k in new if k not in self.done)
+        return [nodes[start:start + chunk] for start in range(0, len(nodes), chunk)], half
+
+    # --- Driver ---
+    def _run_tasks(self, pool, workers, tasks, reach, label):
+        """
+        Keep `workers` tasks (lists of node keys) in flight. Candidate starts
+        are read from `self.done` when a task is dispatched, not when the
+        task list is built, so each task sees every node finished before it.
+        """
+        if not tasks:
+            return
+        t0, n_total, n_done = time.perf_counter(), sum(len(t) for t in tasks), 0
+        pending, finished, in_flight = deque(tasks), queue.Queue(), 0
+        while pending or in_flight:
+            while pending and in_flight < workers:
+                keys = pending.popleft()
+                job = {'model': self.model.name, 'fixed': self.fixed, 'bounds': self.bounds.tolist(),
+                       'nodes': [(k, self.coords(k), self._candidates(k, reach)) for k in keys]}
+                pool.apply_async(_profile_nodes, (job,), callback=finished.put, error_callback=finished.put)
+                in_flight += 1
+            records = finished.get()
+            in_flight -= 1
+            if isinstance(records, BaseException):
+                raise records
+            self._append(records)
+            n_done += len(records)
+            print(f"  {label}: {n_done}/{n_total} nodes  ({time.perf_counter() - t0:.1f} s)", end='\r')
+        print()
+
+    def run(self, z_sn, mu_sn, sig_sn, workers=None, chunk=4, engine=None, x0=None):
+        """
+        Base grid, then `refine` rounds of contour refinement; skips finished
+        nodes. Nodes without finished neighbours start from `x0` (default:
+        the global fit; for csgt_dip the stored one, `csgt_mcmc.fit_start`).
+        """
+        if engine is not None and self.model.name != 'csgt_dip':
+            raise ValueError(f"the distance emulator tabulates csgt_dip, not {self.model.name}")
+        workers = workers or os.cpu_count()
+        if x0 is None:
+            x0 = (fit_start(z_sn, mu_sn, sig_sn) if self.model.name == 'csgt_dip'
+                  else fit_model(self.model.name, z_sn, mu_sn, sig_sn).x)
+        self.start = np.asarray(x0, dtype=float)
+        with SharedDataset(dataset_arrays(z_sn, mu_sn, sig_sn)) as shared:
+            with mp.get_context('spawn').Pool(workers, initializer=init_worker,
+                                              initargs=(shared.spec, engine)) as pool:
+                self._run_tasks(pool, workers, self._base_tasks(chunk), self.scale, "base grid")
+                for level in range(1, self.refine + 1):
+                    self._run_tasks(pool, workers, *self._refine_tasks(level, chunk), f"refine {level}")
+        return self
+
+    # --- Results ---
+    def points(self):
+        """(a, b, Δχ², best-fit vectors) over every finished node."""
+        recs = list(self.done.values())
+        ab = np.array([r['coords'] for r in recs])
+        chi2 = np.array([r['chi2'] for r in recs])
+        return ab[:, 0], ab[:, 1], chi2 - chi2.min(), np.array([r['best'] for r in recs])
+
+    def profile_1d(self, axis=0):
+        """1-D profile along one scan axis: min Δχ² over the other, across all nodes."""
+        a, b, dchi2, _ = self.points()
+        x = (a, b)[axis]
+        grid = np.unique(np.round(x, 12))
+        return grid, np.array([dchi2[np.isclose(x, g)].min() for g in grid])
+
+    def plot(self, fname):
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        a, b, dchi2, _ = self.points()
+        fig, ax = plt.subplots(figsize=(7, 6))
+        cs = ax.tricontourf(a, b, np.minimum(dchi2, 3 * self.levels[-1]), levels=30, cmap='viridis_r')
+        ax.tricontour(a, b, dchi2, levels=self.levels, colors='w', linewidths=1.5)
+        ax.plot(a, b, 'k.', ms=2, alpha=0.4)
+        fig.colorbar(cs, ax=ax, label='Δχ² (profiled)')
+        ax.set_xlabel(self.pair[0])
+        ax.set_ylabel(self.pair[1])
+        ax.set_title(f"Profile likelihood: {self.pair[0]} × {self.pair[1]}")
+        fig.tight_layout()
+        fig.savefig(fname, dpi=150)
+        plt.close(fig)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parallel 2-D profile-likelihood scan")
+    parser.add_argument('pair', nargs='?', default='H0-Om', choices=list(SCAN_PAIRS))
+    parser.add_argument('--model', default='csgt_dip', choices=list(MODELS))
+    parser.add_argument('--shape', type=int, nargs=2, default=(21, 21))
+    parser.add_argument('--refine', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk', type=int, default=4, help="nodes per task (warm-start chain length)")
+    parser.add_argument('--out', default=None, help="scan file (default: csgt_scan_<pair>.jsonl)")
+    parser.add_argument('--plot', default=None, help="write a Δχ² contour image")
+    parser.add_argument('--emulator', action='store_true', help="use the tabulated distance emulator")
+    args = parser.parse_args()
+
+    df = load_pantheon_final()
+    z_sn, mu_sn, sig_sn = df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values
+
+    suffix = '' if args.model == 'csgt_dip' else f"_{args.model}"
+    out = args.out or f"csgt_scan_{args.pair}{suffix}.jsonl"
+    scan = ProfileScan(out, SCAN_PAIRS[args.pair], shape=args.shape, refine=args.refine, model=args.model)
+    print(f"🗺  Profile scan {args.pair} ({args.model}): {args.shape[0]}×{args.shape[1]} base grid, "
+          f"{args.refine} refinement rounds → {out} ({len(scan.done)} nodes already done)")
+    t0 = time.perf_counter()
+    scan.run(z_sn, mu_sn, sig_sn, workers=args.workers, chunk=args.chunk,
+             engine=get_emulator() if args.emulator else None)
+    a, b, dchi2, best = scan.points()
+    i = np.argmin(dchi2)
+    print(f"{len(dchi2)} nodes in {time.perf_counter() - t0:.1f} s; profile minimum at "
+          f"{scan.pair[0]}={a[i]:.4g}, {scan.pair[1]}={b[i]:.4g}: "
+          + ", ".join(f"{p}={v:.4g}" for p, v in zip(scan.names, best[i])))
+    for lev in DCHI2_LEVELS:
+        inside = dchi2 < lev
+        print(f"  Δχ² < {lev:5.2f}: {scan.pair[0]} ∈ [{a[inside].min():.4g}, {a[inside].max():.4g}], "
+              f"{scan.pair[1]} ∈ [{b[inside].min():.4g}, {b[inside].max():.4g}]")
+    if args.plot:
+        scan.plot(args.plot)
+        print(f"📈 Contours saved → {args.plot}")
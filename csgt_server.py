@@ -0,0 +1,347 @@
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from csgt_mcmc import FIT_BOUNDS, PARAM_NAMES, README_BEST
+
+# =============================================================================
+# 1. Protocol
+# =============================================================================
+# Newline-delimited JSON over a localhost TCP socket. Requests:
+#   {"id": 7, "x": [[A, sigma, w_off, Om, H0, M_fixed], ...]}  -> {"id": 7, "chi2": [...]}
+#   {"op": "stats"} / {"op": "info"}
+# Requests on one connection may be pipelined; replies carry the request id.
+DEFAULT_HOST, DEFAULT_PORT = '127.0.0.1', 8765
+BATCH_WINDOW = 0.002  # seconds to wait for more requests before evaluating
+MAX_BATCH = 1024      # vectors per batch that trigger an immediate evaluation
+STATS_WINDOW = 10000  # most recent requests / batches kept for percentiles
+
+# =============================================================================
+# 2. Server
+# =============================================================================
+class ServerStats:
+    def __init__(self, maxlen=STATS_WINDOW):
+        self.latency = deque(maxlen=maxlen)
+        self.batch_sizes = deque(maxlen=maxlen)
+        self.batch_seconds = deque(maxlen=maxlen)
+        self.requests = self.vectors = self.batches = 0
+        self.t_start = time.perf_counter()
+
+    def record_batch(self, size, seconds):
+        self.batches += 1
+        self.vectors += size
+        self.batch_sizes.append(size)
+        self.batch_seconds.append(seconds)
+
+    def record_request(self, seconds):
+        self.requests += 1
+        self.latency.append(seconds)
+
+    def snapshot(self):
+        lat = np.asarray(self.latency) * 1e3
+        sizes = np.asarray(self.batch_sizes)
+        out = {'requests': self.requests, 'vectors': self.vectors, 'batches': self.batches,
+               'uptime_s': time.perf_counter() - self.t_start}
+        if len(lat):
+            out['latency_ms'] = dict(zip(('p50', 'p90', 'p99', 'max'),
+                                         np.percentile(lat, [50, 90, 99, 100]).tolist()))
+        if len(sizes):
+            out['batch_size'] = {'mean': float(sizes.mean()), 'p50': float(np.median(sizes)),
+                                 'max': int(sizes.max())}
+            out['eval_ms_per_batch'] = float(np.mean(self.batch_seconds) * 1e3)
+        return out
+
+
+class FitServer:
+    """
+    Loads the data and the joint objective once and evaluates parameter
+    vectors for many clients. Requests arriving within `window` seconds of
+    each other, or while a batch is being evaluated, are coalesced into one
+    `final_joint_objective_batch` call.
+    """
+
+    def __init__(self, window=BATCH_WINDOW, max_batch=MAX_BATCH, engine=None):
+        from Final_test import BAO_TABLE, final_joint_objective_batch, load_pantheon_final
+
+        t0 = time.perf_counter()
+        df = load_pantheon_final()
+        self.data = (df.iloc[:,0].values, df.iloc[:,1].values, df.iloc[:,2].values)
+        self.n_bao = len(BAO_TABLE[0])
+        self.objective = lambda pop: final_joint_objective_batch(pop, *self.data, engine=engine)
+        self.objective(README_BEST[None])
+        self.startup = time.perf_counter() - t0
+
+        self.window, self.max_batch = window, max_batch
+        self.stats = ServerStats()
+        self._pending, self._n_pending = [], 0
+        self._timer, self._busy = None, False
+        # One evaluation at a time, off the event loop
+        self._executor = ThreadPoolExecutor(1)
+
+    # --- Coalescing ---
+    def submit(self, pop):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((pop, fut))
+        self._n_pending += len(pop)
+        if self._n_pending >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._busy or not self._pending:
+            # A running batch flushes whatever queued up behind it
+            return
+        batch, self._pending, self._n_pending = self._pending, [], 0
+        self._busy = True
+        asyncio.ensure_future(self._evaluate(batch))
+
+    async def _evaluate(self, batch):
+        pop = np.vstack([p for p, _ in batch])
+        t0 = time.perf_counter()
+        try:
+            chi2 = await asyncio.get_running_loop().run_in_executor(self._executor, self.objective, pop)
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.cancelled():
+                    fut.set_exception(exc)
+        else:
+            self.stats.record_batch(len(pop), time.perf_counter() - t0)
+            start = 0
+            for p, fut in batch:
+                if not fut.cancelled():
+                    fut.set_result(chi2[start:start + len(p)])
+                start += len(p)
+        finally:
+            self._busy = False
+            self._flush()
+
+    # --- Connections ---
+    def info(self):
+        return {'params': list(PARAM_NAMES), 'bounds': np.asarray(FIT_BOUNDS).tolist(),
+                'n_sn': len(self.data[0]), 'n_bao': self.n_bao, 'startup_s': self.startup,
+                'window_s': self.window, 'max_batch': self.max_batch}
+
+    async def _respond(self, line, writer, lock):
+        t0 = time.perf_counter()
+        rid = None
+        try:
+            msg = json.loads(line)
+            rid = msg.get('id')
+            op = msg.get('op', 'chi2')
+            if op == 'chi2':
+                pop = np.atleast_2d(np.asarray(msg['x'], dtype=float))
+                if pop.ndim != 2 or pop.shape[1] != len(PARAM_NAMES):
+                    raise ValueError(f"x must have shape (N, {len(PARAM_NAMES)}), got {pop.shape}")
+                chi2 = await self.submit(pop)
+                reply = {'id': rid, 'chi2': chi2.tolist()}
+                self.stats.record_request(time.perf_counter() - t0)
+            elif op == 'stats':
+                reply = {'id': rid, **self.stats.snapshot()}
+            elif op == 'info':
+                reply = {'id': rid, **self.info()}
+            else:
+                raise ValueError(f"unknown op '{op}'")
+        except Exception as exc:
+            # Bad input or a failed batch: report it, keep the connection
+            reply = {'id': rid, 'error': f"{type(exc).__name__}: {exc}"}
+        async with lock:
+            writer.write((json.dumps(reply) + '\n').encode())
+            await writer.drain()
+
+    async def _handle(self, reader, writer):
+        lock, tasks = asyncio.Lock(), set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"🛰  CSGT fit server on {host}:{port} ({len(self.data[0])} SN, {self.n_bao} BAO bins, "
+              f"ready in {self.startup:.2f} s)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+# =============================================================================
+# 3. Client (drop-in objective)
+# =============================================================================
+class FitClient:
+    """
+    Blocking client for scripts and notebooks.
+
+    `client(x)` takes one parameter vector (→ float) or an (N, 6) array
+    (→ array), so it replaces `final_joint_objective` in `minimize`, and
+    `client.vectorized` takes the (6, N) layout of
+    `differential_evolution(vectorized=True)`. One request at a time per
+    client; use one client per thread for concurrency.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rwb')
+        self._lock = threading.Lock()
+        self._id = 0
+
+    def _call(self, msg):
+        with self._lock:
+            self._id += 1
+            self._file.write((json.dumps({'id': self._id, **msg}) + '\n').encode())
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("fit server closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def chi2(self, pop):
+        return np.asarray(self._call({'x': np.atleast_2d(pop).tolist()})['chi2'])
+
+    def __call__(self, x, *args):
+        x = np.asarray(x, dtype=float)
+        chi2 = self.chi2(x)
+        return chi2[0] if x.ndim == 1 else chi2
+
+    def vectorized(self, x, *args):
+        return self.chi2(np.asarray(x).T)
+
+    def stats(self):
+        return self._call({'op': 'stats'})
+
+    def info(self):
+        return self._call({'op': 'info'})
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def wait_for_server(host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60.0):
+    t_end = time.monotonic() + timeout
+    while True:
+        try:
+            return FitClient(host, port)
+        except OSError:
+            if time.monotonic() > t_end:
+                raise
+            time.sleep(0.05)
+
+# =============================================================================
+# 4. Load Test
+# =============================================================================
+def load_test(host, port, clients, requests, seed=0):
+    """`clients` threads, each sending `requests` single vectors back to back."""
+    latencies = [[] for _ in range(clients)]
+
+    def worker(k):
+        rng = np.random.default_rng([seed, k])
+        with FitClient(host, port) as client:
+            for _ in range(requests):
+                x = README_BEST + rng.normal(size=6) * [0.01, 0.01, 0.005, 0.002, 0.1, 0.005]
+                t0 = time.perf_counter()
+                client(x)
+                latencies[k].append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    lat = np.concatenate(latencies) * 1e3
+    return {'clients': clients, 'requests': len(lat), 'wall_s': wall, 'throughput': len(lat) / wall,
+            'latency_ms': dict(zip(('p50', 'p90', 'p99', 'max'), np.percentile(lat, [50, 90, 99, 100])))}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Warm, batching local fit server")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    srv = sub.add_parser('serve')
+    srv.add_argument('--window', type=float, default=BATCH_WINDOW, help="coalescing window [s]")
+    srv.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    srv.add_argument('--emulator', action='store_true', help="use the tabulated distance emulator")
+    bench = sub.add_parser('bench', help="concurrent load test (starts a server if none is running)")
+    bench.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    bench.add_argument('--requests', type=int, default=50, help="requests per client")
+    sub.add_parser('stats')
+    for p in (srv, bench, sub.choices['stats']):
+        p.add_argument('--host', default=DEFAULT_HOST)
+        p.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.cmd == 'serve':
+        engine = None
+        if args.emulator:
+            from csgt_emulator import get_emulator
+            engine = get_emulator()
+        fit_server = FitServer(window=args.window, max_batch=args.max_batch, engine=engine)
+        try:
+            asyncio.run(fit_server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            print("\n" + json.dumps(fit_server.stats.snapshot(), indent=2))
+    elif args.cmd == 'stats':
+        with FitClient(args.host, args.port) as client:
+            print(json.dumps(client.stats(), indent=2))
+    else:
+        proc = None
+        try:
+            FitClient(args.host, args.port, timeout=1.0).close()
+        except OSError:
+            proc = subprocess.Popen([sys.executable, __file__, 'serve', '--host', args.host,
+                                     '--port', str(args.port)])
+        try:
+            t0 = time.perf_counter()
+            with wait_for_server(args.host, args.port) as client:
+                info = client.info()
+            print(f"Server warm-up {info['startup_s']:.2f} s (client waited "
+                  f"{time.perf_counter() - t0:.2f} s); window {info['window_s'] * 1e3:.1f} ms\n")
+            print(f"{'clients':>8} {'requests':>9} {'req/s':>8} {'p50 [ms]':>9} {'p90 [ms]':>9} "
+                  f"{'p99 [ms]':>9} {'mean batch':>11}")
+            for n in args.clients:
+                with FitClient(args.host, args.port) as client:
+                    before = client.stats()
+                r = load_test(args.host, args.port, n, args.requests)
+                with FitClient(args.host, args.port) as client:
+                    after = client.stats()
+                batches = after['batches'] - before['batches']
+                mean_batch = (after['vectors'] - before['vectors']) / max(batches, 1)
+                lat = r['latency_ms']
+                print(f"{n:>8} {r['requests']:>9} {r['throughput']:>8.1f} {lat['p50']:>9.2f} "
+                      f"{lat['p90']:>9.2f} {lat['p99']:>9.2f} {mean_batch:>11.1f}")
+            with FitClient(args.host, args.port) as client:
+                print("\nServer-side: " + json.dumps(client.stats()))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import inspect
+from collections import OrderedDict
+
+import numpy as np
+from scipy.optimize import OptimizeResult, differential_evolution
+
+import csgt_kernels
+from csgt_data import CACHE_DIR
+
+# =============================================================================
+# 1. Content Keys
+# =============================================================================
+# A fit lives under <STORE_DIR>/<problem>/<settings>/. `problem` hashes the
+# data arrays, the source of the functions and modules that define the model
+# (whole modules, so inherited methods and module constants are covered), the
+# csgt_kernels source and active backend (the distances run through it), and
+# the bounds; `settings` hashes the optimizer keywords. Runs of one problem with
+# different settings share a directory, so a new run can resume from the
+# final population of an earlier one.
+STORE_DIR = os.path.join(CACHE_DIR, 'fits')
+STORE_FORMAT = 'fit-store-v1'
+# Keywords that change output only (or, for `args`, are hashed as data)
+UNKEYED_SETTINGS = ('disp', 'callback', 'workers', 'args')
+
+
+def _digest(parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+
+def problem_key(data, model, bounds):
+    """`data`: arrays the objective reads; `model`: callables or modules (hashed by source) or strings."""
+    parts = [STORE_FORMAT]
+    for arr in data:
+        if isinstance(arr, (np.ndarray, list, tuple, float, int)):
+            arr = np.ascontiguousarray(arr)
+            parts += [arr.dtype.str, arr.shape, arr.tobytes()]
+        else:
+            parts.append(repr(arr))
+    for obj in model:
+        parts.append(obj if isinstance(obj, str) else inspect.getsource(obj))
+    parts += [inspect.getsource(csgt_kernels), csgt_kernels.active_kernels().name]
+    parts.append(np.asarray(bounds, dtype=float).tobytes())
+    return _digest(parts)
+
+
+def settings_key(settings):
+    keyed = {k: (np.asarray(v).tolist() if isinstance(v, np.ndarray) else v)
+             for k, v in sorted(settings.items()) if k not in UNKEYED_SETTINGS}
+    return _digest([json.dumps(keyed, sort_keys=True, default=str)])
+
+# =============================================================================
+# 2. On-Disk Store
+# =============================================================================
+class FitStore:
+    """result.json (best fit, χ², counters, settings) + population.npz per fit."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def path(self, problem, settings):
+        return os.path.join(self.root, problem, settings)
+
+    def get(self, problem, settings):
+        path = self.path(problem, settings)
+        if not os.path.exists(os.path.join(path, 'result.json')):
+            return None
+        with open(os.path.join(path, 'result.json')) as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, 'population.npz')) as f:
+            arrays = {name: f[name] for name in f.files}
+        return OptimizeResult(x=np.asarray(meta['x']), fun=meta['fun'], nfev=meta['nfev'], nit=meta['nit'],
+                              success=meta['success'], message=meta['message'], meta=meta,
+                              key=(problem, settings), cached=True, **arrays)
+
+    def latest(self, problem, pop_shape=None):
+        """Most recent fit of `problem` (optionally with a matching population shape)."""
+        best, best_time = None, -np.inf
+        root = os.path.join(self.root, problem)
+        for settings in (os.listdir(root) if os.path.isdir(root) else []):
+            res = self.get(problem, settings)
+            if res is None or (pop_shape is not None and res.population.shape != tuple(pop_shape)):
+                continue
+            if res.meta['created'] > best_time:
+                best, best_time = res, res.meta['created']
+        return best
+
+    def put(self, problem, settings, res, history, meta):
+        path = self.path(problem, settings)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            with open(os.path.join(tmp, 'population.npz'), 'wb') as f:
+                np.savez(f, population=res.population, population_energies=res.population_energies,
+                         **history)
+            with open(os.path.join(tmp, 'result.json'), 'w') as f:
+                json.dump({'format': STORE_FORMAT, 'x': np.asarray(res.x).tolist(), 'fun': float(res.fun),
+                           'nfev': int(res.nfev), 'nit': int(res.nit), 'success': bool(res.success),
+                           'message': str(res.message), 'created': time.time(), **meta},
+                          f, indent=2, default=str)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp)
+        return path
+
+
+def cached_differential_evolution(func, bounds, data=(), model=(), store=None, resume=True, **de_kwargs):
+    """
+    `differential_evolution` through the fit store. A stored fit of the same
+    problem and settings is returned at once (`res.cached`); otherwise the
+    run starts from the final population of the latest stored fit of the
+    problem (when `resume` and the population shape matches), records the
+    population of every generation, and is stored.
+    """
+    store = store or FitStore()
+    problem = problem_key(tuple(data) + tuple(de_kwargs.get('args', ())), model, bounds)
+    settings = settings_key(de_kwargs)
+    res = store.get(problem, settings)
+    if res is not None:
+        return res
+
+    meta = {'settings': {k: v for k, v in de_kwargs.items() if k not in UNKEYED_SETTINGS},
+            'bounds': np.asarray(bounds, dtype=float).tolist(), 'resumed_from': None}
+    if resume and 'init' not in de_kwargs:
+        popsize = de_kwargs.get('popsize', 15) * len(bounds)
+        previous = store.latest(problem, (popsize, len(bounds)))
+        if previous is not None:
+            de_kwargs['init'] = previous.population
+            meta['resumed_from'] = previous.key[1]
+
+    history = {'populations': [], 'energies': [], 'best_x': [], 'best_fun': []}
+    user_callback = de_kwargs.pop('callback', None)
+
+    def record(intermediate_result):
+        history['populations'].append(intermediate_result.population)
+        history['energies'].append(intermediate_result.population_energies)
+        history['best_x'].append(intermediate_result.x)
+        history['best_fun'].append(intermediate_result.fun)
+        if user_callback is not None:
+            return user_callback(intermediate_result)
+
+    t0 = time.perf_counter()
+    res = differential_evolution(func, bounds, callback=record, **de_kwargs)
+    meta['seconds'] = time.perf_counter() - t0
+    store.put(problem, settings, res, {k: np.asarray(v) for k, v in history.items()}, meta)
+    res.key, res.cached, res.meta = (problem, settings), False, meta
+    return res
+
+# =============================================================================
+# 3. Memoized Objective
+# =============================================================================
+class MemoizedObjective:
+    """
+    Bounded LRU memo in front of a batched objective `batch(pop) -> χ²`.
+
+    Rows are keyed by their float64 bytes after rounding to `decimals`
+    (None: exact match). Within a batch only the misses are evaluated, in
+    one call. `stats()` reports hits, misses, hit rate and evictions.
+    """
+
+    def __init__(self, batch, maxsize=100_000, decimals=None):
+        self.batch = batch
+        self.maxsize, self.decimals = maxsize, decimals
+        self._memo = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def _keys(self, pop):
+        rounded = pop if self.decimals is None else np.round(pop, self.decimals)
+        return [row.tobytes() for row in np.ascontiguousarray(rounded, dtype=float)]
+
+    def __call__(self, pop):
+        pop = np.atleast_2d(np.asarray(pop, dtype=float))
+        keys = self._keys(pop)
+        out = np.empty(len(pop))
+        todo = {}
+        for i, key in enumerate(keys):
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                out[i] = self._memo[key]
+                self.hits += 1
+            else:
+                todo.setdefault(key, []).append(i)
+        if todo:
+            first = [rows[0] for rows in todo.values()]
+            values = self.batch(pop[first])
+            self.misses += len(first)
+            for (key, rows), value in zip(todo.items(), values):
+                out[rows] = value
+                self._memo[key] = value
+            # Repeats of a missed row inside the same batch count as hits
+            self.hits += sum(len(rows) - 1 for rows in todo.values())
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+                self.evictions += 1
+        return out
+
+    def vectorized(self, x, *args):
+        """`differential_evolution(vectorized=True)` layout: x has shape (d, N)."""
+        return self(np.asarray(x).T)
+
+    def stats(self):
+        calls = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / calls if calls else 0.0,
+                'evictions': self.evictions, 'size': len(self._memo), 'maxsize': self.maxsize}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List stored fits")
+    parser.add_argument('--root', default=STORE_DIR)
+    args = parser.parse_args()
+
+    store = FitStore(args.root)
+    problems = sorted(os.listdir(args.root)) if os.path.isdir(args.root) else []
+    if not problems:
+        print(f"No stored fits under {args.root}")
+    for problem in problems:
+        print(f"problem {problem}")
+        for settings in sorted(os.listdir(os.path.join(args.root, problem))):
+            res = store.get(problem, settings)
+            if res is None:
+                continue
+            stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(res.meta['created']))
+            resumed = f", resumed from {res.meta['resumed_from']}" if res.meta['resumed_from'] else ""
+            print(f"  {settings}  {stamp}  χ² = {res.fun:.4f}  nit = {res.nit}  nfev = {res.nfev}  "
+                  f"{res.meta.get('seconds', float('nan')):.1f} s{resumed}  {res.meta['settings']}")